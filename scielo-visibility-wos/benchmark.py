@@ -0,0 +1,260 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+from datetime import datetime
+from queue import Empty
+from time import perf_counter
+
+import enrich_data
+import string_processor
+import util
+
+from model.enricher import WosEnricher
+from model.metrics import peak_rss_mb
+from model.synthetic_data import generate_synthetic_data, synthetic_data_paths
+
+
+# Intervalo, em segundos, entre verificações do processo de um benchmark
+BENCHMARK_POLL_INTERVAL = 1
+
+BENCHMARK_NAMES = ['load_issn_maps', 'read_base_titles', 'read_source_titles', 'preprocess_journal_title', 'enrich',
+                   'enrich_source_titles', 'save_gold_data']
+
+logging.basicConfig(level=os.environ.get('LOGGING_LEVEL', 'INFO'),
+                    format='[%(asctime)s] %(levelname)s %(message)s',
+                    datefmt='%d/%b/%Y %H:%M:%S')
+
+
+class BenchmarkError(Exception):
+    """
+    Indica que o processo de um benchmark terminou sem informar o resultado.
+    """
+
+
+def _load_enricher(paths):
+    enricher = WosEnricher('BENCH')
+    enricher.source_titles = util.read_source_titles(paths['source_titles'])
+    enricher.core_titles = util.read_core_titles(paths['mjl'])
+    t2i, i2c = util.read_base_titles(paths['base_titles'])
+    enricher.base_titles = {'title2issns': t2i, 'issn2countries': i2c}
+    wos_title_to_issn = util.read_wos_gathered_issns(paths['gathered'])
+    return enricher, wos_title_to_issn
+
+
+def setup_benchmark(name, paths, workers):
+    """
+    Prepara os dados de entrada de um benchmark, sem medi-los.
+    :return: par (função a ser medida, que retorna a quantidade de itens processados)
+    """
+    if name == 'load_issn_maps':
+        return lambda: len(enrich_data.load_issn_maps(paths['base_titles'])['issn_to_issnl'])
+
+    if name == 'read_base_titles':
+        return lambda: len(util.read_base_titles(paths['base_titles'])[0])
+
+    if name == 'read_source_titles':
+        return lambda: len(util.read_source_titles(paths['source_titles']))
+
+    if name == 'preprocess_journal_title':
+        titles = [row[0] for row in enrich_data.iter_wos_searched_data(paths['searched'])]
+        string_processor._cached_preprocess_journal_title.cache_clear()
+        return lambda: len([string_processor.preprocess_journal_title(t) for t in titles])
+
+    if name == 'enrich':
+        issn_maps = enrich_data.load_issn_maps(paths['base_titles'])
+        mjl = enrich_data.load_wos_master_journal_list(paths['mjl'])
+        searched_data = enrich_data.load_wos_searched_data(paths['searched'])
+        return lambda: len(enrich_data.enrich(searched_data, issn_maps, mjl, workers=workers)) - 1
+
+    enricher, wos_title_to_issn = _load_enricher(paths)
+
+    if name == 'enrich_source_titles':
+        def run():
+            enricher.enrich_source_titles(wos_title_to_issn, workers=workers)
+            return len(enricher.source_titles)
+        return run
+
+    if name == 'save_gold_data':
+        enricher.enrich_source_titles(wos_title_to_issn, workers=workers)
+
+        def run():
+            # O arquivo gold é gravado no diretório atual
+            with tempfile.TemporaryDirectory() as tmp:
+                current = os.getcwd()
+                os.chdir(tmp)
+                try:
+                    enricher.save_gold_data()
+                finally:
+                    os.chdir(current)
+            return len(enricher.results)
+        return run
+
+    raise ValueError('Benchmark desconhecido: %s' % name)
+
+
+def _run_benchmark(name, paths, workers, queue):
+    function = setup_benchmark(name, paths, workers)
+    rss_before = peak_rss_mb()
+
+    start = perf_counter()
+    items = function()
+    seconds = perf_counter() - start
+
+    peak_rss = peak_rss_mb()
+    queue.put({'name': name,
+               'items': items,
+               'seconds': round(seconds, 4),
+               'items_per_second': round(items / seconds, 1) if seconds else None,
+               'peak_rss_mb': round(peak_rss, 1),
+               'peak_rss_increase_mb': round(peak_rss - rss_before, 1)})
+
+
+def run_benchmark(name, paths, workers=1):
+    """
+    Executa um benchmark em um processo novo, de modo que o pico de memória não seja afetado pelos anteriores.
+    """
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_run_benchmark, args=(name, paths, workers, queue))
+    process.start()
+
+    # O processo que falha não informa resultado, por isso a fila é consultada enquanto ele estiver em execução
+    while True:
+        try:
+            result = queue.get(timeout=BENCHMARK_POLL_INTERVAL)
+            break
+        except Empty:
+            if not process.is_alive():
+                try:
+                    result = queue.get(timeout=BENCHMARK_POLL_INTERVAL)
+                    break
+                except Empty:
+                    process.join()
+                    raise BenchmarkError('Benchmark %s terminou sem resultado (código %s)' % (name, process.exitcode))
+
+    process.join()
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def read_previous_run(path, rows):
+    """
+    Obtém a última execução com a mesma quantidade de linhas, dentre as salvas em path.
+    """
+    previous = None
+
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                run = json.loads(line)
+                if run['rows'] == rows:
+                    previous = run
+
+    return previous
+
+
+def save_results(path, run):
+    # Cada execução ocupa uma linha, o que permite comparar resultados de commits diferentes
+    with open(path, 'a') as f:
+        f.write(json.dumps(run) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        '-r',
+        '--rows',
+        type=int,
+        default=10000,
+        help='Quantidade de linhas de resultados de busca dos dados sintéticos (entre 10 mil e 5 milhões, por exemplo)'
+    )
+
+    parser.add_argument(
+        '-d',
+        '--data_dir',
+        default='benchmark_data',
+        help='Diretório dos dados sintéticos. Os dados de cada quantidade de linhas são gerados uma única vez, '
+             'em um subdiretório próprio'
+    )
+
+    parser.add_argument(
+        '-o',
+        '--output',
+        default='benchmark_results.jsonl',
+        help='Arquivo ao qual os resultados são acrescentados'
+    )
+
+    parser.add_argument(
+        '-b',
+        '--benchmarks',
+        default=','.join(BENCHMARK_NAMES),
+        help='Lista de benchmarks a executar, separados por vírgula'
+    )
+
+    parser.add_argument(
+        '-n',
+        '--workers',
+        type=int,
+        default=1,
+        help='Quantidade de processos usados em enrich e enrich_source_titles'
+    )
+
+    params = parser.parse_args()
+
+    data_dir = os.path.join(params.data_dir, str(params.rows))
+    if not os.path.exists(data_dir):
+        logging.info('Gerando dados sintéticos com %d linhas em %s...' % (params.rows, data_dir))
+        generate_synthetic_data(data_dir, params.rows)
+    paths = synthetic_data_paths(data_dir)
+
+    previous = read_previous_run(params.output, params.rows)
+    previous_results = {r['name']: r for r in previous['results']} if previous else {}
+    results = []
+    failed = []
+
+    for name in params.benchmarks.split(','):
+        logging.info('Executando %s...' % name)
+        try:
+            result = run_benchmark(name, paths, params.workers)
+        except BenchmarkError as e:
+            logging.error(e)
+            failed.append(name)
+            continue
+        results.append(result)
+
+        message = '%s: %d itens em %.3fs (%.0f itens/s), pico de memória %.1f MB (+%.1f MB)' % (
+            name, result['items'], result['seconds'], result['items_per_second'] or 0,
+            result['peak_rss_mb'], result['peak_rss_increase_mb'])
+        if name in previous_results and result['seconds']:
+            message += ', %.2fx em relação ao commit %s' % (previous_results[name]['seconds'] / result['seconds'], previous['commit'])
+        logging.info(message)
+
+    save_results(params.output, {'commit': _git_commit(),
+                                 'date': datetime.now().isoformat(),
+                                 'rows': params.rows,
+                                 'workers': params.workers,
+                                 'python': platform.python_version(),
+                                 'results': results})
+
+    if failed:
+        logging.error('Benchmarks com falha: %s' % ', '.join(failed))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import logging
+import os
+
+from enrich_data import load_issn_maps
+from model.compiled_maps import write_compiled_maps
+from util import read_base_titles
+
+
+logging.basicConfig(level=os.environ.get('LOGGING_LEVEL', 'INFO'),
+                    format='[%(asctime)s] %(levelname)s %(message)s',
+                    datefmt='%d/%b/%Y %H:%M:%S')
+
+
+def get_params():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('-b', '--base_titles', required=True)
+    parser.add_argument('-o', '--output', required=True)
+
+    params = parser.parse_args()
+
+    return {'base_titles': params.base_titles,
+            'output': params.output}
+
+
+def iter_maps(path_base_titles):
+    # Os dicionários são carregados um de cada vez para limitar o uso de memória durante a compilação
+    logging.info('Carregando dicionários de enrich_data...')
+    issn_maps = load_issn_maps(path_base_titles)
+    for name in ['issn_to_issnl', 'issn_to_country', 'title_to_issnl']:
+        yield name, issn_maps.pop(name)
+
+    logging.info('Carregando dicionários de wos_enricher...')
+    t2i, i2c = read_base_titles(path_base_titles)
+    yield 'title2issns', t2i
+    del t2i
+    yield 'issn2countries', i2c
+
+
+if __name__ == '__main__':
+    params = get_params()
+
+    logging.info('Compilando %s em %s...' % (params['base_titles'], params['output']))
+    write_compiled_maps(params['output'], iter_maps(params['base_titles']))
@@ -2,16 +2,27 @@ import argparse
 import csv
 import logging
 import os
-import re
 
+from collections import Counter
+from functools import partial
+from itertools import chain
+from model.aggregation import VisibilityAggregator
+from model.compiled_maps import is_compiled_maps, open_compiled_maps
+from model.lookup import LookupClient
+from model.metrics import RunMetrics, profiled
+from model.parallel import chunked, imap_chunks
+from model.readers import iter_searched_results_files, read_searched_results_files
+from model.resolution import ResolutionCache, resolution_stats
+from model.title_index import TitleTrigramIndex
+from model import vectorized
 from string_processor import preprocess_journal_title
 
 
-PATTERN_YEAR = r'\d{4}'
 WOS_MASTER_JOURNAL_FIELDS = ['Journal title', 'ISSN', 'eISSN']
 MIN_CHARS_LENGTH = 6
 MIN_WORDS_COUNT = 2
 WOS_SEARCHED_RESULTS_FIELDS = ['Source title', 'N', 'Percent', 'Year']
+ENRICH_CHUNK_SIZE = 5000
 
 
 def _fix_issn(issn):
@@ -34,7 +45,22 @@ def _find_data_by_title(title, issn_maps):
     return '#'.join(sorted(set(r_countries))), '#'.join(sorted(set(r_issnls)))
 
 
+def _find_data_by_similar_title(title, issn_maps, title_index):
+    preprocessed_title = preprocess_journal_title(title)
+    r_issnls = [issnl for issnl, score in title_index.search(preprocessed_title)]
+
+    r_countries = []
+    for ri in r_issnls:
+        r_countries.extend(issn_maps['issn_to_country'].get(ri, ['-1']))
+
+    return '#'.join(sorted(set(r_countries))), '#'.join(sorted(set(r_issnls)))
+
+
 def load_issn_maps(path):
+    if is_compiled_maps(path):
+        compiled_maps = open_compiled_maps(path)
+        return {k: compiled_maps[k] for k in ['issn_to_issnl', 'issn_to_country', 'title_to_issnl']}
+
     title_to_issnl = {}
     issn_to_issnl = {}
     issn_to_country = {}
@@ -75,20 +101,16 @@ def load_issn_maps(path):
     return {'issn_to_issnl': issn_to_issnl, 'issn_to_country': issn_to_country, 'title_to_issnl': title_to_issnl}
 
 
-def load_wos_searched_data(dir_searched_results_files):
-    files = sorted([os.path.join(dir_searched_results_files, f) for f in os.listdir(dir_searched_results_files)])
+def _list_wos_searched_files(dir_searched_results_files):
+    return sorted([os.path.join(dir_searched_results_files, f) for f in os.listdir(dir_searched_results_files)])
 
-    data = []
 
-    for f in files:
-        year = re.search(PATTERN_YEAR, f).group()
+def iter_wos_searched_data(dir_searched_results_files):
+    return iter_searched_results_files(_list_wos_searched_files(dir_searched_results_files))
 
-        for row in open(f).readlines()[1:]:
-            row_els = row.strip().upper().split('\t') + [year]
-            if len(row_els) == len(WOS_SEARCHED_RESULTS_FIELDS):
-                data.append(row_els)
 
-    return data
+def load_wos_searched_data(dir_searched_results_files):
+    return read_searched_results_files(_list_wos_searched_files(dir_searched_results_files))
 
 
 def load_wos_master_journal_list(path):
@@ -115,36 +137,100 @@ def load_wos_master_journal_list(path):
     return title_to_issns
 
 
-def enrich(searched_data, issn_maps, master_journal_list):
-    enriched_data = [WOS_SEARCHED_RESULTS_FIELDS + ['ISSN', 'eISSN', 'Country', 'N-Country']]
+def _resolve_title(r_title, issn_maps, master_journal_list, title_index=None):
+    """
+    Resolve os dados de um título de resultados de busca, os mesmos para todos os anos em que ele aparece.
+    :return: tupla (issn, eissn, países, quantidade de países, caminho de associação)
+    """
 
-    for row in searched_data:
-        # Usa dados da Master Journal List para tentar encontrar país e issns
-        r_title = row[0]
-        r_issn, r_eissn = master_journal_list.get(r_title, ('', ''))
+    # Usa dados da Master Journal List para tentar encontrar país e issns
+    r_issn, r_eissn = master_journal_list.get(r_title, ('', ''))
 
-        r_issn_country = issn_maps['issn_to_country'].get(r_issn, [])
-        r_eissn_country = issn_maps['issn_to_country'].get(r_eissn, [])
-        r_country = '#'.join(sorted(set(r_issn_country + r_eissn_country)))
+    r_issn_country = issn_maps['issn_to_country'].get(r_issn, [])
+    r_eissn_country = issn_maps['issn_to_country'].get(r_eissn, [])
+    r_country = '#'.join(sorted(set(r_issn_country + r_eissn_country)))
+    match_path = 'mjl_issn' if r_issn_country else 'mjl_eissn'
 
-        if not r_country:
-            r_country, r_issnl = _find_data_by_title(r_title, issn_maps)
+    if not r_country:
+        r_country, r_issnl = _find_data_by_title(r_title, issn_maps)
+        match_path = 'title' if r_issnl else 'no_match'
 
-            # Usa issnls de issn_maps quando issn e eissn não forem identificados na Master Journal List
-            if not r_issn and not r_eissn:
-                r_issn = r_issnl
+        # Caso solicitado, busca títulos similares quando não há correspondência exata
+        if not r_issnl and title_index:
+            r_country, r_issnl = _find_data_by_similar_title(r_title, issn_maps, title_index)
+            if r_issnl:
+                match_path = 'similar_title'
 
-        if '#' not in r_country:
-            if r_country == '':
-                r_country_n = '0'
-            else:
-                r_country_n = '1'
+        # Usa issnls de issn_maps quando issn e eissn não forem identificados na Master Journal List
+        if not r_issn and not r_eissn:
+            r_issn = r_issnl
+
+    if '#' not in r_country:
+        if r_country == '':
+            r_country_n = '0'
         else:
-            r_country_n = len(r_country.split('#'))
+            r_country_n = '1'
+    else:
+        r_country_n = len(r_country.split('#'))
+
+    return r_issn, r_eissn, r_country, r_country_n, match_path
+
+
+def _enrich_chunk(chunk, resolutions):
+    enriched_rows = []
+    counters = Counter()
+
+    resolutions.prefetch(row[0] for row in chunk)
 
-        enriched_data.append(row + [r_issn, r_eissn, r_country, r_country_n])
+    for row in chunk:
+        r_issn, r_eissn, r_country, r_country_n, match_path = resolutions.get(row[0], counters)
+        counters[match_path] += 1
 
-    return enriched_data
+        # Indica linhas associadas a mais de um ISSN-L ou a mais de um país
+        if '#' in r_issn:
+            counters['multiple_issnls'] += 1
+        if '#' in r_country:
+            counters['multiple_countries'] += 1
+
+        enriched_rows.append(row + [r_issn, r_eissn, r_country, r_country_n])
+
+    return enriched_rows, counters
+
+
+def iter_enrich(searched_data, issn_maps, master_journal_list, title_index=None, workers=1, counters=None, lookup=None):
+    """
+    Enriquece os resultados de busca, um bloco por vez. Cada título distinto é resolvido uma única vez
+    (em cada processo) e a resolução é reaproveitada nos demais anos.
+    :param counters: Counter opcional, atualizado com a quantidade de linhas por caminho de associação e com os
+        acertos e falhas do cache de resolução de títulos
+    :param lookup: LookupClient opcional; quando informado, os títulos de cada bloco são resolvidos em uma única
+        consulta ao serviço de consulta, e issn_maps, master_journal_list e title_index não são usados
+    """
+    if counters is None:
+        counters = Counter()
+
+    yield WOS_SEARCHED_RESULTS_FIELDS + ['ISSN', 'eISSN', 'Country', 'N-Country']
+
+    if lookup:
+        resolve_many = lookup.resolver('resolve_title')
+        resolutions = ResolutionCache(lambda title: resolve_many([title])[0], resolve_many)
+    else:
+        resolutions = ResolutionCache(partial(_resolve_title, issn_maps=issn_maps, master_journal_list=master_journal_list, title_index=title_index))
+
+    # Com workers > 1, os blocos de linhas são enriquecidos em processos filhos que compartilham os dicionários
+    chunks = chunked(searched_data, ENRICH_CHUNK_SIZE)
+    for enriched_rows, chunk_counters in imap_chunks(_enrich_chunk, (resolutions,), chunks, workers):
+        counters.update(chunk_counters)
+        yield from enriched_rows
+
+    if title_index:
+        logging.info('%d linhas resolvidas por similaridade de título' % counters['similar_title'])
+
+    logging.info('Cache de resolução de títulos: %(hits)d acertos, %(misses)d falhas (taxa de acerto %(hit_rate).2f)' % resolution_stats(counters))
+
+
+def enrich(searched_data, issn_maps, master_journal_list, title_index=None, workers=1, counters=None, lookup=None):
+    return list(iter_enrich(searched_data, issn_maps, master_journal_list, title_index, workers, counters, lookup))
 
 
 def save_data(data, path):
@@ -153,20 +239,89 @@ def save_data(data, path):
             f.write('|'.join([str(vi) for vi in i]) + '\n')
 
 
+def enrich_with_python(params, metrics, aggregator=None):
+    issn_mapper, mlj, title_index, lookup = None, None, None, None
+
+    with metrics.stage('load'):
+        if params.lookup:
+            # Os dicionários já estão carregados no serviço de consulta
+            logging.info('Conectando ao serviço de consulta em %s...' % params.lookup)
+            lookup = LookupClient(params.lookup)
+            logging.info('Serviço de consulta carregado com %s' % lookup.status()['inputs'])
+        else:
+            logging.info('Carregando dados de dicionário ISSN, títulos e países...')
+            issn_mapper = load_issn_maps(params.issn_maps)
+
+            logging.info('Lendo WoS Master Journal List...')
+            mlj = load_wos_master_journal_list(params.wos_mjl)
+
+            if params.title_similarity_threshold is not None:
+                logging.info('Construindo índice de similaridade de títulos...')
+                title_index = TitleTrigramIndex(issn_mapper['title_to_issnl'],
+                                                threshold=params.title_similarity_threshold,
+                                                top_k=params.title_similarity_top_k)
+
+    # Leitura, enriquecimento e gravação são encadeados, linha a linha, para manter o uso de memória constante.
+    # O tempo de cada etapa é contabilizado separadamente, mesmo com as etapas intercaladas
+    logging.info('Lendo, enriquecendo e salvando resultados de busca WoS...')
+    search_results = metrics.iter_stage('read', iter_wos_searched_data(params.wos_searched_data_dir))
+    enriched_results = metrics.iter_stage('enrich', iter_enrich(search_results, issn_mapper, mlj, title_index, params.workers, metrics.counters, lookup))
+    if aggregator:
+        # As linhas são agregadas (N, Year e Country) à medida que são gravadas, sem nova leitura do arquivo enriquecido
+        header = next(enriched_results)
+        enriched_results = chain([header], metrics.iter_stage('aggregate', aggregator.iter_add(enriched_results, 1, 3, 6)))
+    with metrics.stage('save'):
+        save_data(enriched_results, 'enriched_results.tsv')
+
+
+def enrich_with_pandas(params, metrics, aggregator=None):
+    vectorized.require_pandas()
+
+    with metrics.stage('load'):
+        logging.info('Carregando tabelas de ISSN, títulos e países...')
+        issn_tables = vectorized.load_issn_tables(params.issn_maps)
+
+        logging.info('Lendo WoS Master Journal List...')
+        mjl = vectorized.load_journal_list_frame(params.wos_mjl)
+
+        title_index = None
+        if params.title_similarity_threshold is not None:
+            logging.info('Construindo índice de similaridade de títulos...')
+            title_index = TitleTrigramIndex(vectorized.title_to_issnl_map(issn_tables),
+                                            threshold=params.title_similarity_threshold,
+                                            top_k=params.title_similarity_top_k)
+
+    with metrics.stage('read'):
+        logging.info('Lendo resultados de busca WoS...')
+        search_results = vectorized.pd.DataFrame(load_wos_searched_data(params.wos_searched_data_dir), columns=WOS_SEARCHED_RESULTS_FIELDS, dtype=object)
+
+    with metrics.stage('enrich'):
+        logging.info('Enriquecendo resultados de busca WoS...')
+        enriched_results = vectorized.enrich_frame(search_results, issn_tables, mjl, title_index, metrics.counters)
+
+    with metrics.stage('save'):
+        logging.info('Salvando resultados...')
+        vectorized.save_frame(enriched_results, 'enriched_results.tsv')
+
+    if aggregator:
+        with metrics.stage('aggregate'):
+            rows = zip(enriched_results['N'].tolist(), enriched_results['Year'].tolist(), enriched_results['Country'].tolist())
+            for _ in aggregator.iter_add(rows, 0, 1, 2):
+                pass
+
+
 def main():
     parser = argparse.ArgumentParser()
 
     parser.add_argument(
         '-d',
         '--issn_maps',
-        required=True,
-        help='Um dicionário, legível por pickle, de ISSNs, títulos de periódicos e países'
+        help='Arquivo CSV de ISSNs, títulos de periódicos e países, ou sua versão compilada por compile_base_titles.py'
     )
 
     parser.add_argument(
         '-w',
         '--wos_mjl',
-        required=True,
         help='Arquivo em formato CSV que contém dados de Web of Science Master Journal List'
     )
 
@@ -178,26 +333,99 @@ def main():
              'em que cada linha representa Source Title, Records, Percent'
     )
 
+    parser.add_argument(
+        '-t',
+        '--title_similarity_threshold',
+        type=float,
+        help='Similaridade mínima (maior que 0 e no máximo 1) para associar títulos não encontrados a títulos similares. '
+             'Quando não informada, a busca por títulos similares não é realizada'
+    )
+
+    parser.add_argument(
+        '-k',
+        '--title_similarity_top_k',
+        type=int,
+        default=1,
+        help='Quantidade máxima de ISSN-Ls similares associados a um título'
+    )
+
+    parser.add_argument(
+        '-n',
+        '--workers',
+        type=int,
+        default=1,
+        help='Quantidade de processos usados no enriquecimento'
+    )
+
+    parser.add_argument(
+        '-e',
+        '--engine',
+        choices=['python', 'pandas'],
+        default='python',
+        help='Motor de enriquecimento: python (linha a linha) ou pandas (junções vetorizadas sobre os títulos distintos; requer pandas)'
+    )
+
+    parser.add_argument(
+        '-a',
+        '--aggregate',
+        action='store_true',
+        help='Salva tabelas de quantidade de registros por país e ano, por N-Country e de parcela sem país identificado '
+             '(enriched_results_country_year.tsv, enriched_results_n_country.tsv e enriched_results_unresolved.tsv)'
+    )
+
+    parser.add_argument(
+        '-i',
+        '--index',
+        default='',
+        help='Índice WoS dos resultados de busca, registrado nas tabelas de agregação'
+    )
+
+    parser.add_argument(
+        '-l',
+        '--lookup',
+        help='Endereço de um serviço de consulta (ver lookup_server.py), como unix:/tmp/lookup.sock ou 127.0.0.1:8765. '
+             'Os dicionários e a Master Journal List do serviço substituem os parâmetros -d, -w, -t e -k'
+    )
+
+    parser.add_argument(
+        '-r',
+        '--metrics_report',
+        help='Arquivo JSON em que são salvos o tempo e o pico de memória de cada etapa e os contadores de caminhos de associação'
+    )
+
+    parser.add_argument(
+        '-p',
+        '--profile',
+        help='Arquivo em que são salvas as estatísticas de cProfile da execução'
+    )
+
     params = parser.parse_args()
 
+    if params.lookup:
+        if params.engine == 'pandas' or params.title_similarity_threshold is not None:
+            parser.error('O serviço de consulta não é compatível com o motor pandas nem com o parâmetro -t')
+    elif not params.issn_maps or not params.wos_mjl:
+        parser.error('Os parâmetros -d e -w são obrigatórios sem o serviço de consulta')
+
     logging.basicConfig(level=logging.DEBUG,
                         format='[%(asctime)s] %(levelname)s %(message)s',
                         datefmt='%d/%b/%Y %H:%M:%S')
 
-    logging.info('Carregando dados de dicionário ISSN, títulos e países...')
-    issn_mapper = load_issn_maps(params.issn_maps)
+    metrics = RunMetrics()
 
-    logging.info('Lendo WoS Master Journal List...')
-    mlj = load_wos_master_journal_list(params.wos_mjl)
+    aggregator = VisibilityAggregator(params.index) if params.aggregate else None
 
-    logging.info('Lendo resultados de busca WoS...')
-    search_results = load_wos_searched_data(params.wos_searched_data_dir)
+    with profiled(params.profile):
+        if params.engine == 'pandas':
+            enrich_with_pandas(params, metrics, aggregator)
+        else:
+            enrich_with_python(params, metrics, aggregator)
 
-    logging.info('Enriquecendo dados de busca WoS...')
-    enriched_results = enrich(search_results, issn_mapper, mlj)
+        if aggregator:
+            with metrics.stage('save'):
+                aggregator.save('enriched_results')
 
-    logging.info('Salvando dados enriquecidos...')
-    save_data(enriched_results, 'enriched_results.tsv')
+    metrics.dump(params.metrics_report)
 
 
 if __name__ == '__main__':
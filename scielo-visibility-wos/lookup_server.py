@@ -0,0 +1,97 @@
+import argparse
+import logging
+import os
+
+from enrich_data import _find_data_by_title, _resolve_title, load_issn_maps, load_wos_master_journal_list
+from model.enricher import WosEnricher
+from model.lookup import LookupService, create_lookup_server
+from model.title_index import TitleTrigramIndex
+from util import fix_issn, read_base_titles, read_core_titles
+
+
+logging.basicConfig(level=os.environ.get('LOGGING_LEVEL', 'INFO'),
+                    format='[%(asctime)s] %(levelname)s %(message)s',
+                    datefmt='%d/%b/%Y %H:%M:%S')
+
+
+def get_params():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('-b', '--base_titles', required=True)
+    parser.add_argument('-w', '--wos_mjl')
+    parser.add_argument('-c', '--core_titles')
+    parser.add_argument('-t', '--title_similarity_threshold', type=float)
+    parser.add_argument('-k', '--title_similarity_top_k', type=int, default=1)
+    parser.add_argument('-a', '--address', default='127.0.0.1:8765')
+
+    params = parser.parse_args()
+
+    return {'base_titles': params.base_titles,
+            'wos_mjl': params.wos_mjl,
+            'core_titles': params.core_titles,
+            'title_similarity_threshold': params.title_similarity_threshold,
+            'title_similarity_top_k': params.title_similarity_top_k,
+            'address': params.address}
+
+
+def load_operations(params):
+    """
+    Carrega os dicionários uma única vez e cria as operações do serviço de consulta:
+        - title: ISSN-Ls e países de um título (normalizado como em enrich_data)
+        - issn: ISSN-Ls e países de um ISSN
+        - resolve_title: resolução de um título de resultados de busca, como em enrich_data (requer -w)
+        - resolve_source_title: resolução de um par [título, ISSNs coletados na WoS ou null], como em WosEnricher (requer -c)
+    """
+    logging.info('Carregando dados de dicionário ISSN, títulos e países...')
+    issn_maps = load_issn_maps(params['base_titles'])
+
+    def title(key):
+        countries, issnls = _find_data_by_title(key, issn_maps)
+        return {'issnls': issnls.split('#') if issnls else [], 'countries': countries.split('#') if countries else []}
+
+    def issn(key):
+        key = fix_issn(key)
+        return {'issnls': sorted(set(issn_maps['issn_to_issnl'].get(key, []))),
+                'countries': sorted(set(issn_maps['issn_to_country'].get(key, [])))}
+
+    operations = {'title': title, 'issn': issn}
+
+    if params['wos_mjl']:
+        logging.info('Lendo WoS Master Journal List...')
+        mjl = load_wos_master_journal_list(params['wos_mjl'])
+
+        title_index = None
+        if params['title_similarity_threshold'] is not None:
+            logging.info('Construindo índice de similaridade de títulos...')
+            title_index = TitleTrigramIndex(issn_maps['title_to_issnl'],
+                                            threshold=params['title_similarity_threshold'],
+                                            top_k=params['title_similarity_top_k'])
+
+        operations['resolve_title'] = lambda key: _resolve_title(key, issn_maps, mjl, title_index)
+
+    if params['core_titles']:
+        logging.info('Carregando dados de wos_enricher...')
+        enricher = WosEnricher('')
+        enricher.core_titles = read_core_titles(params['core_titles'])
+        t2i, i2c = read_base_titles(params['base_titles'])
+        enricher.base_titles = {'title2issns': t2i, 'issn2countries': i2c}
+
+        operations['resolve_source_title'] = lambda key: enricher._resolve_source_title(key[0], None if key[1] is None else {key[0]: key[1]})
+
+    return operations
+
+
+if __name__ == '__main__':
+    params = get_params()
+
+    inputs = {k: params[k] for k in ['base_titles', 'wos_mjl', 'core_titles'] if params[k]}
+    service = LookupService(load_operations(params), inputs)
+    server = create_lookup_server(service, params['address'])
+
+    logging.info('Serviço de consulta disponível em %s (operações: %s)' % (params['address'], ', '.join(service.status()['operations'])))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info('Encerrando serviço de consulta...')
+    finally:
+        server.server_close()
@@ -0,0 +1,94 @@
+import logging
+
+
+# Valor de país usado por enrich_data para ISSN-Ls sem país
+UNKNOWN_COUNTRY = '-1'
+
+
+def _parse_records(records):
+    try:
+        return int(str(records).replace(',', ''))
+    except ValueError:
+        return 0
+
+
+class VisibilityAggregator:
+    """
+    Agrega, em uma única passagem pelas linhas enriquecidas, a quantidade de registros:
+        - por país e ano (cada país de uma linha recebe todos os registros da linha e, na contagem fracionada,
+          a fração correspondente à quantidade de países)
+        - por ano e quantidade de países (N-Country)
+        - por ano, com a parcela de linhas e registros sem país identificado
+    O país UNKNOWN_COUNTRY não é contado como país: uma linha apenas com ele tem N-Country 0 e é contabilizada como
+    não resolvida.
+    """
+    def __init__(self, index=''):
+        self.index = index
+        self.country_year = {}
+        self.n_country = {}
+        self.years = {}
+
+    def add(self, records, year, countries):
+        """
+        Contabiliza uma linha enriquecida.
+        :param records: quantidade de registros da linha
+        :param year: ano da linha
+        :param countries: países da linha, separados por #
+        """
+        records = _parse_records(records)
+        countries = [c for c in set(countries.split('#')) if c and c != UNKNOWN_COUNTRY]
+
+        for c in countries:
+            cy = self.country_year.get((c, year))
+            if cy is None:
+                cy = self.country_year[(c, year)] = [0, 0.0]
+            cy[0] += records
+            cy[1] += records / len(countries)
+
+        nc = self.n_country.get((year, len(countries)))
+        if nc is None:
+            nc = self.n_country[(year, len(countries))] = [0, 0]
+        nc[0] += 1
+        nc[1] += records
+
+        y = self.years.get(year)
+        if y is None:
+            y = self.years[year] = [0, 0, 0, 0]
+        y[0] += 1
+        y[1] += records
+
+        # Linhas sem país, ou associadas apenas a ISSN-Ls sem país, não são resolvidas
+        if not countries:
+            y[2] += 1
+            y[3] += records
+
+    def iter_add(self, rows, records_field, year_field, countries_field):
+        """
+        Contabiliza as linhas à medida que são produzidas, repassando-as sem alteração.
+        """
+        for row in rows:
+            self.add(row[records_field], row[year_field], row[countries_field])
+            yield row
+
+    def save(self, prefix):
+        """
+        Salva as tabelas de agregação em <prefix>_country_year.tsv, <prefix>_n_country.tsv e <prefix>_unresolved.tsv.
+        A primeira coluna de cada tabela é o índice, o que permite concatenar tabelas de índices distintos.
+        """
+        with open(prefix + '_country_year.tsv', 'w') as f:
+            f.write('\t'.join(['Index', 'Country', 'Year', 'Records', 'Fractional records']) + '\n')
+            for (country, year), (records, fractional) in sorted(self.country_year.items()):
+                f.write('\t'.join([self.index, country, year, str(records), '%.4f' % fractional]) + '\n')
+
+        with open(prefix + '_n_country.tsv', 'w') as f:
+            f.write('\t'.join(['Index', 'Year', 'N-Country', 'Rows', 'Records']) + '\n')
+            for (year, n), (rows, records) in sorted(self.n_country.items()):
+                f.write('\t'.join([self.index, year, str(n), str(rows), str(records)]) + '\n')
+
+        with open(prefix + '_unresolved.tsv', 'w') as f:
+            f.write('\t'.join(['Index', 'Year', 'Rows', 'Records', 'Unresolved rows', 'Unresolved records', 'Unresolved share']) + '\n')
+            for year, (rows, records, unresolved_rows, unresolved_records) in sorted(self.years.items()):
+                share = unresolved_records / records if records else 0.0
+                f.write('\t'.join([self.index, year, str(rows), str(records), str(unresolved_rows), str(unresolved_records), '%.4f' % share]) + '\n')
+
+        logging.info('Tabelas de agregação salvas com o prefixo %s' % prefix)
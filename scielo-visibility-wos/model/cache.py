@@ -0,0 +1,53 @@
+import sqlite3
+import threading
+
+from datetime import datetime
+from string_processor import preprocess_wos_source_title
+
+
+class IssnCache:
+    """
+    Cache persistente, em SQLite, dos ISSNs coletados na WoS, inclusive dos títulos não encontrados.
+    As entradas são identificadas por (título normalizado, ano, índice WoS) e podem ser compartilhadas entre execuções
+    e entre índices.
+    """
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS issn_results ('
+                                'source_title TEXT NOT NULL, '
+                                'year TEXT NOT NULL, '
+                                'wos_index TEXT NOT NULL, '
+                                'found INTEGER NOT NULL, '
+                                'issns TEXT NOT NULL, '
+                                'collected_at TEXT NOT NULL, '
+                                'PRIMARY KEY (source_title, year, wos_index))')
+        self.connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source_title, year, wos_index):
+        """
+        Obtém o resultado de uma coleta anterior.
+        :return: None, caso não haja coleta anterior, ou par (encontrado, lista de ISSNs)
+        """
+        with self.lock:
+            row = self.connection.execute('SELECT found, issns FROM issn_results WHERE source_title = ? AND year = ? AND wos_index = ?',
+                                          (preprocess_wos_source_title(source_title), year, wos_index)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return bool(row[0]), [i for i in row[1].split('#') if i]
+
+    def put(self, source_title, year, wos_index, found, issns):
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO issn_results VALUES (?, ?, ?, ?, ?, ?)',
+                                    (preprocess_wos_source_title(source_title), year, wos_index, int(found), '#'.join(issns), datetime.now().isoformat()))
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,367 @@
+import copy
+import logging
+import os
+
+from model.latency import LatencyStats
+from model.parallel import chunked
+from string_processor import preprocess_wos_source_title
+from time import sleep
+
+
+CHROME_DOWNLOAD_DIR = os.environ.get('CHROME_DOWNLOAD_DIR', os.getcwd())
+GENERAL_RESULTS_DIR = os.environ.get('GENERAL_RESULTS_DIR', os.getcwd())
+WOS_CIT_ANALYSIS_NAMES = ['SO_SourceTitle_SourceTitle_en', 'SE_BookSeries_BookSeries_en']
+WOS_HOME_URL = os.environ.get('WOS_HOME_URL', 'https://apps.webofknowledge.com/')
+WOS_INTERACTION_ERROR = -1
+WOS_INTERACTION_SUCCESS = 1
+WOS_BATCH_WINDOW = 200
+WOS_NEXT_PAGE_CLASS = 'paginationNext'
+WOS_RECORD_ID_PREFIX = 'RECORD_'
+WOS_SUMMARY_SOURCE_TITLE_TAG = 'source_title_txt_label'
+
+logging.basicConfig(level=os.environ.get('LOGGING_LEVEL', 'INFO'),
+                    format='[%(asctime)s] %(levelname)s %(message)s',
+                    datefmt='%d/%b/%Y %H:%M:%S')
+
+
+class WosCollector:
+    """
+    Base dos coletores de dados da WoS. Concentra os fluxos de coleta de ISSNs e de relatórios de citação,
+    que dependem apenas das operações abaixo, implementadas por cada backend (navegador ou cliente HTTP):
+        - open_session e close_session
+        - search_issns(source_title, year), que retorna (status, lista de ISSNs)
+        - search_issns_batch(source_titles, year), que busca vários títulos em uma única consulta e retorna
+          (status, dicionário título normalizado -> lista de ISSNs, booleano que indica se todos os resultados foram
+          percorridos). O status é WOS_INTERACTION_ERROR quando a consulta não tem resultados.
+          Uma consulta interrompida pelo limite de wos_batch_max_pages páginas é repetida, dividida ao meio, para os
+          títulos ainda não encontrados
+        - collect_citation_report(year), que salva os relatórios de um ano em results_directory
+    Erros de interação esperados pelo backend são declarados em recoverable_errors. Um título que falha é consultado
+    novamente até max_attempts vezes, com espera crescente a partir de retry_delay segundos, e, se ainda assim não for
+    coletado, é registrado em failures (ver FailedItems).
+    """
+    recoverable_errors = ()
+
+    def __init__(self):
+        self.download_directory = CHROME_DOWNLOAD_DIR
+        self.fallback = None
+        self.issn_cache = None
+        self.failures = None
+        self.max_attempts = 3
+        self.retry_delay = 2
+        self.output = ''
+        self.results_directory = ''
+        self.wos_indexes = ['SCI', 'SSCI', 'AHCI', 'ISTP', 'ISSHP', 'ESCI']
+        self.wos_result_types = ['Article', 'Review']
+        self.wos_search_years = range(1997, 2020)
+        self.wos_selected_index = 'AHCI'
+        self.wos_batch_query_length = 0
+        self.wos_batch_max_pages = 10
+        self.latency_stats = LatencyStats()
+
+    def initialize(self, mode):
+        if mode == 'citation_report':
+            self.results_directory = os.path.join(self.download_directory, self.wos_selected_index.lower())
+            if not os.path.exists(self.results_directory):
+                os.makedirs(self.results_directory)
+
+        self.wos_indexes = ['editionitem' + s.upper() for s in self.wos_indexes]
+        self.wos_selected_index = 'editionitem' + self.wos_selected_index.upper()
+
+    def clone(self):
+        """
+        Cria uma cópia do coletor com a mesma configuração, porém sem sessão aberta.
+        """
+        collector = copy.copy(self)
+        collector._detach_session()
+        if self.fallback:
+            collector.fallback = self.fallback.clone()
+        return collector
+
+    def close(self):
+        if self.has_session():
+            self.close_session()
+        if self.fallback:
+            self.fallback.close()
+
+    def _detach_session(self):
+        raise NotImplementedError
+
+    def has_session(self):
+        raise NotImplementedError
+
+    def open_session(self):
+        raise NotImplementedError
+
+    def close_session(self):
+        raise NotImplementedError
+
+    def search_issns(self, source_title, year):
+        raise NotImplementedError
+
+    def search_issns_batch(self, source_titles, year):
+        raise NotImplementedError
+
+    def collect_citation_report(self, year):
+        raise NotImplementedError
+
+    def collect_issn(self, source_title_years, output_filename):
+        fullpath_output = os.path.join(GENERAL_RESULTS_DIR, output_filename)
+
+        last_line = self._detect_last_saved_line(fullpath_output)
+        if last_line > 0:
+            last_line += 1
+            logging.info('Continuing from line %d' % last_line)
+
+        items = [(c + last_line, source_title, source_title_years[source_title][0])
+                 for c, source_title in enumerate(sorted(source_title_years.keys())[last_line:])]
+
+        self._collect_all(items, fullpath_output)
+
+    def replay_failed_issns(self, output_filename):
+        """
+        Coleta apenas os itens registrados em failures, acrescentando os resultados ao arquivo de saída.
+        """
+        items = self.failures.start_replay()
+        self._collect_all(items, os.path.join(GENERAL_RESULTS_DIR, output_filename))
+        self.failures.finish_replay()
+
+    def _collect_all(self, items, fullpath_output):
+        self.output = open(fullpath_output, 'a')
+
+        for window in chunked(items, self.window_size()):
+            self._collect_items(window)
+
+        self.output.close()
+        self.log_cache_stats()
+        self.save_latency_stats('issn')
+
+    def collect_citation_reports(self):
+        self.open_session()
+
+        for sf in self.wos_search_years:
+            self.collect_citation_report(sf)
+
+        self.save_latency_stats('citation_report')
+
+    def save_latency_stats(self, mode):
+        self.latency_stats.dump(os.path.join(GENERAL_RESULTS_DIR, 'latency_%s.json' % mode))
+
+    def log_cache_stats(self):
+        if self.issn_cache:
+            logging.info('Cache: %d hits, %d misses' % (self.issn_cache.hits, self.issn_cache.misses))
+
+    def window_size(self):
+        # Em modo de consultas agrupadas, os títulos são processados em janelas, cujos resultados são salvos em ordem
+        return WOS_BATCH_WINDOW if self.wos_batch_query_length > 0 else 1
+
+    def _collect_items(self, items):
+        """
+        Coleta os ISSNs de uma lista de itens (número da linha, título, ano).
+        """
+        if len(items) == 1:
+            self._collect_source_title_issns(*items[0])
+            return
+
+        results = {}
+        pending = []
+
+        for line_number, source_title, year in items:
+            cached = self._get_cached_issns(line_number, source_title, year)
+            if cached is not None:
+                results[line_number] = cached
+            else:
+                pending.append((line_number, source_title, year))
+
+        for year, batch in self._group_batches(pending):
+            results.update(self._search_batch(batch, year))
+
+        # Títulos não associados de forma inequívoca pelas consultas agrupadas são consultados individualmente
+        for line_number, source_title, year in items:
+            if line_number in results:
+                self._save_issns(line_number, source_title, *results[line_number])
+            else:
+                self._collect_source_title_issns(line_number, source_title, year)
+
+    def _collect_source_title_issns(self, line_number, source_title, year):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                status, issns = self._search_cached_issns(line_number, source_title, year)
+            except self._recoverable_errors() as e:
+                if attempt < self.max_attempts:
+                    delay = self.retry_delay * 2 ** (attempt - 1)
+                    logging.warning('(%d, %s) attempt %d failed (%s), retrying in %ds' % (line_number, source_title, attempt, e.__class__.__name__, delay))
+                    sleep(delay)
+                    continue
+
+                logging.error('Not collected (%d, %s)' % (line_number, source_title))
+                if self.failures:
+                    self.failures.add(line_number, source_title, year)
+                    self.failures.done(line_number)
+                return
+
+            self._save_issns(line_number, source_title, status, issns)
+            return
+
+    def _save_issns(self, line_number, source_title, status, issns):
+        if status == WOS_INTERACTION_SUCCESS:
+            for i in issns:
+                logging.info('Saving (%d, %s, %s)' % (line_number, source_title, i))
+                self._save_issn_data(line_number, source_title, i)
+        else:
+            # Títulos não encontrados são gravados sem ISSN, de modo que uma retomada não os consulte novamente
+            logging.info('Not found (%d, %s)' % (line_number, source_title))
+            self._save_issn_data(line_number, source_title, '')
+
+        if self.failures:
+            self.failures.done(line_number)
+
+    def _get_cached_issns(self, line_number, source_title, year):
+        # Consulta a WoS apenas quando o título não foi coletado em uma execução anterior
+        if self.issn_cache:
+            cached = self.issn_cache.get(source_title, year, self._selected_index_name())
+            if cached is not None:
+                logging.info('(%d, %s) cached' % (line_number, source_title))
+                found, issns = cached
+                return WOS_INTERACTION_SUCCESS if found else WOS_INTERACTION_ERROR, issns
+
+    def _put_cached_issns(self, source_title, year, status, issns):
+        if self.issn_cache:
+            self.issn_cache.put(source_title, year, self._selected_index_name(), status == WOS_INTERACTION_SUCCESS, issns)
+
+    def _search_cached_issns(self, line_number, source_title, year):
+        cached = self._get_cached_issns(line_number, source_title, year)
+        if cached is not None:
+            return cached
+
+        logging.info('(%d, %s) collecting' % (line_number, source_title))
+
+        status, issns = self._search_issns_with_fallback(line_number, source_title, year)
+        self._put_cached_issns(source_title, year, status, issns)
+
+        return status, issns
+
+    def _group_batches(self, items):
+        items_by_year = {}
+        for item in items:
+            items_by_year.setdefault(item[2], []).append(item)
+
+        for year, year_items in items_by_year.items():
+            batch = []
+            query_length = len(self.batch_query([], year))
+
+            for item in year_items:
+                item_length = len(item[1]) + len(' OR ()')
+                if batch and query_length + item_length > self.wos_batch_query_length:
+                    yield year, batch
+                    batch = []
+                    query_length = len(self.batch_query([], year))
+
+                batch.append(item)
+                query_length += item_length
+
+            if batch:
+                yield year, batch
+
+    @staticmethod
+    def batch_query(source_titles, year):
+        return 'PY=' + year + ' AND SO=({0})'.format(' OR '.join('(%s)' % st for st in source_titles))
+
+    def _search_batch(self, batch, year):
+        results = {}
+
+        # Um lote com um único título é consultado individualmente
+        if len(batch) < 2:
+            return results
+
+        logging.info('(%d-%d) collecting %d titles of %s in one query' % (batch[0][0], batch[-1][0], len(batch), year))
+
+        try:
+            if not self.has_session():
+                self.open_session()
+            status, found, complete = self.search_issns_batch([st for _, st, _ in batch], year)
+        except self.recoverable_errors:
+            logging.warning('(%d-%d) batch query failed' % (batch[0][0], batch[-1][0]))
+            return results
+
+        # Sem resultados para a consulta agrupada, nenhum dos títulos teria resultados em uma consulta individual
+        if status != WOS_INTERACTION_SUCCESS:
+            for line_number, source_title, _ in batch:
+                results[line_number] = (WOS_INTERACTION_ERROR, [])
+                self._put_cached_issns(source_title, year, *results[line_number])
+            return results
+
+        unresolved = []
+
+        for line_number, source_title, _ in batch:
+            issns = found.get(preprocess_wos_source_title(source_title))
+            if issns is not None:
+                results[line_number] = (WOS_INTERACTION_SUCCESS, issns)
+                self._put_cached_issns(source_title, year, *results[line_number])
+            elif not complete:
+                unresolved.append((line_number, source_title, year))
+
+            # Um título sem registro de mesmo título de fonte em resultados completos pode ter sido encontrado com
+            # outro título de fonte (associação ambígua), por isso é consultado individualmente
+
+        # O limite de páginas foi atingido antes de percorrer todos os resultados. Os títulos restantes são consultados
+        # novamente em duas metades, até que cada consulta seja completa ou tenha um único título
+        if unresolved:
+            logging.warning('(%d-%d) page limit reached with %d titles unresolved, splitting the query' % (batch[0][0], batch[-1][0], len(unresolved)))
+            middle = len(unresolved) // 2
+            for half in (unresolved[:middle], unresolved[middle:]):
+                results.update(self._search_batch(half, year))
+
+        return results
+
+    def _search_issns_with_fallback(self, line_number, source_title, year):
+        # A sessão é aberta somente quando necessário
+        if not self.has_session():
+            self.open_session()
+
+        try:
+            return self.search_issns(source_title, year)
+        except self.recoverable_errors:
+            if not self.fallback:
+                raise
+
+        logging.warning('(%d, %s) collecting with fallback collector' % (line_number, source_title))
+
+        if not self.fallback.has_session():
+            self.fallback.open_session()
+
+        return self.fallback.search_issns(source_title, year)
+
+    def _recoverable_errors(self):
+        if self.fallback:
+            return self.recoverable_errors + self.fallback.recoverable_errors
+        return self.recoverable_errors
+
+    def _selected_index_name(self):
+        return self.wos_selected_index.replace('editionitem', '')
+
+    def _detect_last_saved_line(self, fullpath_output):
+        if os.path.exists(fullpath_output):
+            with open(fullpath_output, 'rb') as f:
+                # Lê apenas o final do arquivo, suficiente para obter as últimas linhas. Usa-se o maior número de linha,
+                # pois itens reprocessados (ver replay_failed_issns) são acrescentados fora de ordem
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - 64 * 1024))
+                lines = f.read().splitlines()
+
+                # A primeira linha lida pode estar incompleta
+                if f.tell() > 64 * 1024:
+                    lines = lines[1:]
+
+                line_numbers = []
+                for line in lines:
+                    try:
+                        line_numbers.append(int(line.split(b'\t')[0]))
+                    except ValueError:
+                        pass
+                return max(line_numbers, default=0)
+        return 0
+
+    def _save_issn_data(self, line_number, source_title, issn):
+        self.output.write('\t'.join([str(line_number), source_title, issn]) + '\n')
+        self.output.flush()
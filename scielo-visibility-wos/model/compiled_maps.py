@@ -0,0 +1,158 @@
+import json
+import mmap
+import sys
+
+from array import array
+from collections.abc import Mapping
+
+
+COMPILED_MAPS_MAGIC = b'SVWOSMAP'
+COMPILED_MAPS_VERSION = 1
+VALUE_SEPARATOR = '\x1f'
+
+
+class CompiledMap(Mapping):
+    """
+    Dicionário somente leitura apoiado em um arquivo mapeado em memória.
+    As chaves ficam ordenadas no arquivo e são localizadas por busca binária, sem carregar o mapa completo.
+    """
+    def __init__(self, buffer, section):
+        self._buffer = buffer
+        self._count = section['count']
+        self._kind = section['kind']
+        self._keys_start = section['keys_start']
+        self._values_start = section['values_start']
+        self._key_offsets = self._read_offsets(section['key_offsets_start'])
+        self._value_offsets = self._read_offsets(section['value_offsets_start'])
+
+    def _read_offsets(self, start):
+        return memoryview(self._buffer)[start:start + (self._count + 1) * 8].cast('Q')
+
+    def _key_at(self, position):
+        return self._buffer[self._keys_start + self._key_offsets[position]:self._keys_start + self._key_offsets[position + 1]]
+
+    def _find(self, key):
+        encoded_key = key.encode('utf-8')
+
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < encoded_key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self._count and self._key_at(low) == encoded_key:
+            return low
+        return -1
+
+    def _value_at(self, position):
+        raw = self._buffer[self._values_start + self._value_offsets[position]:self._values_start + self._value_offsets[position + 1]]
+        values = raw.decode('utf-8').split(VALUE_SEPARATOR)[:-1]
+
+        if self._kind == 'set':
+            return set(values)
+        return values
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            raise KeyError(key)
+
+        position = self._find(key)
+        if position < 0:
+            raise KeyError(key)
+        return self._value_at(position)
+
+    def __contains__(self, key):
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __iter__(self):
+        for position in range(self._count):
+            yield self._key_at(position).decode('utf-8')
+
+    def __len__(self):
+        return self._count
+
+
+def _align(f):
+    padding = -f.tell() % 8
+    if padding:
+        f.write(b'\x00' * padding)
+
+
+def _write_section(f, data):
+    encoded_items = sorted((k.encode('utf-8'), v) for k, v in data.items())
+    kind = 'set' if any(isinstance(v, set) for _, v in encoded_items) else 'list'
+
+    key_offsets = array('Q', [0])
+    keys_start = f.tell()
+    for k, _ in encoded_items:
+        f.write(k)
+        key_offsets.append(key_offsets[-1] + len(k))
+
+    value_offsets = array('Q', [0])
+    values_start = f.tell()
+    for _, v in encoded_items:
+        values = sorted(v) if isinstance(v, set) else v
+        raw = ''.join(i + VALUE_SEPARATOR for i in values).encode('utf-8')
+        f.write(raw)
+        value_offsets.append(value_offsets[-1] + len(raw))
+
+    _align(f)
+    key_offsets_start = f.tell()
+    key_offsets.tofile(f)
+
+    value_offsets_start = f.tell()
+    value_offsets.tofile(f)
+
+    return {'count': len(encoded_items),
+            'kind': kind,
+            'keys_start': keys_start,
+            'values_start': values_start,
+            'key_offsets_start': key_offsets_start,
+            'value_offsets_start': value_offsets_start}
+
+
+def write_compiled_maps(path, maps):
+    """
+    Grava em path um índice binário com os dicionários informados.
+    :param path: caminho do arquivo a ser gerado
+    :param maps: iterável de pares (nome, dicionário), em que cada valor do dicionário é uma lista ou um conjunto de strings
+    """
+    sections = {}
+
+    with open(path, 'wb') as f:
+        f.write(COMPILED_MAPS_MAGIC)
+        f.write(b'\x00' * 8)
+
+        for name, data in maps:
+            sections[name] = _write_section(f, data)
+
+        header_start = f.tell()
+        f.write(json.dumps({'version': COMPILED_MAPS_VERSION, 'byteorder': sys.byteorder, 'sections': sections}).encode('utf-8'))
+
+        f.seek(len(COMPILED_MAPS_MAGIC))
+        f.write(header_start.to_bytes(8, 'little'))
+
+
+def is_compiled_maps(path):
+    with open(path, 'rb') as f:
+        return f.read(len(COMPILED_MAPS_MAGIC)) == COMPILED_MAPS_MAGIC
+
+
+def open_compiled_maps(path):
+    """
+    Abre, mapeado em memória, um índice gerado por write_compiled_maps.
+    :param path: caminho do índice compilado
+    :return: dicionário nome -> CompiledMap
+    """
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    header_start = int.from_bytes(buffer[len(COMPILED_MAPS_MAGIC):len(COMPILED_MAPS_MAGIC) + 8], 'little')
+    header = json.loads(buffer[header_start:].decode('utf-8'))
+
+    if header['version'] != COMPILED_MAPS_VERSION or header['byteorder'] != sys.byteorder:
+        raise ValueError('Índice compilado %s incompatível, é preciso gerá-lo novamente' % path)
+
+    return {name: CompiledMap(buffer, section) for name, section in header['sections'].items()}
@@ -0,0 +1,90 @@
+import os
+import shutil
+
+from time import monotonic, sleep
+
+
+# Diretório, dentro do diretório de downloads, em que cada relatório recebe seu próprio diretório de recebimento
+STAGING_DIR = '.staging'
+
+# Sufixos de arquivos ainda em download (Chrome e Firefox)
+PARTIAL_DOWNLOAD_SUFFIXES = ('.crdownload', '.part', '.tmp')
+
+
+class DownloadTimeoutError(Exception):
+    """
+    Indica que um download não foi concluído no tempo esperado.
+    """
+
+
+class DownloadTracker:
+    """
+    Acompanha downloads do navegador em diretórios de recebimento exclusivos, um por relatório. Um download está
+    concluído quando o diretório contém um único arquivo, sem extensão de download parcial, cujo tamanho não muda
+    entre duas verificações consecutivas. As verificações são feitas com intervalo crescente, de poll_interval até
+    max_poll_interval.
+    :param download_directory: diretório de downloads do navegador
+    :param timeout: tempo máximo de espera por um download, em segundos
+    """
+    def __init__(self, download_directory, timeout=60, poll_interval=0.05, max_poll_interval=0.5):
+        self.download_directory = download_directory
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+
+    def staging_directory(self, name):
+        """
+        Cria um diretório de recebimento vazio para o download identificado por name.
+        """
+        directory = os.path.join(self.download_directory, STAGING_DIR, name)
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+        return directory
+
+    def wait(self, directory):
+        """
+        Aguarda a conclusão do download em um diretório de recebimento.
+        :return: caminho do arquivo baixado
+        """
+        deadline = monotonic() + self.timeout
+        interval = self.poll_interval
+        previous = None
+
+        while True:
+            current = self._completed_file(directory)
+
+            # O tamanho precisa se repetir em duas verificações para descartar arquivos ainda em escrita
+            if current is not None and current == previous:
+                return current[0]
+            previous = current
+
+            if monotonic() >= deadline:
+                raise DownloadTimeoutError('Download não concluído em %s após %ds' % (directory, self.timeout))
+
+            sleep(interval)
+            interval = min(interval * 2, self.max_poll_interval)
+
+    def move(self, directory, destination):
+        """
+        Aguarda o download, move o arquivo para destination e remove o diretório de recebimento.
+        :return: destination
+        """
+        shutil.move(self.wait(directory), destination)
+        shutil.rmtree(directory, ignore_errors=True)
+        return destination
+
+    def _completed_file(self, directory):
+        try:
+            files = os.listdir(directory)
+        except FileNotFoundError:
+            return None
+
+        if len(files) != 1 or files[0].endswith(PARTIAL_DOWNLOAD_SUFFIXES):
+            return None
+
+        path = os.path.join(directory, files[0])
+        try:
+            return path, os.path.getsize(path)
+        except FileNotFoundError:
+            return None
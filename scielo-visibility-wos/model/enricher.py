@@ -1,54 +1,137 @@
+import hashlib
+import logging
+
+from collections import Counter
+from functools import partial
+from model.parallel import chunked, imap_chunks
+from model.records import RecordStore
+from model.vectorized import enrich_source_titles_frame
+from model.resolution import ResolutionCache, resolution_stats
+
+
+ENRICH_CHUNK_SIZE = 5000
+
+
 class WosEnricher:
     def __init__(self, index):
         self.source_titles = []
         self.core_titles = {}
         self.base_titles = {}
-        self.results = {}
+        self.results = RecordStore()
         self.index = index
-
-    def enrich_source_titles(self, wos_title_to_issn=None):
-        for s in self.source_titles:
-            title = s[0]
-            records = s[1]
-            year = s[2]
-            issn, eissn = self.core_titles.get(title, ('', ''))
-            countries = ''
-
-            ed_key = '|'.join([title, year])
-
-            if not issn and not eissn:
-                bissns = self.base_titles['title2issns'].get(title, set())
-                if bissns:
-                    if len(bissns) == 1:
-                        issn = list(bissns)[0]
-                    else:
-                        issn = '#'.join(bissns)
-
-            if issn:
-                if '#' not in issn:
-                    countries = '#'.join(self.base_titles['issn2countries'].get(issn, []))
+        self.counters = Counter()
+        self.lookup = None
+        # Nome do arquivo de resultados salvo por save_gold_data (<índice>.<nome>.csv)
+        self.data_name = 'gold'
+
+    def enrich_source_titles(self, wos_title_to_issn=None, workers=1):
+        # Cada título distinto é resolvido uma única vez (em cada processo) e a resolução é reaproveitada nos demais anos
+        if self.lookup:
+            # Com o serviço de consulta, os títulos de cada bloco são resolvidos em uma única consulta
+            resolve_many = partial(self._lookup_source_titles, wos_title_to_issn=wos_title_to_issn)
+            resolutions = ResolutionCache(lambda title: resolve_many([title])[0], resolve_many)
+        else:
+            resolutions = ResolutionCache(partial(self._resolve_source_title, wos_title_to_issn=wos_title_to_issn))
+
+        # Com workers > 1, os blocos de títulos são enriquecidos em processos filhos que compartilham os dicionários
+        chunks = chunked(self.source_titles, ENRICH_CHUNK_SIZE)
+        for enriched_chunk, counters in imap_chunks(self._enrich_source_titles_chunk, (resolutions,), chunks, workers):
+            self.counters.update(counters)
+            for ed_value in enriched_chunk:
+                self.results.put(ed_value)
+
+        logging.info('Cache de resolução de títulos: %(hits)d acertos, %(misses)d falhas (taxa de acerto %(hit_rate).2f)' % resolution_stats(self.counters))
+
+    def enrich_source_titles_frame(self, core_titles, base_titles, gathered_issns=None):
+        """
+        Enriquece source_titles com o motor vetorizado (ver vectorized.enrich_source_titles_frame).
+        :param core_titles: tabela obtida por vectorized.load_journal_list_frame
+        :param base_titles: tabelas obtidas por vectorized.load_base_tables
+        :param gathered_issns: tabela opcional obtida por vectorized.load_gathered_issns_frame
+        """
+        columns = enrich_source_titles_frame(self.source_titles, core_titles, base_titles, gathered_issns, self.counters)
+        self.results.load_columns(columns)
+
+    def _enrich_source_titles_chunk(self, chunk, resolutions):
+        enriched_chunk = []
+        counters = Counter()
+
+        resolutions.prefetch(s[0] for s in chunk)
+
+        for s in chunk:
+            resolution, match_path = resolutions.get(s[0], counters)
+            counters[match_path] += 1
+
+            # Indica títulos associados a mais de um ISSN ou a mais de um país
+            if '#' in resolution[0]:
+                counters['multiple_issnls'] += 1
+            if '#' in resolution[2]:
+                counters['multiple_countries'] += 1
+
+            enriched_chunk.append([s[0], s[1], s[2]] + resolution)
+
+        return enriched_chunk, counters
+
+    def _resolve_source_title(self, title, wos_title_to_issn):
+        """
+        Resolve os dados de um título, os mesmos para todos os anos em que ele aparece.
+        :return: par (lista [issn, eissn, países] acrescida de [ISSNs WoS, países WoS], caso haja ISSNs coletados na WoS, caminho de associação)
+        """
+        issn, eissn = self.core_titles.get(title, ('', ''))
+        countries = ''
+
+        match_path = 'mjl_issn' if issn else 'mjl_eissn'
+
+        if not issn and not eissn:
+            bissns = self.base_titles['title2issns'].get(title, set())
+            match_path = 'title' if bissns else 'no_match'
+            if bissns:
+                if len(bissns) == 1:
+                    issn = list(bissns)[0]
                 else:
-                    countries = set()
-                    for i in issn.split('#'):
-                        for iv in self.base_titles['issn2countries'].get(i, []):
-                            countries.add(iv)
-                    countries = '#'.join(countries)
-
-            self.results[ed_key] = [title, records, year, issn, eissn, countries]
+                    issn = '#'.join(bissns)
 
-        if wos_title_to_issn:
-            for k, v in self.results.items():
-                journal_title = v[0]
+        if issn:
+            if '#' not in issn:
+                countries = '#'.join(self.base_titles['issn2countries'].get(issn, []))
+            else:
+                countries = set()
+                for i in issn.split('#'):
+                    for iv in self.base_titles['issn2countries'].get(i, []):
+                        countries.add(iv)
+                countries = '#'.join(countries)
 
-                wos_issns = wos_title_to_issn.get(journal_title, [])
-                self.results[k].append('#'.join(wos_issns))
+        resolution = [issn, eissn, countries]
 
-                wos_countries = set()
-                for wi in wos_issns:
-                    for wv in self.base_titles['issn2countries'].get(wi, []):
-                        wos_countries.add(wv)
-
-                self.results[k].append('#'.join(wos_countries))
+        if wos_title_to_issn:
+            wos_issns = wos_title_to_issn.get(title, [])
+            resolution.append('#'.join(wos_issns))
+
+            wos_countries = set()
+            for wi in wos_issns:
+                for wv in self.base_titles['issn2countries'].get(wi, []):
+                    wos_countries.add(wv)
+
+            resolution.append('#'.join(wos_countries))
+
+        return resolution, match_path
+
+    def _lookup_source_titles(self, titles, wos_title_to_issn):
+        """
+        Resolve os títulos no serviço de consulta (lookup), como _resolve_source_title.
+        Os ISSNs coletados na WoS de cada título, quando houver, são enviados com o título.
+        """
+        keys = [[t, wos_title_to_issn.get(t, []) if wos_title_to_issn else None] for t in titles]
+        return [(resolution, match_path) for resolution, match_path in self.lookup.query('resolve_source_title', keys)]
+
+    def aggregate(self, aggregator):
+        """
+        Contabiliza os resultados em aggregator (ver aggregation.VisibilityAggregator).
+        Títulos sem país usam os países dos ISSNs coletados na WoS, quando houver.
+        """
+        for v in self.results.values():
+            countries = v[5] if v[5] or len(v) < 8 else v[7]
+            aggregator.add(v[1], v[2], countries)
 
     def save_problematic_sources_titles_years(self):
         no_issn, multiple_issn = self._get_problematic_source_titles()
@@ -86,7 +169,41 @@ class WosEnricher:
             result_dict[source_title] = []
         result_dict[source_title].append(st_year)
 
+    def gold_data_path(self):
+        return self.index + '.' + self.data_name + '.csv'
+
     def save_gold_data(self):
-        with open(self.index + '.gold' + '.csv', 'w') as f:
+        with open(self.gold_data_path(), 'w') as f:
             for v in self.results.values():
                 f.write('|'.join(v) + '\n')
+
+    def load_gold_data(self, columns):
+        """
+        Carrega em results os dados salvos por save_gold_data.
+        :param columns: quantidade de colunas de cada linha (6, ou 8 quando há ISSNs coletados na WoS)
+        """
+        with open(self.gold_data_path()) as f:
+            for line in f:
+                els = line.rstrip('\n').split('|')
+
+                # Títulos que contêm o separador ocupam mais de uma coluna
+                extra = len(els) - columns
+                ed_value = ['|'.join(els[:extra + 1])] + els[extra + 1:]
+
+                self.results.put(ed_value)
+
+    def drop_years(self, years):
+        self.results.drop_years(years)
+
+    def title_digest(self, title, wos_title_to_issn=None):
+        """
+        Resume os dados de entrada usados no enriquecimento de um título. Um título cujo resumo mudou é afetado
+        pelas alterações nos dados de Master Journal List, de títulos base ou de ISSNs coletados.
+        """
+        issn, eissn = self.core_titles.get(title, ('', ''))
+        bissns = sorted(self.base_titles['title2issns'].get(title, set()))
+        wos_issns = list(wos_title_to_issn.get(title, [])) if wos_title_to_issn else []
+
+        countries = [sorted(self.base_titles['issn2countries'].get(i, [])) for i in [issn, eissn] + bissns + wos_issns]
+
+        return hashlib.sha1(repr((issn, eissn, bissns, wos_issns, countries)).encode()).hexdigest()[:16]
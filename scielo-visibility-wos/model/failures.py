@@ -0,0 +1,84 @@
+import logging
+import os
+import threading
+
+
+class FailedItems:
+    """
+    Arquivo de itens (número da linha, título, ano) cuja coleta de ISSNs falhou mesmo após as novas tentativas.
+    Pode ser compartilhado entre sessões executadas em threads distintas. No modo de reprocessamento, os itens
+    registrados são movidos para <path>.replay e retirados dele à medida que são concluídos (ver done), de modo que um
+    reprocessamento interrompido é retomado apenas com os itens restantes. Os que falharem novamente voltam ao arquivo.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.replay_path = path + '.replay'
+        self.replay_items = None
+        self.lock = threading.Lock()
+
+    def add(self, line_number, source_title, year):
+        with self.lock:
+            with open(self.path, 'a') as f:
+                f.write('\t'.join([str(line_number), source_title, year]) + '\n')
+
+    def done(self, line_number):
+        """
+        Retira de <path>.replay um item concluído, salvo ou registrado novamente como falha. Fora do modo de
+        reprocessamento, não faz nada.
+        """
+        with self.lock:
+            if self.replay_items is None or self.replay_items.pop(line_number, None) is None:
+                return
+            self._write(self.replay_path, self.replay_items.values())
+
+    def start_replay(self):
+        """
+        Obtém os itens a reprocessar, inclusive os de um reprocessamento interrompido.
+        :return: lista de itens (número da linha, título, ano), ordenada pelo número da linha
+        """
+        items = {}
+        for path in (self.replay_path, self.path):
+            for item in self._read(path):
+                items[item[0]] = item
+        items = [items[k] for k in sorted(items)]
+
+        with self.lock:
+            self._write(self.replay_path, items)
+            self.replay_items = {item[0]: item for item in items}
+
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+        logging.info('Replaying %d failed items' % len(items))
+        return items
+
+    def finish_replay(self):
+        with self.lock:
+            self.replay_items = None
+            if os.path.exists(self.replay_path):
+                os.remove(self.replay_path)
+
+        remaining = len(self._read(self.path))
+        if remaining:
+            logging.warning('%d items failed again and remain in %s' % (remaining, self.path))
+
+    @staticmethod
+    def _write(path, items):
+        # O arquivo é substituído de uma só vez, para que uma interrupção não o deixe incompleto
+        with open(path + '.tmp', 'w') as f:
+            for line_number, source_title, year in items:
+                f.write('\t'.join([str(line_number), source_title, year]) + '\n')
+        os.replace(path + '.tmp', path)
+
+    @staticmethod
+    def _read(path):
+        items = []
+
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    els = line.rstrip('\n').split('\t')
+                    if len(els) == 3:
+                        items.append((int(els[0]), els[1], els[2]))
+
+        return items
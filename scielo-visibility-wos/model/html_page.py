@@ -0,0 +1,148 @@
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'}
+
+
+class HtmlNode:
+    __slots__ = ('tag', 'attrs', 'parent', 'children', 'text_parts')
+
+    def __init__(self, tag, attrs, parent=None):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children = []
+        self.text_parts = []
+
+    @property
+    def text(self):
+        # Equivale ao texto exibido pelo navegador, com espaços normalizados
+        return ' '.join(''.join(self.text_parts).split())
+
+    @property
+    def classes(self):
+        return self.attrs.get('class', '').split()
+
+    def iter(self):
+        yield self
+        for c in self.children:
+            yield from c.iter()
+
+    def find(self, tag=None, **attrs):
+        for node in self.find_all(tag, **attrs):
+            return node
+
+    def find_all(self, tag=None, class_name=None, **attrs):
+        for node in self.iter():
+            if tag and node.tag != tag:
+                continue
+            if class_name and class_name not in node.classes:
+                continue
+            if any(node.attrs.get(k) != v for k, v in attrs.items()):
+                continue
+            yield node
+
+    def ancestor(self, tag):
+        node = self.parent
+        while node is not None and node.tag != tag:
+            node = node.parent
+        return node
+
+
+class HtmlPage(HTMLParser):
+    """
+    Representação mínima, em árvore, de uma página HTML, suficiente para localizar elementos por id, classe, texto
+    de link e para preencher e submeter formulários sem navegador.
+    """
+    def __init__(self, url, html):
+        super().__init__(convert_charrefs=True)
+        self.url = url
+        self.root = HtmlNode('document', {})
+        self._stack = [self.root]
+        self.feed(html)
+        self.close()
+
+    def handle_starttag(self, tag, attrs):
+        node = HtmlNode(tag, {k: (v if v is not None else '') for k, v in attrs}, self._stack[-1])
+        self._stack[-1].children.append(node)
+        if tag not in VOID_TAGS:
+            self._stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        node = HtmlNode(tag, {k: (v if v is not None else '') for k, v in attrs}, self._stack[-1])
+        self._stack[-1].children.append(node)
+
+    def handle_endtag(self, tag):
+        for i in range(len(self._stack) - 1, 0, -1):
+            if self._stack[i].tag == tag:
+                del self._stack[i:]
+                break
+
+    def handle_data(self, data):
+        for node in self._stack:
+            node.text_parts.append(data)
+
+    def by_id(self, element_id):
+        return self.root.find(id=element_id)
+
+    def by_class(self, class_name, tag=None):
+        return next(self.root.find_all(tag, class_name=class_name), None)
+
+    def link_by_text(self, text):
+        for node in self.root.find_all('a'):
+            if node.text == text:
+                return node
+
+    def absolute_url(self, href):
+        return urljoin(self.url, href)
+
+
+def form_data(form, clicked=None):
+    """
+    Obtém os pares (nome, valor) que um navegador enviaria ao submeter form por meio do botão clicked.
+    """
+    data = []
+
+    for node in form.iter():
+        name = node.attrs.get('name')
+        if not name:
+            continue
+
+        if node.tag == 'input':
+            input_type = node.attrs.get('type', 'text').lower()
+            if input_type in ('checkbox', 'radio'):
+                if 'checked' in node.attrs:
+                    data.append((name, node.attrs.get('value', 'on')))
+            elif input_type not in ('submit', 'image', 'button', 'reset', 'file'):
+                data.append((name, node.attrs.get('value', '')))
+
+        elif node.tag == 'textarea':
+            data.append((name, node.attrs.get('value', ''.join(node.text_parts))))
+
+        elif node.tag == 'select':
+            options = list(node.find_all('option'))
+            selected = [o for o in options if 'selected' in o.attrs]
+            if not selected and options and 'multiple' not in node.attrs:
+                selected = options[:1]
+            for o in selected:
+                data.append((name, o.attrs.get('value', o.text)))
+
+    if clicked is not None and clicked.attrs.get('name'):
+        data.append((clicked.attrs['name'], clicked.attrs.get('value', '')))
+
+    return data
+
+
+def set_checked(node, checked):
+    if checked:
+        node.attrs['checked'] = ''
+    else:
+        node.attrs.pop('checked', None)
+
+
+def set_selected(node, selected):
+    if selected:
+        node.attrs['selected'] = ''
+    else:
+        node.attrs.pop('selected', None)
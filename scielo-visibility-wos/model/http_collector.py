@@ -0,0 +1,258 @@
+import os
+import re
+import threading
+
+from model.collector import WosCollector, WOS_CIT_ANALYSIS_NAMES, WOS_HOME_URL, WOS_INTERACTION_ERROR, WOS_INTERACTION_SUCCESS, \
+    WOS_NEXT_PAGE_CLASS, WOS_RECORD_ID_PREFIX, WOS_SUMMARY_SOURCE_TITLE_TAG
+from model.html_page import HtmlPage, form_data, set_checked, set_selected
+from requests import RequestException, Session
+from requests.adapters import HTTPAdapter
+from string_processor import preprocess_wos_source_title
+from time import monotonic, sleep
+from urllib3.util.retry import Retry
+from util import PATTERN_YEAR
+
+
+HTTP_USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.4389.23 Safari/537.36'
+
+# Primeira coluna do cabeçalho de cada relatório de análise de citações
+WOS_CIT_ANALYSIS_HEADERS = {'SO_SourceTitle_SourceTitle_en': 'Source Titles', 'SE_BookSeries_BookSeries_en': 'Book Series Titles'}
+
+# As buscas e os relatórios são submetidos por POST, que o urllib3 não repete por padrão
+HTTP_RETRY_METHODS = frozenset(['HEAD', 'GET', 'OPTIONS', 'POST'])
+HTTP_RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+
+class WosPageError(Exception):
+    """
+    Indica que a página obtida não contém o elemento esperado.
+    """
+
+
+class RateLimiter:
+    """
+    Garante um intervalo mínimo entre requisições, inclusive quando compartilhado entre sessões.
+    """
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self.next_request = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = monotonic()
+            delay = self.next_request - now
+            self.next_request = max(now, self.next_request) + self.min_interval
+
+        if delay > 0:
+            sleep(delay)
+
+
+def http_retry(total, backoff_factor=0.5):
+    """
+    Política de novas tentativas das requisições, inclusive POST, para erros de conexão e respostas HTTP_RETRY_STATUSES.
+    """
+    try:
+        return Retry(total=total, backoff_factor=backoff_factor, status_forcelist=HTTP_RETRY_STATUSES, allowed_methods=HTTP_RETRY_METHODS)
+    except TypeError:
+        # Versões do urllib3 anteriores à 1.26 usam method_whitelist
+        return Retry(total=total, backoff_factor=backoff_factor, status_forcelist=HTTP_RETRY_STATUSES, method_whitelist=HTTP_RETRY_METHODS)
+
+
+class WosHttpCollector(WosCollector):
+    """
+    Coletor que reproduz, por requisições HTTP, as interações de WosRobot, sem abrir um navegador.
+    As páginas são interpretadas diretamente e os formulários são submetidos com os mesmos campos que o navegador enviaria.
+    """
+    recoverable_errors = (RequestException, WosPageError)
+
+    def __init__(self, base_url=WOS_HOME_URL):
+        super().__init__()
+        self.base_url = base_url
+        self.session = None
+        self.http_timeout = 60
+        self.http_retries = 3
+        self.http_pool_size = 10
+        self.rate_limiter = RateLimiter(min_interval=0.5)
+
+    def has_session(self):
+        return self.session is not None
+
+    def open_session(self):
+        retry = http_retry(self.http_retries)
+        adapter = HTTPAdapter(pool_connections=self.http_pool_size, pool_maxsize=self.http_pool_size, max_retries=retry)
+
+        self.session = Session()
+        self.session.headers['User-Agent'] = HTTP_USER_AGENT
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close_session(self):
+        self.session.close()
+        self.session = None
+
+    def _detach_session(self):
+        self.session = None
+
+    def search_issns(self, source_title, year):
+        page = self._open_advanced_search()
+        page = self._search(page, 'PY=' + year + ' AND SO=({0})'.format(source_title))
+
+        summary = self._open_result(page)
+        if summary is not None:
+            return WOS_INTERACTION_SUCCESS, self._extract_issns(summary)
+        return WOS_INTERACTION_ERROR, []
+
+    def search_issns_batch(self, source_titles, year):
+        page = self._open_advanced_search()
+        page = self._search(page, self.batch_query(source_titles, year))
+
+        summary = self._open_result(page)
+        if summary is None:
+            return WOS_INTERACTION_ERROR, {}, True
+
+        # Percorre as páginas de resultados guardando, para cada título buscado, o link de um de seus registros
+        pending = {preprocess_wos_source_title(st) for st in source_titles}
+        record_links = {}
+        complete = False
+
+        for _ in range(self.wos_batch_max_pages):
+            for record in summary.root.find_all('div'):
+                if not record.attrs.get('id', '').startswith(WOS_RECORD_ID_PREFIX):
+                    continue
+
+                record_title = preprocess_wos_source_title(self._required(record.find(WOS_SUMMARY_SOURCE_TITLE_TAG), WOS_SUMMARY_SOURCE_TITLE_TAG).text)
+                if record_title in pending and record_title not in record_links:
+                    record_links[record_title] = summary.absolute_url(self._required(record.find('a'), 'record link').attrs['href'])
+
+            if len(record_links) == len(pending):
+                break
+
+            next_page = summary.by_class(WOS_NEXT_PAGE_CLASS, 'a')
+            if next_page is None or not next_page.attrs.get('href'):
+                complete = True
+                break
+
+            with self.latency_stats.measure('next_page'):
+                summary = self._get_page(summary.absolute_url(next_page.attrs['href']))
+
+        found = {}
+        for record_title, link in record_links.items():
+            with self.latency_stats.measure('open_record'):
+                found[record_title] = self._read_record_issns(self._get_page(link))
+
+        return WOS_INTERACTION_SUCCESS, found, complete
+
+    def collect_citation_report(self, sf):
+        page = self._open_advanced_search()
+        page = self._search(page, str(sf))
+
+        summary = self._open_result(page)
+        if summary is not None:
+            with self.latency_stats.measure('open_cit_report'):
+                link = self._required(summary.by_class('create-cite-report'), 'create-cite-report').find('a')
+                report_page = self._get_page(summary.absolute_url(self._required(link, 'create-cite-report link').attrs['href']))
+
+            for ca in WOS_CIT_ANALYSIS_NAMES:
+                self._save_cit_report(report_page, ca, sf)
+
+    def _request(self, method, url, **kwargs):
+        self.rate_limiter.wait()
+        response = self.session.request(method, url, timeout=self.http_timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def _get_page(self, url):
+        response = self._request('GET', url)
+        return HtmlPage(response.url, response.text)
+
+    def _submit(self, page, form, clicked=None):
+        action = page.absolute_url(form.attrs.get('action', page.url))
+        data = form_data(form, clicked)
+
+        if form.attrs.get('method', 'get').lower() == 'post':
+            return self._request('POST', action, data=data)
+        return self._request('GET', action, params=data)
+
+    def _required(self, node, description):
+        if node is None:
+            raise WosPageError('Element not found: %s' % description)
+        return node
+
+    def _open_advanced_search(self):
+        with self.latency_stats.measure('open_advanced_search'):
+            home = self._get_page(self.base_url)
+            link = self._required(home.link_by_text('Advanced Search'), 'Advanced Search')
+            return self._get_page(home.absolute_url(link.attrs['href']))
+
+    def _search(self, page, text):
+        search_box = self._required(page.by_class('Adv_formBoxesSearch'), 'Adv_formBoxesSearch')
+        search_box.attrs['value'] = text
+        form = self._required(search_box.ancestor('form'), 'search form')
+
+        for option in form.find_all('option'):
+            if option.parent.attrs.get('name') == 'value(input3)' and option.text in self.wos_result_types:
+                set_selected(option, True)
+
+        for wi in self.wos_indexes:
+            set_checked(self._required(form.find(id=wi), wi), wi == self.wos_selected_index)
+
+        with self.latency_stats.measure('search'):
+            response = self._submit(page, form, form.find(id='search-button'))
+            return HtmlPage(response.url, response.text)
+
+    def _open_result(self, page):
+        history_results = self._required(page.by_class('historyResults'), 'historyResults')
+        if history_results.text != '0':
+            with self.latency_stats.measure('open_result'):
+                link = self._required(history_results.find('a'), 'historyResults link')
+                return self._get_page(page.absolute_url(link.attrs['href']))
+
+    def _extract_issns(self, summary):
+        with self.latency_stats.measure('open_record'):
+            link = self._required(self._required(summary.by_id('RECORD_1'), 'RECORD_1').find('a'), 'RECORD_1 link')
+            record = self._get_page(summary.absolute_url(link.attrs['href']))
+
+        return self._read_record_issns(record)
+
+    def _read_record_issns(self, record):
+        st_results = []
+
+        # Campos ocultos por "See more data fields" já estão presentes no HTML
+        for i in record.root.find_all('p', class_name='FR_field'):
+            if 'ISSN' in i.text:
+                issn = i.text.split(': ')[-1]
+                if issn:
+                    st_results.append(issn)
+
+        return st_results
+
+    def _check_cit_report(self, report, ca):
+        # Uma página HTML com status 200 (sessão expirada, redirecionamento para login) não pode ser salva como relatório
+        content_type = report.headers.get('Content-Type', '')
+        disposition = report.headers.get('Content-Disposition', '')
+        first_line = report.content.split(b'\n', 1)[0].decode('utf-8-sig', 'replace')
+
+        if not content_type.startswith('text/plain') or 'attachment' not in disposition.lower() \
+                or WOS_CIT_ANALYSIS_HEADERS[ca] not in first_line:
+            raise WosPageError('Invalid citation report %s (%s, %s)' % (ca, content_type or 'no content type', disposition or 'no attachment'))
+
+    def _save_cit_report(self, report_page, ca, sf):
+        with self.latency_stats.measure('save_cit_report'):
+            button = self._required(report_page.root.find('button', value=ca), ca)
+            response = self._submit(report_page, self._required(button.ancestor('form'), ca + ' form'), button)
+            save_page = HtmlPage(response.url, response.text)
+
+            save_what_all = self._required(save_page.by_id('save_what_all_bottom'), 'save_what_all_bottom')
+            for radio in save_page.root.find_all('input', name=save_what_all.attrs.get('name')):
+                set_checked(radio, radio is save_what_all)
+
+            save = self._required(save_page.by_id('save'), 'save')
+            report = self._submit(save_page, self._required(save.ancestor('form'), 'save form'), save)
+            self._check_cit_report(report, ca)
+
+        year = re.search(PATTERN_YEAR, str(sf)).group()
+        cat = 'book' if 'book' in ca.lower() else 'source'
+
+        with open(os.path.join(self.results_directory, '%s-%s.txt' % (cat, year)), 'wb') as f:
+            f.write(report.content)
@@ -0,0 +1,64 @@
+import bisect
+import json
+import logging
+import threading
+
+from contextlib import contextmanager
+from time import monotonic
+
+
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0]
+
+
+class LatencyStats:
+    """
+    Registra a latência de cada etapa de interação e a resume em histogramas por etapa.
+    Pode ser compartilhado entre sessões executadas em threads distintas.
+    """
+    def __init__(self):
+        self.latencies = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, step):
+        start = monotonic()
+        try:
+            yield
+        finally:
+            self.record(step, monotonic() - start)
+
+    def record(self, step, seconds):
+        with self.lock:
+            if step not in self.latencies:
+                self.latencies[step] = []
+            self.latencies[step].append(seconds)
+
+    def summary(self):
+        summary = {}
+
+        with self.lock:
+            for step, values in sorted(self.latencies.items()):
+                ordered = sorted(values)
+
+                histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+                for v in ordered:
+                    histogram[bisect.bisect_left(LATENCY_BUCKETS, v)] += 1
+
+                summary[step] = {'count': len(ordered),
+                                 'mean': sum(ordered) / len(ordered),
+                                 'p50': ordered[int(0.50 * (len(ordered) - 1))],
+                                 'p90': ordered[int(0.90 * (len(ordered) - 1))],
+                                 'max': ordered[-1],
+                                 'buckets': [str(b) for b in LATENCY_BUCKETS] + ['inf'],
+                                 'histogram': histogram}
+
+        return summary
+
+    def dump(self, path):
+        summary = self.summary()
+
+        for step, s in summary.items():
+            logging.info('Latency %s: count=%d mean=%.3fs p50=%.3fs p90=%.3fs max=%.3fs' % (step, s['count'], s['mean'], s['p50'], s['p90'], s['max']))
+
+        with open(path, 'w') as f:
+            json.dump(summary, f, indent=2)
@@ -0,0 +1,211 @@
+import http.client
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+# Prefixo do endereço de um serviço de consulta em socket unix (por exemplo, unix:/tmp/lookup.sock)
+UNIX_ADDRESS_PREFIX = 'unix:'
+
+# Quantidade máxima de chaves enviadas em cada requisição de LookupClient.query
+LOOKUP_BATCH_SIZE = 5000
+
+
+class LookupServiceError(Exception):
+    """
+    Indica que o serviço de consulta recusou ou não concluiu uma consulta.
+    """
+
+
+class LookupService:
+    """
+    Responde consultas sobre dicionários já carregados em memória. Cada operação é uma função que recebe uma chave
+    (título, ISSN ou lista serializável em JSON) e devolve um valor serializável em JSON.
+    """
+    def __init__(self, operations, inputs=None):
+        self.operations = operations
+        self.inputs = inputs or {}
+        self.queries = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, operation, keys):
+        function = self.operations.get(operation)
+        if function is None:
+            raise LookupServiceError('Operação indisponível: %s' % operation)
+
+        with self.lock:
+            self.queries += len(keys)
+
+        return [function(k) for k in keys]
+
+    def status(self):
+        return {'operations': sorted(self.operations), 'inputs': self.inputs, 'queries': self.queries}
+
+
+class LookupRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /status                    operações disponíveis, arquivos carregados e quantidade de consultas
+    GET /<operação>?q=<chave>      consulta de uma chave
+    POST /lookup                   consulta em lote, com corpo {"operation": ..., "keys": [...]}
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        operation = url.path.strip('/')
+
+        if operation == 'status':
+            self._reply(200, self.server.service.status())
+            return
+
+        keys = parse_qs(url.query).get('q', [])
+        self._lookup(operation, keys, single=True)
+
+    def do_POST(self):
+        if urlsplit(self.path).path != '/lookup':
+            self._reply(404, {'error': 'Recurso inexistente: %s' % self.path})
+            return
+
+        try:
+            query = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            operation, keys = query['operation'], query['keys']
+        except (ValueError, KeyError, TypeError):
+            self._reply(400, {'error': 'Consulta malformada'})
+            return
+
+        self._lookup(operation, keys)
+
+    def _lookup(self, operation, keys, single=False):
+        try:
+            results = self.server.service.lookup(operation, keys)
+        except LookupServiceError as e:
+            self._reply(400, {'error': str(e)})
+            return
+        except (AttributeError, IndexError, TypeError):
+            self._reply(400, {'error': 'Chave malformada para a operação %s' % operation})
+            return
+
+        if single:
+            self._reply(200, {'result': results[0] if results else None})
+        else:
+            self._reply(200, {'results': results})
+
+    def _reply(self, status, data):
+        body = json.dumps(data).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Em socket unix, o endereço do cliente é vazio
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logging.debug('%s %s' % (self.address_string(), format % args))
+
+
+class UnixLookupRequestHandler(LookupRequestHandler):
+    # TCP_NODELAY não se aplica a sockets unix
+    disable_nagle_algorithm = False
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_lookup_server(service, address):
+    """
+    Cria o servidor HTTP do serviço de consulta.
+    :param service: LookupService
+    :param address: caminho de socket unix, com prefixo unix:, ou porta TCP, como 8765 ou 127.0.0.1:8765
+        (o servidor TCP atende apenas em 127.0.0.1)
+    """
+    if address.startswith(UNIX_ADDRESS_PREFIX):
+        path = address[len(UNIX_ADDRESS_PREFIX):]
+        if os.path.exists(path):
+            os.remove(path)
+        server = UnixHTTPServer(path, UnixLookupRequestHandler)
+    else:
+        server = ThreadingHTTPServer(('127.0.0.1', int(address.rsplit(':', 1)[-1])), LookupRequestHandler)
+        server.daemon_threads = True
+
+    server.service = service
+    return server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__('localhost')
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+class LookupClient:
+    """
+    Cliente do serviço de consulta (ver lookup_server.py). A conexão é mantida aberta entre consultas e recriada
+    em cada processo filho, de modo que o cliente pode ser compartilhado com imap_chunks.
+    :param address: unix:<caminho do socket>, <host>:<porta> ou http://<host>:<porta>
+    """
+    def __init__(self, address):
+        self.address = address
+        self._connection = None
+        self._pid = None
+
+    def _connect(self):
+        if self._connection is None or self._pid != os.getpid():
+            if self.address.startswith(UNIX_ADDRESS_PREFIX):
+                self._connection = UnixHTTPConnection(self.address[len(UNIX_ADDRESS_PREFIX):])
+            else:
+                self._connection = http.client.HTTPConnection(self.address.split('://')[-1])
+            self._pid = os.getpid()
+        return self._connection
+
+    def _request(self, method, path, body=None):
+        connection = self._connect()
+        headers = {'Content-Type': 'application/json'} if body else {}
+
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            data = json.loads(response.read())
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            raise LookupServiceError('Falha ao consultar o serviço em %s: %s' % (self.address, e))
+
+        if response.status != 200:
+            raise LookupServiceError(data.get('error', 'HTTP %d' % response.status))
+
+        return data
+
+    def status(self):
+        return self._request('GET', '/status')
+
+    def query(self, operation, keys):
+        """
+        Consulta as chaves em lotes de até LOOKUP_BATCH_SIZE.
+        :return: lista de resultados, na ordem de keys
+        """
+        results = []
+        for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            body = json.dumps({'operation': operation, 'keys': keys[start:start + LOOKUP_BATCH_SIZE]}).encode()
+            results.extend(self._request('POST', '/lookup', body)['results'])
+        return results
+
+    def resolver(self, operation):
+        """
+        Obtém a função que consulta, em lote, uma lista de chaves (ver ResolutionCache).
+        """
+        return lambda keys: self.query(operation, list(keys))
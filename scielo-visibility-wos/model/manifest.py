@@ -0,0 +1,134 @@
+import hashlib
+import json
+import logging
+import os
+
+from util import list_source_title_files, read_source_titles, source_title_file_year
+
+
+MANIFEST_VERSION = 2
+
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class GoldManifest:
+    """
+    Registra, ao lado do arquivo gold, o conteúdo dos dados de entrada usados para gerá-lo:
+        - o resumo (hash) de cada arquivo de Source Titles
+        - o resumo dos arquivos de Master Journal List, de títulos base e de ISSNs coletados
+        - o resumo dos dados de entrada de cada título enriquecido (ver WosEnricher.title_digest)
+    """
+    def __init__(self, path):
+        self.path = path
+        self.index = ''
+        self.columns = 0
+        self.inputs = {}
+        self.source_titles = {}
+        self.titles = {}
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return None
+
+        with open(path) as f:
+            data = json.load(f)
+
+        if data.get('version') != MANIFEST_VERSION:
+            return None
+
+        manifest = cls(path)
+        manifest.index = data['index']
+        manifest.columns = data['columns']
+        manifest.inputs = data['inputs']
+        manifest.source_titles = data['source_titles']
+        manifest.titles = data['titles']
+        return manifest
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION,
+                       'index': self.index,
+                       'columns': self.columns,
+                       'inputs': self.inputs,
+                       'source_titles': self.source_titles,
+                       'titles': self.titles}, f)
+
+
+def manifest_path(enricher):
+    return enricher.gold_data_path().replace('.csv', '.manifest.json')
+
+
+def enrich_incrementally(enricher, path_source_titles, input_paths, wos_title_to_issn=None, workers=1):
+    """
+    Enriquece apenas as linhas afetadas por alterações nos dados de entrada desde a geração do arquivo gold atual e
+    as mescla aos resultados desse arquivo. São reenriquecidas as linhas de arquivos de Source Titles novos ou
+    alterados (os arquivos de um mesmo ano são relidos em conjunto) e as linhas dos títulos cujos dados de
+    Master Journal List, de títulos base ou de ISSNs coletados mudaram. Sem arquivo gold e manifesto compatíveis,
+    todos os dados são enriquecidos.
+    :param enricher: WosEnricher com core_titles e base_titles carregados
+    :param path_source_titles: diretório de arquivos de Source Titles
+    :param input_paths: dicionário com os caminhos de core_titles, base_titles e gathered_issns (este opcional)
+    :param wos_title_to_issn: ISSNs coletados na WoS, se houver
+    :param workers: quantidade de processos usados no enriquecimento
+    :return: manifesto dos dados atuais, a ser salvo após o arquivo gold
+    """
+    previous = GoldManifest.load(manifest_path(enricher))
+    current = GoldManifest(manifest_path(enricher))
+    current.index = enricher.index
+    # O formato do arquivo gold depende do uso de ISSNs coletados (um arquivo de ISSNs coletados vazio equivale à
+    # ausência desse arquivo, como em WosEnricher)
+    current.columns = 8 if wos_title_to_issn else 6
+
+    files = list_source_title_files(path_source_titles)
+    current.source_titles = {os.path.basename(f): file_digest(f) for f in files}
+    current.inputs = {k: file_digest(v) if v else None for k, v in input_paths.items()}
+
+    compatible = previous is not None and previous.index == enricher.index and os.path.exists(enricher.gold_data_path()) and \
+        previous.columns == current.columns
+
+    if not compatible:
+        logging.info('Manifesto inexistente ou incompatível, todos os dados serão enriquecidos')
+        enricher.source_titles = read_source_titles(path_source_titles, files)
+        enricher.enrich_source_titles(wos_title_to_issn, workers=workers)
+        current.titles = {v[0]: enricher.title_digest(v[0], wos_title_to_issn) for v in enricher.results.values()}
+        return current
+
+    enricher.load_gold_data(previous.columns)
+
+    changed = [b for b, d in current.source_titles.items() if previous.source_titles.get(b) != d]
+    removed = [b for b in previous.source_titles if b not in current.source_titles]
+    changed_years = {source_title_file_year(b) for b in changed + removed}
+
+    enricher.drop_years(changed_years)
+    enricher.source_titles = read_source_titles(path_source_titles, [f for f in files if source_title_file_year(f) in changed_years])
+    logging.info('%d arquivos de Source Titles novos, alterados ou removidos (anos %s)' % (len(changed) + len(removed), ', '.join(sorted(changed_years))))
+
+    # Títulos dos anos mantidos são reenriquecidos apenas quando seus dados de entrada mudaram
+    affected_titles = set()
+    if current.inputs != previous.inputs:
+        for v in enricher.results.values():
+            title = v[0]
+            if title not in current.titles:
+                current.titles[title] = enricher.title_digest(title, wos_title_to_issn)
+                if current.titles[title] != previous.titles.get(title):
+                    affected_titles.add(title)
+    else:
+        current.titles = {v[0]: previous.titles[v[0]] for v in enricher.results.values() if v[0] in previous.titles}
+
+    enricher.source_titles.extend((v[0], v[1], v[2]) for v in enricher.results.values() if v[0] in affected_titles)
+    logging.info('%d títulos afetados por alterações nos dados de entrada, %d linhas a enriquecer' % (len(affected_titles), len(enricher.source_titles)))
+
+    enricher.enrich_source_titles(wos_title_to_issn, workers=workers)
+
+    for v in enricher.results.values():
+        if v[0] not in current.titles:
+            current.titles[v[0]] = enricher.title_digest(v[0], wos_title_to_issn)
+
+    return current
@@ -0,0 +1,106 @@
+import cProfile
+import json
+import logging
+import resource
+
+from collections import Counter
+from contextlib import contextmanager
+from model.resolution import resolution_stats
+from time import perf_counter
+
+
+# Caminhos de associação contabilizados no enriquecimento
+MATCH_PATHS = ['mjl_issn', 'mjl_eissn', 'title', 'similar_title', 'no_match', 'multiple_issnls', 'multiple_countries']
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # No Linux, ru_maxrss é informado em kilobytes
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+class RunMetrics:
+    """
+    Coleta o tempo e o pico de memória de cada etapa de uma execução, além dos contadores de caminhos de associação
+    e do cache de resolução de títulos.
+    Etapas podem ser aninhadas ou intercaladas (por exemplo, geradores encadeados); o tempo de uma etapa exclui
+    o tempo das etapas internas a ela.
+    """
+    def __init__(self):
+        self.stages = {}
+        self.counters = Counter()
+        self._active = []
+
+    def _enter(self, name):
+        self._active.append([name, perf_counter(), 0.0])
+
+    def _exit(self):
+        name, start, inner = self._active.pop()
+        elapsed = perf_counter() - start
+        if self._active:
+            self._active[-1][2] += elapsed
+
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'peak_rss_mb': 0.0})
+        stage['seconds'] += elapsed - inner
+        return stage
+
+    @contextmanager
+    def stage(self, name):
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit()['peak_rss_mb'] = peak_rss_mb()
+
+    def iter_stage(self, name, iterable):
+        """
+        Contabiliza em name o tempo gasto para produzir cada item de iterable.
+        """
+        iterator = iter(iterable)
+        while True:
+            self._enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._exit()['peak_rss_mb'] = peak_rss_mb()
+                return
+            except BaseException:
+                self._exit()
+                raise
+            self._exit()
+            yield item
+
+    def report(self):
+        return {'stages': {k: {'seconds': round(v['seconds'], 4), 'peak_rss_mb': round(v['peak_rss_mb'], 1)} for k, v in self.stages.items()},
+                'peak_rss_mb': round(peak_rss_mb(), 1),
+                'peak_children_rss_mb': round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+                'match_paths': {k: self.counters.get(k, 0) for k in MATCH_PATHS},
+                'resolution_cache': resolution_stats(self.counters)}
+
+    def dump(self, path=None):
+        report = self.report()
+
+        for name, stage in report['stages'].items():
+            logging.info('Etapa %s: %.3fs, pico de memória %.1f MB' % (name, stage['seconds'], stage['peak_rss_mb']))
+        logging.info('Caminhos de associação: %s' % ', '.join('%s=%d' % kv for kv in report['match_paths'].items()))
+
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+
+@contextmanager
+def profiled(path):
+    """
+    Executa o bloco sob cProfile e salva as estatísticas em path. Sem path, o bloco é executado normalmente.
+    """
+    if not path:
+        yield
+        return
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
@@ -0,0 +1,52 @@
+import multiprocessing
+
+from collections import deque
+from itertools import islice
+
+
+# Estado compartilhado com os processos filhos. Como os processos são criados por fork, os objetos aqui
+# referenciados (por exemplo, os dicionários de ISSN) são herdados por cópia sob demanda e não são serializados
+_shared = {}
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def _run_shared(chunk):
+    return _shared['function'](chunk, *_shared['args'])
+
+
+def imap_chunks(function, args, chunks, workers=1):
+    """
+    Aplica function(chunk, *args) a cada bloco de chunks, em um pool de processos.
+    Os resultados são devolvidos na mesma ordem dos blocos e, no máximo, 2 * workers blocos ficam pendentes.
+    :param function: função a ser aplicada a cada bloco
+    :param args: argumentos adicionais de function, compartilhados (e não serializados) com os processos filhos
+    :param chunks: iterável de blocos
+    :param workers: quantidade de processos; com 1, os blocos são processados no processo atual
+    :return: gerador dos resultados de function
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield function(chunk, *args)
+        return
+
+    _shared.update(function=function, args=args)
+    pending = deque()
+
+    try:
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            for chunk in chunks:
+                pending.append(pool.apply_async(_run_shared, (chunk,)))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().get()
+
+            while pending:
+                yield pending.popleft().get()
+    finally:
+        _shared.clear()
@@ -0,0 +1,275 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+
+from model.manifest import file_digest
+
+
+PIPELINE_STATE_VERSION = 1
+PIPELINE_STATE_FILE = 'pipeline_state.json'
+
+STAGE_RUNNING = 'running'
+STAGE_FAILED_ITEMS = 'failed_items'
+STAGE_DONE = 'done'
+
+
+class PipelineError(Exception):
+    """
+    Indica que uma etapa do pipeline falhou ou não produziu os arquivos esperados.
+    """
+
+
+def path_digest(path):
+    """
+    Resume o conteúdo de um arquivo ou de um diretório (nomes e conteúdo de todos os seus arquivos).
+    :return: hash sha1, ou None quando path não existe
+    """
+    if os.path.isfile(path):
+        return file_digest(path)
+
+    if not os.path.isdir(path):
+        return None
+
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for f in sorted(files):
+            fullpath = os.path.join(root, f)
+            digest.update(('%s\t%s\n' % (os.path.relpath(fullpath, path), file_digest(fullpath))).encode())
+    return digest.hexdigest()
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def count_failed_items(path):
+    """
+    Conta os itens de um arquivo de falhas (ver FailedItems), inclusive os de um reprocessamento interrompido.
+    """
+    count = 0
+    for p in (path, path + '.replay'):
+        if os.path.exists(p):
+            with open(p) as f:
+                count += sum(1 for line in f if line.strip())
+    return count
+
+
+def _copy(source, destination):
+    _remove(destination)
+    if os.path.isdir(source):
+        shutil.copytree(source, destination)
+    else:
+        shutil.copy2(source, destination)
+
+
+class Stage:
+    """
+    Etapa do pipeline, executada como um processo (em geral, um dos scripts deste repositório).
+    :param name: nome da etapa
+    :param command: lista de argumentos do processo
+    :param inputs: arquivos e diretórios lidos pela etapa
+    :param outputs: arquivos e diretórios produzidos pela etapa
+    :param failures: arquivos de itens com falha (ver FailedItems); a etapa só é concluída quando estão vazios
+    :param replay_command: lista de argumentos do processo que reprocessa os itens com falha
+    """
+    def __init__(self, name, command, inputs, outputs, failures=(), replay_command=None):
+        self.name = name
+        self.command = command
+        self.inputs = inputs
+        self.outputs = outputs
+        self.failures = list(failures)
+        self.replay_command = replay_command
+
+    def fingerprint(self):
+        """
+        Resume o comando e o conteúdo atual das entradas. Uma etapa cujo resumo não mudou não precisa ser executada.
+        """
+        data = [self.command, [(p, path_digest(p)) for p in self.inputs]]
+        return hashlib.sha1(json.dumps(data).encode()).hexdigest()
+
+
+class Pipeline:
+    """
+    Executa etapas ordenadas por suas dependências: uma etapa depende das etapas que produzem as suas entradas.
+    O estado de cada etapa (resumo das entradas e das saídas) é mantido em pipeline_state.json, no diretório de
+    trabalho, e as saídas de cada execução são guardadas em artifact_cache, sob o resumo das entradas. Assim, uma
+    etapa é ignorada quando suas entradas e saídas não mudaram, e suas saídas são restauradas do cache quando as
+    entradas voltam a um conteúdo já processado.
+    """
+    def __init__(self, stages, work_dir, artifact_cache):
+        self.stages = stages
+        self.work_dir = work_dir
+        self.artifact_cache = artifact_cache
+        self.state_path = os.path.join(work_dir, PIPELINE_STATE_FILE)
+        self.state = self._load_state()
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                state = json.load(f)
+            if state.get('version') == PIPELINE_STATE_VERSION:
+                return state['stages']
+        return {}
+
+    def _save_state(self):
+        with open(self.state_path, 'w') as f:
+            json.dump({'version': PIPELINE_STATE_VERSION, 'stages': self.state}, f, indent=2)
+
+    def dependencies(self):
+        """
+        :return: dicionário nome da etapa -> nomes das etapas que produzem suas entradas
+        """
+        producers = {o: s.name for s in self.stages for o in s.outputs}
+        return {s.name: sorted({producers[i] for i in s.inputs if i in producers}) for s in self.stages}
+
+    def ordered_stages(self):
+        dependencies = self.dependencies()
+        stages = {s.name: s for s in self.stages}
+        ordered = []
+        visiting = set()
+
+        def visit(name):
+            if name in visiting:
+                raise PipelineError('Dependência circular na etapa %s' % name)
+            if stages[name] in ordered:
+                return
+            visiting.add(name)
+            for d in dependencies[name]:
+                visit(d)
+            visiting.remove(name)
+            ordered.append(stages[name])
+
+        for s in self.stages:
+            visit(s.name)
+
+        return ordered
+
+    def run(self, force=(), dry_run=False):
+        """
+        Executa as etapas desatualizadas.
+        :param force: nomes das etapas executadas mesmo quando atualizadas
+        :param dry_run: apenas informa as etapas que seriam executadas
+        """
+        dependencies = self.dependencies()
+        stale = set()
+
+        for stage in self.ordered_stages():
+            if dry_run and stale.intersection(dependencies[stage.name]):
+                # As entradas produzidas por etapas desatualizadas ainda não são conhecidas
+                stale.add(stage.name)
+                logging.info('Etapa %s seria executada (depende de %s)' % (stage.name, ', '.join(stale.intersection(dependencies[stage.name]))))
+                continue
+
+            fingerprint = stage.fingerprint()
+
+            if stage.name not in force:
+                if self._is_current(stage, fingerprint):
+                    logging.info('Etapa %s atualizada' % stage.name)
+                    continue
+
+                if dry_run and self._is_cached(stage, fingerprint):
+                    stale.add(stage.name)
+                    logging.info('Etapa %s seria restaurada do cache de artefatos' % stage.name)
+                    continue
+
+                if not dry_run and self._restore(stage, fingerprint):
+                    logging.info('Etapa %s restaurada do cache de artefatos' % stage.name)
+                    continue
+
+            stale.add(stage.name)
+            if dry_run:
+                logging.info('Etapa %s seria executada' % stage.name)
+                continue
+
+            self._run_stage(stage, fingerprint)
+
+    def _is_current(self, stage, fingerprint):
+        state = self.state.get(stage.name)
+        if not state or state['status'] != STAGE_DONE or state['fingerprint'] != fingerprint:
+            return False
+        return all(path_digest(o) == state['outputs'].get(o) for o in stage.outputs)
+
+    def _cached_directory(self, stage, fingerprint):
+        return os.path.join(self.artifact_cache, stage.name, fingerprint)
+
+    def _cached_names(self, stage):
+        return ['%d-%s' % (i, os.path.basename(o.rstrip(os.sep))) for i, o in enumerate(stage.outputs)]
+
+    def _is_cached(self, stage, fingerprint):
+        return os.path.isdir(self._cached_directory(stage, fingerprint))
+
+    def _restore(self, stage, fingerprint):
+        if not self._is_cached(stage, fingerprint):
+            return False
+
+        directory = self._cached_directory(stage, fingerprint)
+        for name, o in zip(self._cached_names(stage), stage.outputs):
+            _copy(os.path.join(directory, name), o)
+        self._record(stage, fingerprint, STAGE_DONE)
+        return True
+
+    def _store(self, stage, fingerprint):
+        # As saídas são copiadas para um diretório temporário, renomeado apenas ao final da cópia
+        directory = self._cached_directory(stage, fingerprint)
+        temporary = directory + '.tmp'
+        _remove(temporary)
+        os.makedirs(temporary)
+
+        for name, o in zip(self._cached_names(stage), stage.outputs):
+            _copy(o, os.path.join(temporary, name))
+
+        _remove(directory)
+        os.rename(temporary, directory)
+
+    def _record(self, stage, fingerprint, status):
+        outputs = {o: path_digest(o) for o in stage.outputs} if status == STAGE_DONE else {}
+        self.state[stage.name] = {'status': status, 'fingerprint': fingerprint, 'outputs': outputs}
+        self._save_state()
+
+    def _run_stage(self, stage, fingerprint):
+        state = self.state.get(stage.name)
+        resumed = state and state['status'] in (STAGE_RUNNING, STAGE_FAILED_ITEMS) and state['fingerprint'] == fingerprint
+
+        # Saídas parciais de uma execução interrompida com as mesmas entradas são mantidas, e a etapa continua de
+        # onde parou (por exemplo, a coleta de ISSNs); as demais saídas, e os itens com falha, são descartados
+        if not resumed:
+            for o in stage.outputs + stage.failures:
+                _remove(o)
+
+        # Uma etapa cujo comando terminou com itens com falha é retomada apenas com o reprocessamento desses itens
+        if not (resumed and state['status'] == STAGE_FAILED_ITEMS and stage.replay_command):
+            self._record(stage, fingerprint, STAGE_RUNNING)
+            self._execute(stage, stage.command)
+
+        missing = [o for o in stage.outputs if not os.path.exists(o)]
+        if missing:
+            raise PipelineError('Etapa %s não produziu %s' % (stage.name, ', '.join(missing)))
+
+        if self._failed_items(stage) and stage.replay_command:
+            self._record(stage, fingerprint, STAGE_FAILED_ITEMS)
+            self._execute(stage, stage.replay_command)
+
+        failed = self._failed_items(stage)
+        if failed:
+            self._record(stage, fingerprint, STAGE_FAILED_ITEMS)
+            raise PipelineError('Etapa %s terminou com %d itens com falha em %s; eles serão reprocessados na próxima '
+                                'execução' % (stage.name, failed, ', '.join(stage.failures)))
+
+        self._store(stage, fingerprint)
+        self._record(stage, fingerprint, STAGE_DONE)
+
+    def _execute(self, stage, command):
+        logging.info('Executando etapa %s: %s' % (stage.name, ' '.join(command)))
+        completed = subprocess.run(command, cwd=self.work_dir)
+        if completed.returncode != 0:
+            raise PipelineError('Etapa %s falhou (código %d)' % (stage.name, completed.returncode))
+
+    def _failed_items(self, stage):
+        return sum(count_failed_items(f) for f in stage.failures)
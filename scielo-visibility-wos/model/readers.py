@@ -0,0 +1,152 @@
+import csv
+import gc
+import os
+import re
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+# Ano no nome do arquivo (por exemplo, source-1997.txt), desde que não faça parte de um número maior
+PATTERN_FILE_YEAR = r'(?<!\d)\d{4}(?!\d)'
+
+# Tamanho de cada leitura e quantidade de arquivos lidos ao mesmo tempo
+READ_BLOCK_SIZE = 4 * 1024 * 1024
+READER_THREADS = min(8, os.cpu_count() or 1)
+
+SEARCHED_FIELDS_COUNT = 3
+
+SourceTitleRow = namedtuple('SourceTitleRow', ['title', 'records', 'year'])
+
+
+def file_year(path):
+    """
+    Obtém o ano de um arquivo de resultados a partir do seu nome, sem considerar os diretórios do caminho.
+    """
+    match = re.search(PATTERN_FILE_YEAR, os.path.basename(path))
+    if match is None:
+        raise ValueError('Arquivo sem ano no nome: %s' % path)
+    return match.group()
+
+
+@contextmanager
+def paused_gc():
+    """
+    Suspende a coleta de lixo enquanto todas as linhas são lidas. As linhas não formam ciclos, e as coletas disparadas
+    pela quantidade de objetos criados dominariam o tempo de leitura. Deve ser usado apenas pela thread que inicia a
+    leitura, e não pelas threads de leitura.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def iter_line_blocks(path, encoding=None, block_size=READ_BLOCK_SIZE, transform=None):
+    """
+    Lê um arquivo em blocos de block_size caracteres.
+    :param transform: função opcional aplicada a cada bloco lido, por exemplo str.upper
+    :return: gerador de listas de linhas completas, sem quebra de linha
+    """
+    with open(path, encoding=encoding, buffering=block_size) as f:
+        rest = ''
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+
+            if transform:
+                block = transform(block)
+
+            lines = (rest + block).split('\n')
+            rest = lines.pop()
+            yield lines
+
+        if rest:
+            yield [rest]
+
+
+def parse_source_titles(path):
+    """
+    Lê um relatório de Source Titles (colunas Source Titles e records). Linhas sem registros são ignoradas.
+    :return: lista de SourceTitleRow
+    """
+    year = file_year(path)
+
+    # O arquivo é lido diretamente pelo leitor de CSV, que trata títulos entre aspas com quebras de linha ou tabulações
+    with open(path, encoding='utf-8-sig', newline='', buffering=READ_BLOCK_SIZE) as f:
+        reader = csv.reader(f, delimiter='\t')
+
+        header = next(reader, None)
+        if header is None:
+            return []
+        title_field = header.index('Source Titles')
+        records_field = header.index('records')
+        min_length = max(title_field, records_field) + 1
+
+        return [SourceTitleRow(row[title_field], row[records_field], year)
+                for row in reader if len(row) >= min_length and row[records_field]]
+
+
+def parse_searched_results(path):
+    """
+    Lê um arquivo de resultados de busca (título, N e Percent), em maiúsculas, acrescentando o ano a cada linha.
+    Linhas com outra quantidade de colunas são ignoradas.
+    :return: lista de linhas [título, N, Percent, ano]
+    """
+    year = file_year(path)
+    rows = []
+    header = True
+
+    # A conversão para maiúsculas é feita uma única vez para cada bloco lido
+    for lines in iter_line_blocks(path, transform=str.upper):
+        if header:
+            # Ignora cabeçalho
+            lines = lines[1:]
+            header = False
+
+        block_rows = [row for row in [line.strip().split('\t') for line in lines] if len(row) == SEARCHED_FIELDS_COUNT]
+        for row in block_rows:
+            row.append(year)
+        rows.extend(block_rows)
+
+    return rows
+
+
+def iter_files(files, parse, threads=READER_THREADS):
+    """
+    Lê vários arquivos ao mesmo tempo, em threads, e produz as linhas na ordem dos arquivos. No máximo 2 * threads
+    arquivos lidos são mantidos em memória.
+    :param parse: função que lê um arquivo e retorna suas linhas
+    """
+    files = list(files)
+
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+        window = 2 * max(1, threads)
+        futures = [executor.submit(parse, f) for f in files[:window]]
+
+        for i in range(len(files)):
+            if i + window < len(files):
+                futures.append(executor.submit(parse, files[i + window]))
+
+            rows = futures[i].result()
+            futures[i] = None
+            yield from rows
+
+
+def read_source_title_files(files, threads=READER_THREADS):
+    with paused_gc():
+        return list(iter_files(files, parse_source_titles, threads))
+
+
+def iter_searched_results_files(files, threads=READER_THREADS):
+    return iter_files(files, parse_searched_results, threads)
+
+
+def read_searched_results_files(files, threads=READER_THREADS):
+    with paused_gc():
+        return list(iter_files(files, parse_searched_results, threads))
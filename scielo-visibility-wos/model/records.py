@@ -0,0 +1,64 @@
+import sys
+
+
+class RecordStore:
+    """
+    Armazena as linhas enriquecidas de WosEnricher em colunas, uma lista por campo, com strings internalizadas.
+    Títulos, anos, ISSNs e países repetidos em várias linhas ocupam memória uma única vez, e cada linha é
+    localizada por (ano, título) sem a criação de uma chave própria. A ordem de inserção das linhas é preservada.
+    """
+    def __init__(self):
+        self.columns = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def __contains__(self, title_year):
+        title, year = title_year
+        return title in self.positions.get(year, {})
+
+    def put(self, values):
+        """
+        Insere uma linha ou substitui a linha de mesmo título (campo 0) e ano (campo 2).
+        """
+        values = list(map(sys.intern, values))
+
+        if not self.columns:
+            self.columns = [[] for _ in values]
+
+        year_positions = self.positions.setdefault(values[2], {})
+        row = year_positions.get(values[0])
+
+        if row is None:
+            year_positions[values[0]] = len(self)
+            for column, v in zip(self.columns, values):
+                column.append(v)
+        else:
+            for column, v in zip(self.columns, values):
+                column[row] = v
+
+    def load_columns(self, columns):
+        """
+        Substitui o conteúdo por colunas já completas, sem títulos e anos repetidos (ver vectorized.enrich_source_titles_frame).
+        """
+        self.columns = [list(map(sys.intern, column)) for column in columns]
+        self.positions = {}
+        for row, (title, year) in enumerate(zip(self.columns[0], self.columns[2])):
+            self.positions.setdefault(year, {})[title] = row
+
+    def get(self, title, year):
+        row = self.positions.get(year, {}).get(title)
+        if row is not None:
+            return [column[row] for column in self.columns]
+
+    def values(self):
+        return zip(*self.columns)
+
+    def drop_years(self, years):
+        kept = [v for v in self.values() if v[2] not in years]
+
+        self.columns = []
+        self.positions = {}
+        for v in kept:
+            self.put(v)
@@ -0,0 +1,117 @@
+import logging
+import os
+import threading
+
+from queue import Queue, Empty
+from time import sleep
+
+
+# Arquivo, no diretório de resultados de cada índice, com os anos cujos relatórios já foram coletados
+COMPLETED_JOBS_FILE = 'citation_report_jobs.tsv'
+
+
+class CitationReportScheduler:
+    """
+    Distribui a coleta de relatórios de citação, com uma tarefa por par (índice, ano), entre várias sessões, cada
+    uma com sua própria cópia do coletor (WosRobot ou WosHttpCollector).
+    Uma tarefa que falha é repetida até max_attempts vezes, com espera crescente a partir de retry_delay segundos.
+    As tarefas concluídas são registradas em COMPLETED_JOBS_FILE, de modo que uma nova execução coleta apenas os
+    relatórios que faltam.
+    :param robot: coletor já inicializado no modo citation_report
+    :param indexes: índices da WoS, por exemplo ['AHCI', 'SSCI']
+    """
+    def __init__(self, robot, indexes, sessions=1, max_attempts=3, retry_delay=5):
+        self.robot = robot
+        self.indexes = [i.upper() for i in indexes]
+        self.sessions = sessions
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lock = threading.Lock()
+        self.failed = []
+
+    def results_directory(self, index):
+        return os.path.join(self.robot.download_directory, index.lower())
+
+    def jobs(self):
+        """
+        :return: lista de pares (índice, ano) ainda não coletados
+        """
+        jobs = []
+        for index in self.indexes:
+            completed = self._completed_years(index)
+            jobs.extend((index, year) for year in self.robot.wos_search_years if str(year) not in completed)
+        return jobs
+
+    def collect(self):
+        jobs = self.jobs()
+        total = len(self.indexes) * len(self.robot.wos_search_years)
+        if len(jobs) < total:
+            logging.info('Skipping %d already collected citation reports' % (total - len(jobs)))
+
+        work_queue = Queue()
+        for job in jobs:
+            work_queue.put(job)
+
+        sessions = [threading.Thread(target=self._run_session, args=(work_queue,))
+                    for _ in range(min(self.sessions, len(jobs)))]
+        for s in sessions:
+            s.start()
+        for s in sessions:
+            s.join()
+
+        for index, year in self.failed:
+            logging.error('Citation report not collected (%s, %s)' % (index, year))
+
+        self.robot.save_latency_stats('citation_report')
+
+    def _run_session(self, work_queue):
+        robot = self.robot.clone()
+
+        try:
+            while True:
+                try:
+                    index, year = work_queue.get_nowait()
+                except Empty:
+                    break
+
+                self._run_job(robot, index, year)
+        finally:
+            robot.close()
+
+    def _run_job(self, robot, index, year):
+        # Cada sessão coleta qualquer índice, trocando o índice selecionado e o diretório de resultados
+        robot.wos_selected_index = 'editionitem' + index
+        robot.results_directory = self.results_directory(index)
+        os.makedirs(robot.results_directory, exist_ok=True)
+
+        for attempt in range(1, self.max_attempts + 1):
+            logging.info('(%s, %s) collecting citation report, attempt %d' % (index, year, attempt))
+
+            try:
+                if not robot.has_session():
+                    robot.open_session()
+                robot.collect_citation_report(year)
+            except robot.recoverable_errors as e:
+                logging.warning('(%s, %s) citation report failed: %s' % (index, year, e))
+                if attempt < self.max_attempts:
+                    sleep(self.retry_delay * 2 ** (attempt - 1))
+                continue
+
+            self._save_completed(index, year)
+            return
+
+        with self.lock:
+            self.failed.append((index, year))
+
+    def _completed_years(self, index):
+        path = os.path.join(self.results_directory(index), COMPLETED_JOBS_FILE)
+        if not os.path.exists(path):
+            return set()
+
+        with open(path) as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def _save_completed(self, index, year):
+        with self.lock:
+            with open(os.path.join(self.results_directory(index), COMPLETED_JOBS_FILE), 'a') as f:
+                f.write('%s\n' % year)
@@ -0,0 +1,52 @@
+RESOLUTION_HITS = 'resolution_hits'
+RESOLUTION_MISSES = 'resolution_misses'
+
+
+class ResolutionCache:
+    """
+    Guarda a resolução de cada título distinto (ISSNs, países, quantidade de países, ISSNs coletados na WoS e caminho
+    de associação), reaproveitada em todas as linhas (anos) em que o título aparece.
+    Acertos e falhas são contabilizados no Counter informado em cada consulta, que acompanha os resultados de cada
+    bloco, inclusive quando os blocos são processados em outros processos.
+    :param resolve: função que resolve um título
+    :param resolve_many: função opcional que resolve uma lista de títulos de uma só vez (ver prefetch)
+    """
+    def __init__(self, resolve, resolve_many=None):
+        self.resolve = resolve
+        self.resolve_many = resolve_many
+        self.resolutions = {}
+        self.fetched = {}
+
+    def prefetch(self, titles):
+        """
+        Resolve, de uma só vez, os títulos ainda não resolvidos, por exemplo em uma única consulta ao serviço de
+        consulta. As resoluções obtidas são contabilizadas como falhas na primeira chamada de get.
+        """
+        if self.resolve_many is None:
+            return
+
+        missing = [t for t in dict.fromkeys(titles) if t not in self.resolutions and t not in self.fetched]
+        if missing:
+            self.fetched.update(zip(missing, self.resolve_many(missing)))
+
+    def get(self, title, counters):
+        resolution = self.resolutions.get(title)
+
+        if resolution is None:
+            resolution = self.fetched.pop(title, None)
+            if resolution is None:
+                resolution = self.resolve(title)
+            self.resolutions[title] = resolution
+            counters[RESOLUTION_MISSES] += 1
+        else:
+            counters[RESOLUTION_HITS] += 1
+
+        return resolution
+
+
+def resolution_stats(counters):
+    hits = counters.get(RESOLUTION_HITS, 0)
+    misses = counters.get(RESOLUTION_MISSES, 0)
+    total = hits + misses
+
+    return {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 4) if total else 0.0}
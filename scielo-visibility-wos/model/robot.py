@@ -1,116 +1,208 @@
-import logging
 import os
-import shutil
 import re
 
+from model.collector import WosCollector, WOS_CIT_ANALYSIS_NAMES, WOS_HOME_URL, WOS_INTERACTION_ERROR, WOS_INTERACTION_SUCCESS, \
+    WOS_NEXT_PAGE_CLASS, WOS_RECORD_ID_PREFIX, WOS_SUMMARY_SOURCE_TITLE_TAG
+from model.downloads import DownloadTimeoutError, DownloadTracker
 from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
-from time import sleep
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions
+from selenium.webdriver.support.ui import WebDriverWait
+from string_processor import preprocess_wos_source_title
 from util import PATTERN_YEAR
 
 
 CHROME_DRIVER_PATH = os.environ.get('CHROME_DRIVER_PATH', os.path.join(os.getcwd(), 'chromedriver'))
-CHROME_DOWNLOAD_DIR = os.environ.get('CHROME_DOWNLOAD_DIR', os.getcwd())
-GENERAL_RESULTS_DIR = os.environ.get('GENERAL_RESULTS_DIR', os.getcwd())
-WOS_CIT_ANALYSIS_NAMES = ['SO_SourceTitle_SourceTitle_en', 'SE_BookSeries_BookSeries_en']
-WOS_INTERACTION_ERROR = -1
-WOS_INTERACTION_SUCCESS = 1
 
-logging.basicConfig(level=os.environ.get('LOGGING_LEVEL', 'INFO'),
-                    format='[%(asctime)s] %(levelname)s %(message)s',
-                    datefmt='%d/%b/%Y %H:%M:%S')
+# Lê, em uma única chamada ao navegador, os dados da página usados pelo robô:
+#   fields         pares [rótulo, valor] dos campos de um registro (inclusive os ocultos por "See more data fields")
+#   result_count   texto da quantidade de resultados da última busca, ou null fora do formulário de busca
+#   checkboxes     estado de cada índice (id -> marcado), ou null quando o índice não existe na página
+#   result_types   estado de cada tipo de resultado (texto -> selecionado)
+#   records        pares [título do periódico, link] dos registros da página de resultados
+#   next_page      link da próxima página de resultados
+PAGE_STATE_SCRIPT = '''
+var indexes = arguments[0], recordPrefix = arguments[1], titleTag = arguments[2], nextPageClass = arguments[3];
+var text = function (e) { return e ? e.textContent.replace(/\\s+/g, ' ').trim() : null; };
+var state = {fields: [], result_count: null, checkboxes: {}, result_types: {}, records: [], next_page: null};
+
+document.querySelectorAll('p.FR_field').forEach(function (p) {
+    var parts = text(p).split(': ');
+    state.fields.push([parts[0], parts[parts.length - 1]]);
+});
+
+state.result_count = text(document.querySelector('.historyResults'));
+
+indexes.forEach(function (id) {
+    var checkbox = document.getElementById(id);
+    state.checkboxes[id] = checkbox ? checkbox.checked : null;
+});
+
+document.querySelectorAll("select[name='value(input3)'] option").forEach(function (o) {
+    state.result_types[text(o)] = o.selected;
+});
+
+document.querySelectorAll("div[id^='" + recordPrefix + "']").forEach(function (r) {
+    var link = r.querySelector('a');
+    state.records.push([text(r.querySelector(titleTag)), link ? link.href : null]);
+});
+
+var next = document.querySelector('.' + nextPageClass);
+state.next_page = next ? next.getAttribute('href') : null;
+
+return state;
+'''
+
+# Recursos não carregados no modo de sessão enxuta
+LEAN_BLOCKED_URLS = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.ico', '*.css', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot']
+
+
+class WosRobot(WosCollector):
+    """
+    Coletor que interage com a WoS por meio do navegador Chrome.
+    No modo de sessão enxuta (lean_session), o navegador é executado sem interface, sem carregar imagens, fontes e
+    folhas de estilo e sem aguardar o carregamento completo das páginas. Além disso, a sessão permanece no formulário
+    de busca avançada entre consultas, e as configurações de índices e de tipos de resultado são aplicadas apenas
+    quando mudam.
+    """
+    recoverable_errors = (NoSuchElementException, TimeoutException, DownloadTimeoutError)
 
-
-class WosRobot:
     def __init__(self):
-        self.download_directory = CHROME_DOWNLOAD_DIR
+        super().__init__()
         self.driver = None
+        self.driver_factory = None
         self.driver_path = CHROME_DRIVER_PATH
-        self.output = ''
-        self.results_directory = ''
-        self.wos_indexes = ['SCI', 'SSCI', 'AHCI', 'ISTP', 'ISSHP', 'ESCI']
-        self.wos_result_types = ['Article', 'Review']
-        self.wos_search_years = range(1997, 2020)
-        self.wos_selected_index = 'AHCI'
-        self.wos_min_wait_time = 0.30
-        self.wos_med_wait_time = 0.70
-        self.wos_max_wait_time = 1.50
-
-    def initialize(self, mode):
-        if mode == 'citation_report':
-            self.results_directory = os.path.join(self.download_directory, self.wos_selected_index.lower())
-            if not os.path.exists(self.results_directory):
-                os.makedirs(self.results_directory)
-
-        self.wos_indexes = ['editionitem' + s.upper() for s in self.wos_indexes]
-        self.wos_selected_index = 'editionitem' + self.wos_selected_index.upper()
+        self.wos_wait_timeout = 30
+        self.wos_poll_frequency = 0.10
+        self.download_timeout = 60
+        self.lean_session = False
+        self._reset_navigation()
+
+    def has_session(self):
+        return self.driver is not None
+
+    def open_session(self):
+        self._reset_navigation()
+        self.create_driver()
+
+    def close_session(self):
+        self.driver.quit()
+        self.driver = None
+
+    def _detach_session(self):
+        self.driver = None
+        self._reset_navigation()
+
+    def _reset_navigation(self):
+        # Endereço do formulário de busca avançada na sessão atual e configurações já aplicadas (modo de sessão enxuta)
+        self.advanced_search_url = None
+        self.applied_indexes = None
+        self.applied_result_types = None
 
     def create_driver(self):
+        # Permite substituir o navegador, por exemplo, por um driver falso em testes
+        if self.driver_factory:
+            self.driver = self.driver_factory()
+            return
+
         if not os.path.exists(self.download_directory):
             os.makedirs(self.download_directory)
 
         chrome_options = webdriver.ChromeOptions()
         prefs = {'download.default_directory': self.download_directory}
+        capabilities = DesiredCapabilities.CHROME.copy()
+
+        if self.lean_session:
+            chrome_options.add_argument('--headless')
+            chrome_options.add_argument('--disable-gpu')
+            chrome_options.add_argument('--window-size=1280,1024')
+            prefs['profile.managed_default_content_settings.images'] = 2
+            # Retorna assim que o DOM está pronto, sem aguardar recursos secundários
+            capabilities['pageLoadStrategy'] = 'eager'
+
         chrome_options.add_experimental_option('prefs', prefs)
 
-        self.driver = webdriver.Chrome(executable_path=self.driver_path, chrome_options=chrome_options)
+        self.driver = webdriver.Chrome(executable_path=self.driver_path, chrome_options=chrome_options, desired_capabilities=capabilities)
 
-    def collect_issn(self, source_title_years, output_filename):
-        fullpath_output = os.path.join(GENERAL_RESULTS_DIR, output_filename)
+        if self.lean_session:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URLS})
 
-        last_line = self._detect_last_saved_line(fullpath_output)
-        if last_line > 0:
-            last_line += 1
-            logging.info('Continuing from line %d' % last_line)
+    def collect_citation_report(self, sf):
+        self._open_advanced_search()
+        self._set_search_text(sf)
+        self._apply_search_settings()
+        self._search()
 
-        self.output = open(fullpath_output, 'a')
-        self.create_driver()
+        if self._open_result() == WOS_INTERACTION_SUCCESS:
+            with self.latency_stats.measure('open_cit_report'):
+                self.driver.find_element_by_class_name('create-cite-report').find_element_by_tag_name('a').click()
+                self._wait(expected_conditions.presence_of_element_located((By.XPATH, "//button[@value='%s']" % WOS_CIT_ANALYSIS_NAMES[0])))
 
-        for c, source_title in enumerate(sorted(source_title_years.keys())[last_line:]):
-            year = source_title_years[source_title][0]
-            try:
-                logging.info('(%d, %s) collecting' % (c + last_line, source_title))
+            for ca in WOS_CIT_ANALYSIS_NAMES:
+                self._save_cit_report(ca, sf)
 
-                self._open_advanced_search()
+    def search_issns(self, source_title, year):
+        self._open_advanced_search()
 
-                search_text = 'PY=' + year + ' AND SO=({0})'.format(source_title)
-                self._set_search_text(search_text)
+        search_text = 'PY=' + year + ' AND SO=({0})'.format(source_title)
+        self._set_search_text(search_text)
 
-                self._set_result_types()
-                self._set_indexes()
-                self._search()
-                self._clean_history()
+        self._apply_search_settings()
+        self._search()
+        self._clean_history()
 
-                if self._open_result() == WOS_INTERACTION_SUCCESS:
-                    issns = self._extract_issns()
+        if self._open_result() == WOS_INTERACTION_SUCCESS:
+            return WOS_INTERACTION_SUCCESS, self._extract_issns()
+        return WOS_INTERACTION_ERROR, []
 
-                    for i in issns:
-                        logging.info('Saving (%d, %s, %s)' % (c + last_line, source_title, i))
-                        self._save_issn_data(c + last_line, source_title, i)
-                else:
-                    logging.info('Not found (%d, %s)' % (c + last_line, source_title))
+    def search_issns_batch(self, source_titles, year):
+        self._open_advanced_search()
+        self._set_search_text(self.batch_query(source_titles, year))
+        self._apply_search_settings()
+        self._search()
+        self._clean_history()
 
-            except NoSuchElementException:
-                logging.error('Not collected (%d, %s)' % (c + last_line, source_title))
+        if self._open_result() != WOS_INTERACTION_SUCCESS:
+            return WOS_INTERACTION_ERROR, {}, True
 
-        self.output.close()
+        # Percorre as páginas de resultados guardando, para cada título buscado, o link de um de seus registros
+        pending = {preprocess_wos_source_title(st) for st in source_titles}
+        record_links = {}
+        complete = False
 
-    def collect_citation_reports(self):
-        self.create_driver()
+        for _ in range(self.wos_batch_max_pages):
+            state = self._page_state()
 
-        for sf in self.wos_search_years:
-            self._open_advanced_search()
-            self._set_search_text(sf)
-            self._set_result_types()
-            self._set_indexes()
-            self._search()
+            for title, link in state['records']:
+                if title is None:
+                    continue
+                record_title = preprocess_wos_source_title(title)
+                if record_title in pending and record_title not in record_links:
+                    record_links[record_title] = link
 
-            if self._open_result() == WOS_INTERACTION_SUCCESS:
-                self.driver.find_element_by_class_name('create-cite-report').find_element_by_tag_name('a').click()
-                sleep(self.wos_max_wait_time)
+            if len(record_links) == len(pending):
+                break
+
+            if not state['next_page']:
+                complete = True
+                break
 
-                for ca in WOS_CIT_ANALYSIS_NAMES:
-                    self._save_cit_report(ca, sf)
+            with self.latency_stats.measure('next_page'):
+                next_page = self.driver.find_element_by_class_name(WOS_NEXT_PAGE_CLASS)
+                next_page.click()
+                self._wait(expected_conditions.staleness_of(next_page))
+
+        found = {}
+        for record_title, link in record_links.items():
+            with self.latency_stats.measure('open_record'):
+                self.driver.get(link)
+                self._wait(expected_conditions.presence_of_element_located((By.XPATH, "//p[@class='FR_field']")))
+            found[record_title] = self._read_record_issns()
+
+        return WOS_INTERACTION_SUCCESS, found, complete
 
     def _clean_history(self):
         try:
@@ -120,87 +212,134 @@ class WosRobot:
         except NoSuchElementException:
             pass
 
-    def _detect_last_saved_line(self, fullpath_output):
-        if os.path.exists(fullpath_output):
-            with open(fullpath_output) as f:
-                try:
-                    return int(f.readlines()[-1].split('\t')[0])
-                except ValueError:
-                    pass
-                except IndexError:
-                    pass
-        return 0
-
     def _extract_issns(self):
-        st_results = []
+        with self.latency_stats.measure('open_record'):
+            self.driver.find_element_by_css_selector('#RECORD_1 a').click()
+            self._wait(expected_conditions.presence_of_element_located((By.XPATH, "//p[@class='FR_field']")))
 
-        self.driver.find_element_by_id('RECORD_1').find_element_by_tag_name('a').click()
-        sleep(self.wos_min_wait_time)
+        return self._read_record_issns()
 
-        try:
-            self.driver.find_element_by_link_text('See more data fields').click()
-        except NoSuchElementException:
-            pass
+    def _read_record_issns(self):
+        st_results = []
 
-        for i in self.driver.find_elements_by_xpath("//p[@class='FR_field']"):
-            if 'ISSN' in i.text:
-                issn = i.text.split(': ')[-1]
-                if issn:
-                    st_results.append(issn)
+        # Os campos ocultos por "See more data fields" também são lidos, sem necessidade de exibi-los
+        for label, value in self._page_state()['fields']:
+            if 'ISSN' in label and value:
+                st_results.append(value)
 
         return st_results
 
+    def _page_state(self):
+        return self.driver.execute_script(PAGE_STATE_SCRIPT, self.wos_indexes, WOS_RECORD_ID_PREFIX, WOS_SUMMARY_SOURCE_TITLE_TAG, WOS_NEXT_PAGE_CLASS)
+
     def _open_advanced_search(self):
-        self.driver.get('https://apps.webofknowledge.com/')
-        sleep(self.wos_min_wait_time)
-        self.driver.find_element_by_link_text('Advanced Search').click()
+        if self.lean_session:
+            self._return_to_advanced_search()
+            return
+
+        with self.latency_stats.measure('open_advanced_search'):
+            self.driver.get(WOS_HOME_URL)
+            self._wait(expected_conditions.element_to_be_clickable((By.LINK_TEXT, 'Advanced Search'))).click()
+            self._wait(expected_conditions.presence_of_element_located((By.CLASS_NAME, 'Adv_formBoxesSearch')))
+
+    def _return_to_advanced_search(self):
+        # A página atual já é o formulário quando a consulta anterior não teve resultados ou não os abriu
+        if self.advanced_search_url and self.driver.find_elements_by_class_name('Adv_formBoxesSearch'):
+            return
+
+        self.applied_result_types = None
+
+        with self.latency_stats.measure('open_advanced_search'):
+            if self.advanced_search_url:
+                try:
+                    self.driver.get(self.advanced_search_url)
+                    self._wait(expected_conditions.presence_of_element_located((By.CLASS_NAME, 'Adv_formBoxesSearch')))
+                    return
+                except TimeoutException:
+                    self.advanced_search_url = None
+
+            self.driver.get(WOS_HOME_URL)
+            self._wait(expected_conditions.element_to_be_clickable((By.LINK_TEXT, 'Advanced Search'))).click()
+            self._wait(expected_conditions.presence_of_element_located((By.CLASS_NAME, 'Adv_formBoxesSearch')))
+            self.advanced_search_url = self.driver.current_url
 
     def _open_result(self):
-        history_results = self.driver.find_element_by_class_name('historyResults')
-        if history_results.text != '0':
-            history_results.find_element_by_tag_name('a').click()
-            sleep(self.wos_min_wait_time)
+        result_count = self._page_state()['result_count']
+        if result_count is None:
+            raise NoSuchElementException('historyResults')
+
+        if result_count != '0':
+            with self.latency_stats.measure('open_result'):
+                self.driver.find_element_by_css_selector('.historyResults a').click()
+                self._wait(expected_conditions.presence_of_element_located((By.ID, 'RECORD_1')))
             return WOS_INTERACTION_SUCCESS
         return WOS_INTERACTION_ERROR
 
     def _save_cit_report(self, ca, sf):
-        self.driver.find_element_by_xpath("//button[@value='%s']" % ca).click()
-        self.driver.find_element_by_id('save_what_all_bottom').click()
-        self.driver.find_element_by_id('save').click()
-        sleep(self.wos_min_wait_time)
-
-        year = re.search(PATTERN_YEAR, sf).group()
+        year = re.search(PATTERN_YEAR, str(sf)).group()
         cat = 'book' if 'book' in ca.lower() else 'source'
 
-        filename = max([os.path.join(self.download_directory, f) for f in os.listdir(self.download_directory) if 'analyze' in f], key=os.path.getctime)
-        shutil.move(filename, os.path.join(self.results_directory, '%s-%s.txt' % (cat, year)))
+        # Cada relatório é recebido em um diretório exclusivo, de modo que downloads de outras sessões ou anteriores
+        # não se confundem com o arquivo esperado
+        tracker = DownloadTracker(self.download_directory, self.download_timeout)
+        staging = tracker.staging_directory('%s-%s-%s' % (self.wos_selected_index, cat, year))
+
+        with self.latency_stats.measure('save_cit_report'):
+            self._wait(expected_conditions.element_to_be_clickable((By.XPATH, "//button[@value='%s']" % ca))).click()
+            self.driver.find_element_by_id('save_what_all_bottom').click()
+
+            self._set_download_directory(staging)
+            self.driver.find_element_by_id('save').click()
+            tracker.move(staging, os.path.join(self.results_directory, '%s-%s.txt' % (cat, year)))
 
-    def _save_issn_data(self, line_number, source_title, issn):
-        self.output.write('\t'.join([str(line_number), source_title, issn]) + '\n')
-        self.output.flush()
+    def _set_download_directory(self, directory):
+        self.driver.execute_cdp_cmd('Page.setDownloadBehavior', {'behavior': 'allow', 'downloadPath': directory})
 
     def _search(self):
-        self.driver.find_element_by_id('search-button').click()
-        sleep(self.wos_med_wait_time)
+        with self.latency_stats.measure('search'):
+            search_button = self.driver.find_element_by_id('search-button')
+            search_button.click()
+            self._wait(expected_conditions.staleness_of(search_button))
+            self._wait(expected_conditions.presence_of_element_located((By.CLASS_NAME, 'historyResults')))
 
     def _set_search_text(self, text):
-        self.driver.find_element_by_class_name('Adv_formBoxesSearch').clear()
-        self.driver.find_element_by_class_name('Adv_formBoxesSearch').send_keys(text)
+        search_box = self.driver.find_element_by_class_name('Adv_formBoxesSearch')
+        search_box.clear()
+        search_box.send_keys(text)
+
+    def _apply_search_settings(self):
+        if self.lean_session and self.applied_result_types == self.wos_result_types and self.applied_indexes == self.wos_selected_index:
+            return
+
+        # Os estados dos tipos de resultado e dos índices são lidos de uma só vez, e apenas os que diferem são alterados
+        state = self._page_state()
+        self._set_result_types(state['result_types'])
+        self._set_indexes(state['checkboxes'])
+
+    def _set_result_types(self, selected):
+        # Os tipos de resultado são mantidos no formulário devolvido pela busca, até que se navegue para outra página
+        if self.lean_session and self.applied_result_types == self.wos_result_types:
+            return
 
-    def _set_result_types(self):
         for rt in self.wos_result_types:
-            rti = self.driver.find_element_by_xpath("//select[@name='value(input3)']/option[text()='%s']" % rt)
-            if not rti.is_selected():
-                rti.click()
-
-    def _set_indexes(self):
-        self.driver.find_element_by_id('settings-arrow').click()
-
-        for wi in self.wos_indexes:
-            checkbox = self.driver.find_element_by_id(wi)
-            if wi != self.wos_selected_index:
-                if checkbox.is_selected():
-                    checkbox.click()
-            else:
-                if not checkbox.is_selected():
-                    checkbox.click()
+            if not selected.get(rt):
+                self.driver.find_element_by_xpath("//select[@name='value(input3)']/option[text()='%s']" % rt).click()
+
+        self.applied_result_types = list(self.wos_result_types)
+
+    def _set_indexes(self, checked):
+        # Os índices selecionados são mantidos pela WoS durante toda a sessão
+        if self.lean_session and self.applied_indexes == self.wos_selected_index:
+            return
+
+        changes = [wi for wi in self.wos_indexes if checked.get(wi) != (wi == self.wos_selected_index)]
+        if changes:
+            self.driver.find_element_by_id('settings-arrow').click()
+            for wi in changes:
+                self.driver.find_element_by_id(wi).click()
+
+        self.applied_indexes = self.wos_selected_index
+
+    def _wait(self, condition):
+        # Aguarda até que a condição seja satisfeita, ou lança TimeoutException após wos_wait_timeout segundos
+        return WebDriverWait(self.driver, self.wos_wait_timeout, poll_frequency=self.wos_poll_frequency).until(condition)
@@ -0,0 +1,105 @@
+import logging
+import os
+import threading
+
+from queue import Queue, Empty
+from model.collector import GENERAL_RESULTS_DIR
+from model.parallel import chunked
+
+
+class LockedOutput:
+    """
+    Arquivo de saída compartilhado entre sessões, em que cada escrita é feita sob trava.
+    """
+    def __init__(self, f):
+        self.f = f
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            self.f.write(text)
+
+    def flush(self):
+        with self.lock:
+            self.f.flush()
+
+
+class WosRobotPool:
+    """
+    Distribui a coleta de ISSNs entre várias sessões, cada uma com sua própria cópia do coletor (WosRobot ou WosHttpCollector).
+    As sessões consomem uma fila compartilhada de títulos e gravam no mesmo arquivo de saída.
+    """
+    def __init__(self, robot, sessions=2):
+        self.robot = robot
+        self.sessions = sessions
+
+    def collect_issn(self, source_title_years, output_filename):
+        fullpath_output = os.path.join(GENERAL_RESULTS_DIR, output_filename)
+
+        # As sessões terminam fora de ordem, por isso a retomada considera todas as linhas já salvas, e não apenas a última
+        saved_lines = self._detect_saved_lines(fullpath_output)
+        if saved_lines:
+            logging.info('Skipping %d already saved lines' % len(saved_lines))
+
+        items = [(c, source_title, source_title_years[source_title][0])
+                 for c, source_title in enumerate(sorted(source_title_years.keys())) if c not in saved_lines]
+
+        self._collect_all(items, fullpath_output)
+
+    def replay_failed_issns(self, output_filename):
+        """
+        Coleta apenas os itens registrados em failures do coletor, distribuídos entre as sessões.
+        """
+        items = self.robot.failures.start_replay()
+        self._collect_all(items, os.path.join(GENERAL_RESULTS_DIR, output_filename))
+        self.robot.failures.finish_replay()
+
+    def _collect_all(self, items, fullpath_output):
+        work_queue = Queue()
+        for window in chunked(items, self.robot.window_size()):
+            work_queue.put(window)
+
+        with open(fullpath_output, 'a') as f:
+            output = LockedOutput(f)
+
+            sessions = [threading.Thread(target=self._run_session, args=(work_queue, output))
+                        for _ in range(min(self.sessions, work_queue.qsize()))]
+            for s in sessions:
+                s.start()
+            for s in sessions:
+                s.join()
+
+        self.robot.log_cache_stats()
+        self.robot.save_latency_stats('issn')
+
+    def _create_robot(self, output):
+        robot = self.robot.clone()
+        robot.output = output
+        return robot
+
+    def _run_session(self, work_queue, output):
+        robot = self._create_robot(output)
+
+        try:
+            while True:
+                try:
+                    window = work_queue.get_nowait()
+                except Empty:
+                    break
+
+                robot._collect_items(window)
+        finally:
+            robot.close()
+
+    def _detect_saved_lines(self, fullpath_output):
+        saved_lines = set()
+
+        if os.path.exists(fullpath_output):
+            with open(fullpath_output) as f:
+                for line in f:
+                    try:
+                        saved_lines.add(int(line.split('\t')[0]))
+                    except ValueError:
+                        pass
+
+        return saved_lines
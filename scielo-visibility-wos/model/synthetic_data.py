@@ -0,0 +1,147 @@
+import csv
+import os
+import random
+
+from string_processor import preprocess_journal_title
+
+
+SYNTHETIC_COUNTRIES = ['ARG', 'BRA', 'CHL', 'COL', 'DEU', 'ESP', 'FRA', 'GBR', 'ITA', 'MEX', 'PRT', 'USA']
+SYNTHETIC_DECORATIONS = ['(PRINT)', '(ONLINE)', '(SÃO PAULO)', '(MÉXICO)', '& SOCIEDADE', 'CIÊNCIA', 'PESQUISA']
+SYNTHETIC_WORDS = ['ACTA', 'ANNALS', 'ARCHIVES', 'ARTS', 'BIOLOGY', 'BULLETIN', 'CHEMISTRY', 'CLINICAL', 'COMMUNICATIONS',
+                   'DEVELOPMENT', 'ECOLOGY', 'ECONOMICS', 'EDUCATION', 'ENGINEERING', 'ENVIRONMENTAL', 'EXPERIMENTAL',
+                   'GEOGRAPHY', 'HEALTH', 'HISTORY', 'INTERNATIONAL', 'JOURNAL', 'LAW', 'LETTERS', 'LINGUISTICS',
+                   'MATERIALS', 'MATHEMATICS', 'MEDICINE', 'MOLECULAR', 'NURSING', 'PHILOSOPHY', 'PHYSICS', 'POLICY',
+                   'PSYCHOLOGY', 'PUBLIC', 'QUARTERLY', 'RESEARCH', 'REVIEW', 'REVISTA', 'SCIENCE', 'SOCIAL',
+                   'SOCIOLOGY', 'STUDIES', 'SURGERY', 'TECHNOLOGY', 'THEORY', 'TRANSACTIONS', 'VETERINARY', 'ZOOLOGY']
+SYNTHETIC_YEARS = [str(y) for y in range(1997, 2020)]
+
+# Proporções aproximadas dos dados reais
+JOURNALS_PER_ROW = 0.25
+MJL_SHARE = 0.5
+KNOWN_TITLE_SHARE = 0.7
+GATHERED_SHARE = 0.6
+YEAR_POOL_RATIO = 1.5
+
+
+def synthetic_title(number, rnd):
+    """
+    Cria um título de periódico único para number, eventualmente acompanhado de acentos, parênteses ou símbolos.
+    """
+    words = []
+    while True:
+        number, digit = divmod(number, len(SYNTHETIC_WORDS))
+        words.append(SYNTHETIC_WORDS[digit])
+        if number == 0:
+            break
+
+    if rnd.random() < 0.2:
+        words.append(rnd.choice(SYNTHETIC_DECORATIONS))
+
+    return ' '.join(words)
+
+
+def _issn(number):
+    return '%08d' % (number % 10 ** 8)
+
+
+def _hyphenated(issn):
+    return issn[:4] + '-' + issn[4:]
+
+
+def synthetic_data_paths(directory):
+    return {'base_titles': os.path.join(directory, 'base_titles.csv'),
+            'mjl': os.path.join(directory, 'mjl.csv'),
+            'searched': os.path.join(directory, 'searched'),
+            'source_titles': os.path.join(directory, 'source_titles'),
+            'gathered': os.path.join(directory, 'gathered.csv')}
+
+
+def generate_synthetic_data(directory, rows, years=SYNTHETIC_YEARS, seed=0):
+    """
+    Gera arquivos de entrada sintéticos, com os mesmos formatos dos arquivos reais, em directory:
+        - base_titles.csv: títulos base (ISSN-L, ISSNs, títulos e países)
+        - mjl.csv: Master Journal List
+        - searched/results-<ano>.txt: resultados de busca usados por enrich_data.py
+        - source_titles/source-<ano>.txt: análises de Source Titles usadas por wos_enricher.py e wos_joiner.py
+        - gathered.csv: ISSNs coletados por wos_gather.py -m issn
+    :param directory: diretório de saída
+    :param rows: quantidade total de linhas de resultados de busca (e de Source Titles), distribuída entre os anos
+    :param years: anos dos arquivos de resultados
+    :param seed: semente do gerador de números aleatórios
+    :return: dicionário nome do arquivo (ou diretório) -> caminho
+    """
+    rnd = random.Random(seed)
+    journals = max(100, int(rows * JOURNALS_PER_ROW))
+    titles = [synthetic_title(j, rnd) for j in range(journals)]
+
+    paths = synthetic_data_paths(directory)
+
+    for d in [directory, paths['searched'], paths['source_titles']]:
+        if not os.path.exists(d):
+            os.makedirs(d)
+
+    with open(paths['base_titles'], 'w') as f:
+        f.write('ISSNL|ISSNS|TITLES|COUNTRIES\n')
+        for j, title in enumerate(titles):
+            issns = [_issn(2 * j)]
+            if rnd.random() < 0.5:
+                issns.append(_issn(2 * j + 1))
+
+            # Alguns ISSNs possuem mais de um país, e parte dos títulos possui variantes
+            countries = ['%s-%s' % (i, rnd.choice(SYNTHETIC_COUNTRIES)) for i in issns if rnd.random() < 0.9]
+            if countries and rnd.random() < 0.05:
+                countries.append('%s-%s' % (issns[0], rnd.choice(SYNTHETIC_COUNTRIES)))
+
+            base_titles = [preprocess_journal_title(title)]
+            if rnd.random() < 0.3:
+                base_titles.append(preprocess_journal_title(title + ' ' + rnd.choice(SYNTHETIC_WORDS)))
+
+            f.write('|'.join([issns[0], '#'.join(issns), '#'.join(base_titles), '#'.join(countries)]) + '\n')
+
+    with open(paths['mjl'], 'w') as f:
+        csv_writer = csv.writer(f)
+        csv_writer.writerow(['Journal title', 'ISSN', 'eISSN'])
+        for j, title in enumerate(titles):
+            if rnd.random() < MJL_SHARE:
+                eissn = _hyphenated(_issn(2 * j + 1)) if rnd.random() < 0.4 else ''
+                csv_writer.writerow([title, _hyphenated(_issn(2 * j)), eissn])
+
+    # Títulos fora da base simulam periódicos sem correspondência
+    def searched_title():
+        if rnd.random() < KNOWN_TITLE_SHARE:
+            return titles[rnd.randrange(journals)]
+        return synthetic_title(journals + rnd.randrange(journals), rnd)
+
+    rows_per_year = max(1, rows // len(years))
+    source_titles = set()
+
+    # Como nos dados reais, os mesmos títulos aparecem em vários anos
+    searched_pool = [searched_title() for _ in range(int(rows_per_year * YEAR_POOL_RATIO))]
+    source_pool = [searched_title() for _ in range(int(rows_per_year * YEAR_POOL_RATIO))]
+
+    for y in years:
+        with open(os.path.join(paths['searched'], 'results-%s.txt' % y), 'w') as fr, \
+                open(os.path.join(paths['source_titles'], 'source-%s.txt' % y), 'w') as fs:
+            fr.write('Source title\tN\tPercent\n')
+            fs.write('Source Titles\trecords\t%% of %d\n' % rows_per_year)
+
+            for _ in range(rows_per_year):
+                records = rnd.randint(1, 500)
+                percent = '%.3f' % (100.0 * records / rows_per_year)
+
+                fr.write('\t'.join([rnd.choice(searched_pool).title(), str(records), percent]) + '\n')
+
+                source_title = rnd.choice(source_pool)
+                source_titles.add(source_title)
+                fs.write('\t'.join([source_title, str(records), percent]) + '\n')
+
+    title_numbers = {t: j for j, t in enumerate(titles)}
+
+    with open(paths['gathered'], 'w') as f:
+        for c, source_title in enumerate(sorted(source_titles)):
+            j = title_numbers.get(source_title)
+            if j is not None and rnd.random() < GATHERED_SHARE:
+                for i in [_issn(2 * j), _issn(2 * j + 1)][:rnd.randint(1, 2)]:
+                    f.write('\t'.join([str(c), source_title, _hyphenated(i)]) + '\n')
+
+    return paths
@@ -0,0 +1,99 @@
+import heapq
+import math
+
+from array import array
+
+
+# Tolerância nas comparações com o limiar, para que erros de arredondamento não descartem similaridades iguais a ele
+SIMILARITY_EPSILON = 1e-9
+
+
+class TitleTrigramIndex:
+    """
+    Índice invertido de n-gramas de caracteres sobre os títulos de um dicionário título -> ISSN-Ls.
+    A similaridade entre títulos é a razão entre n-gramas em comum e n-gramas distintos (Jaccard).
+    Apenas as listas invertidas dos n-gramas mais raros do título consultado são percorridas, de modo que os títulos
+    comparados são somente aqueles que ainda podem atingir o limiar de similaridade.
+    """
+    def __init__(self, title_to_issnls, threshold=0.8, top_k=1, n=3):
+        self.title_to_issnls = title_to_issnls
+        self.threshold = self.check_threshold(threshold)
+        self.top_k = top_k
+        self.n = n
+
+        self.titles = []
+        self.sizes = array('I')
+        self.postings = {}
+
+        for title in title_to_issnls:
+            grams = self.grams(title)
+            if not grams:
+                continue
+
+            title_id = len(self.titles)
+            self.titles.append(title)
+            self.sizes.append(len(grams))
+
+            for g in grams:
+                posting = self.postings.get(g)
+                if posting is None:
+                    posting = self.postings[g] = array('I')
+                posting.append(title_id)
+
+    def __len__(self):
+        return len(self.titles)
+
+    @staticmethod
+    def check_threshold(threshold):
+        # Com limiar 0, qualquer título seria candidato, e o índice não reduziria as comparações
+        if not 0 < threshold <= 1:
+            raise ValueError('Limiar de similaridade deve ser maior que 0 e no máximo 1: %s' % threshold)
+        return threshold
+
+    def grams(self, text):
+        padded = ' ' + text + ' '
+        return {padded[i:i + self.n] for i in range(len(padded) - self.n + 1)}
+
+    def search(self, title, top_k=None, threshold=None):
+        """
+        Obtém os ISSN-Ls dos títulos mais similares a title.
+        :param title: título normalizado a ser consultado
+        :param top_k: quantidade máxima de ISSN-Ls retornados
+        :param threshold: similaridade mínima, maior que 0 e no máximo 1
+        :return: lista de pares (ISSN-L, similaridade), em ordem decrescente de similaridade
+        """
+        top_k = self.top_k if top_k is None else top_k
+        threshold = self.threshold if threshold is None else self.check_threshold(threshold)
+
+        query_grams = self.grams(title)
+        if not query_grams:
+            return []
+
+        # Limites inteiros da quantidade de n-gramas de um título que ainda pode atingir o limiar
+        query_size = len(query_grams)
+        min_size = math.ceil(threshold * query_size - SIMILARITY_EPSILON)
+        max_size = math.floor(query_size / threshold + SIMILARITY_EPSILON)
+
+        # Um título similar precisa compartilhar ao menos min_overlap n-gramas; basta gerar candidatos a partir dos
+        # query_size - min_overlap + 1 n-gramas mais raros
+        min_overlap = max(1, min_size)
+        known_grams = sorted((g for g in query_grams if g in self.postings), key=lambda g: len(self.postings[g]))
+        prefix = known_grams[:query_size - min_overlap + 1]
+
+        candidates = set()
+        for g in prefix:
+            for title_id in self.postings[g]:
+                if min_size <= self.sizes[title_id] <= max_size:
+                    candidates.add(title_id)
+
+        scores = {}
+        for title_id in candidates:
+            overlap = len(query_grams & self.grams(self.titles[title_id]))
+            score = overlap / (query_size + self.sizes[title_id] - overlap)
+
+            if score >= threshold - SIMILARITY_EPSILON:
+                for issnl in self.title_to_issnls.get(self.titles[title_id], []):
+                    if score > scores.get(issnl, -1):
+                        scores[issnl] = score
+
+        return heapq.nlargest(top_k, scores.items(), key=lambda x: (x[1], x[0]))
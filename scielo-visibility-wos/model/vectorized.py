@@ -0,0 +1,288 @@
+import csv
+
+from itertools import groupby
+from operator import itemgetter
+
+from model.compiled_maps import is_compiled_maps, open_compiled_maps
+from string_processor import preprocess_journal_title
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+
+# Quantidade de linhas gravadas por vez em save_frame
+SAVE_CHUNK_SIZE = 500000
+
+
+def require_pandas():
+    if pd is None:
+        raise ImportError('O motor vetorizado requer a biblioteca pandas (pip install pandas)')
+
+
+def _read_table(path, delimiter, names=None):
+    frame = pd.read_csv(path, sep=delimiter, header=None if names else 'infer', names=names, dtype=object,
+                        keep_default_na=False, quoting=csv.QUOTE_MINIMAL)
+    return frame.fillna('')
+
+
+def _mapping_frame(mapping, key, value):
+    # Converte um dicionário chave -> coleção de valores em uma tabela com um par (chave, valor) por linha
+    frame = pd.DataFrame({key: list(mapping.keys()), value: [list(v) for v in mapping.values()]}, dtype=object)
+    return frame.explode(value).dropna()
+
+
+def _split_column(frame, column, sep='#'):
+    return frame.assign(**{column: frame[column].str.split(sep)}).explode(column)
+
+
+def _fix_issns(issns):
+    return issns.where(issns.str.len() != 8, issns.str[:4] + '-' + issns.str[4:])
+
+
+def _issn_country_pairs(countries, fix):
+    # Cada elemento de COUNTRIES tem a forma ISSN-PAÍS; os demais são ignorados
+    countries = countries.str.split('#').explode()
+    els = countries.str.split('-')
+    els = els[els.str.len() == 2]
+    return pd.DataFrame({'issn': fix(els.str[0]), 'country': els.str[1]}, dtype=object)
+
+
+def _join_values(frame, key, value, sort=True):
+    """
+    Agrupa frame por key e une, com #, os valores distintos de value, como '#'.join(sorted(set(...))).
+    Chaves com um único valor, a maioria, são resolvidas sem agrupamento; as demais são unidas em um único laço.
+    :param sort: indica se os valores são ordenados; caso contrário, mantêm a ordem de frame
+    :return: Series key -> string
+    """
+    frame = frame[[key, value]].drop_duplicates()
+    multiple = frame[key].duplicated(keep=False)
+
+    joined = pd.Series(frame.loc[~multiple, value].values, index=frame.loc[~multiple, key].values, dtype=object)
+
+    grouped = frame[multiple]
+    if len(grouped):
+        grouped = grouped.sort_values([key, value] if sort else key, kind='stable')
+        keys_values = zip(grouped[key].tolist(), grouped[value].tolist())
+        multiple_joined = {k: '#'.join(v for _, v in g) for k, g in groupby(keys_values, key=itemgetter(0))}
+        joined = pd.concat([joined, pd.Series(multiple_joined, dtype=object)])
+
+    return joined
+
+
+def _count_match_paths(rows, counters, issn, country):
+    if counters is None:
+        return
+
+    for path, n in rows['path'].value_counts().items():
+        counters[path] += int(n)
+    counters['multiple_issnls'] += int(rows[issn].str.contains('#', regex=False).sum())
+    counters['multiple_countries'] += int(rows[country].str.contains('#', regex=False).sum())
+
+
+def load_issn_tables(path):
+    """
+    Carrega, como tabelas, os dados de títulos base usados por enrich_data.enrich (ver enrich_data.load_issn_maps).
+    :return: dicionário com as tabelas issn_to_country (issn, country) e title_to_issnl (title, issnl)
+    """
+    require_pandas()
+
+    if is_compiled_maps(path):
+        compiled_maps = open_compiled_maps(path)
+        return {'issn_to_country': _mapping_frame(compiled_maps['issn_to_country'], 'issn', 'country'),
+                'title_to_issnl': _mapping_frame(compiled_maps['title_to_issnl'], 'title', 'issnl')}
+
+    base = _read_table(path, '|')
+    title_to_issnl = _split_column(pd.DataFrame({'title': base['TITLES'], 'issnl': _fix_issns(base['ISSNL'])}), 'title')
+
+    return {'issn_to_country': _issn_country_pairs(base['COUNTRIES'], lambda i: i.str[:4] + '-' + i.str[4:]),
+            'title_to_issnl': title_to_issnl}
+
+
+def title_to_issnl_map(issn_tables):
+    """
+    Obtém, da tabela title_to_issnl, o dicionário título -> ISSN-Ls usado por TitleTrigramIndex.
+    """
+    title_to_issnl = {}
+    for title, issnl in zip(issn_tables['title_to_issnl']['title'].tolist(), issn_tables['title_to_issnl']['issnl'].tolist()):
+        title_to_issnl.setdefault(title, []).append(issnl)
+    return title_to_issnl
+
+
+def load_base_tables(path):
+    """
+    Carrega, como tabelas, os dados de títulos base usados por WosEnricher (ver util.read_base_titles).
+    :return: dicionário com as tabelas title2issns (title, issn) e issn2countries (issn, country)
+    """
+    require_pandas()
+
+    if is_compiled_maps(path):
+        compiled_maps = open_compiled_maps(path)
+        return {'title2issns': _mapping_frame(compiled_maps['title2issns'], 'title', 'issn'),
+                'issn2countries': _mapping_frame(compiled_maps['issn2countries'], 'issn', 'country')}
+
+    base = _read_table(path, '|')
+    title2issns = _split_column(_split_column(base[['TITLES', 'ISSNS']], 'TITLES'), 'ISSNS')
+
+    return {'title2issns': pd.DataFrame({'title': title2issns['TITLES'], 'issn': _fix_issns(title2issns['ISSNS'])}),
+            'issn2countries': _issn_country_pairs(base['COUNTRIES'], _fix_issns)}
+
+
+def load_journal_list_frame(path):
+    """
+    Carrega a Master Journal List (ou o arquivo core_titles) como tabela (title, issn, eissn).
+    Títulos repetidos mantêm a primeira ocorrência.
+    """
+    require_pandas()
+
+    journals = _read_table(path, ',')
+    journals = pd.DataFrame({'title': journals['Journal title'], 'issn': journals['ISSN'], 'eissn': journals['eISSN']})
+    return journals.drop_duplicates('title', keep='first')
+
+
+def load_gathered_issns_frame(path):
+    """
+    Carrega os ISSNs coletados por wos_gather.py como tabela (title, issn), na ordem do arquivo e sem repetições.
+    Linhas sem ISSN, de títulos não encontrados, são ignoradas.
+    """
+    require_pandas()
+
+    gathered = _read_table(path, '\t', names=['id', 'title', 'issn'])
+    return gathered.loc[gathered['issn'] != '', ['title', 'issn']].drop_duplicates()
+
+
+def enrich_frame(searched_data, issn_tables, journal_list, title_index=None, counters=None):
+    """
+    Equivalente vetorizado de enrich_data.enrich: cada título distinto é resolvido por junções com as tabelas de
+    Master Journal List e de títulos base, e o resultado é associado às linhas de busca pelo título.
+    :param searched_data: tabela com as colunas de WOS_SEARCHED_RESULTS_FIELDS
+    :param issn_tables: tabelas obtidas por load_issn_tables
+    :param journal_list: tabela obtida por load_journal_list_frame
+    :param title_index: TitleTrigramIndex opcional, consultado para os títulos sem correspondência exata
+    :param counters: Counter opcional, atualizado com a quantidade de linhas por caminho de associação
+    :return: tabela com as colunas de searched_data e ISSN, eISSN, Country e N-Country
+    """
+    issn_to_country = issn_tables['issn_to_country']
+    title_column = searched_data.columns[0]
+
+    titles = pd.DataFrame({'title': searched_data[title_column].unique()}, dtype=object)
+    titles = titles.merge(journal_list, on='title', how='left').fillna('')
+
+    # Países dos ISSN e eISSN da Master Journal List
+    by_issn = titles[['title', 'issn']].merge(issn_to_country, on='issn')
+    by_eissn = titles[['title', 'eissn']].rename(columns={'eissn': 'issn'}).merge(issn_to_country, on='issn')
+    titles['country'] = titles['title'].map(_join_values(pd.concat([by_issn, by_eissn]), 'title', 'country')).fillna('')
+    titles['path'] = 'mjl_eissn'
+    titles.loc[titles['title'].isin(by_issn['title']), 'path'] = 'mjl_issn'
+
+    # Demais títulos são buscados, normalizados, na tabela de títulos base
+    unresolved = titles.loc[titles['country'] == '', ['title']]
+    unresolved = unresolved.assign(preprocessed=unresolved['title'].map(preprocess_journal_title))
+
+    title_to_issnl = issn_tables['title_to_issnl'].rename(columns={'title': 'preprocessed'})
+    pairs = unresolved.merge(title_to_issnl, on='preprocessed')[['title', 'issnl']]
+
+    similar_titles = set()
+    if title_index:
+        missing = unresolved[~unresolved['title'].isin(pairs['title'])]
+        similar_pairs = [(t, issnl) for t, p in zip(missing['title'], missing['preprocessed']) for issnl, score in title_index.search(p)]
+        similar_pairs = pd.DataFrame(similar_pairs, columns=['title', 'issnl'], dtype=object)
+        similar_titles = set(similar_pairs['title'])
+        pairs = pd.concat([pairs, similar_pairs])
+
+    # ISSN-Ls sem país são representados por -1
+    pair_countries = pairs.merge(issn_to_country.rename(columns={'issn': 'issnl'}), on='issnl', how='left').fillna({'country': '-1'})
+
+    is_unresolved = titles['country'] == ''
+    unresolved_titles = titles.loc[is_unresolved, 'title']
+    issnls = unresolved_titles.map(_join_values(pairs, 'title', 'issnl')).fillna('')
+
+    titles.loc[is_unresolved, 'country'] = unresolved_titles.map(_join_values(pair_countries, 'title', 'country')).fillna('')
+    titles.loc[is_unresolved, 'path'] = 'no_match'
+    titles.loc[is_unresolved & (issnls != ''), 'path'] = 'title'
+    titles.loc[is_unresolved & titles['title'].isin(similar_titles), 'path'] = 'similar_title'
+
+    # Usa issnls quando issn e eissn não forem identificados na Master Journal List
+    without_issns = is_unresolved & (titles['issn'] == '') & (titles['eissn'] == '')
+    titles.loc[without_issns, 'issn'] = issnls[without_issns[is_unresolved]]
+
+    n_countries = titles['country'].str.count('#') + 1
+    titles['n_country'] = n_countries.astype(str).where(titles['country'] != '', '0')
+
+    rows = searched_data.merge(titles, left_on=title_column, right_on='title', how='left')
+    _count_match_paths(rows, counters, 'issn', 'country')
+
+    enriched = searched_data.copy()
+    enriched['ISSN'] = rows['issn'].values
+    enriched['eISSN'] = rows['eissn'].values
+    enriched['Country'] = rows['country'].values
+    enriched['N-Country'] = rows['n_country'].values
+    return enriched
+
+
+def enrich_source_titles_frame(source_titles, journal_list, base_tables, gathered_issns=None, counters=None):
+    """
+    Equivalente vetorizado de WosEnricher.enrich_source_titles. Listas de ISSNs e de países são unidas em ordem
+    alfabética, exceto os ISSNs coletados na WoS, que mantêm a ordem do arquivo.
+    :param source_titles: lista de (título, registros, ano), como obtida por util.read_source_titles
+    :param journal_list: tabela obtida por load_journal_list_frame
+    :param base_tables: tabelas obtidas por load_base_tables
+    :param gathered_issns: tabela opcional obtida por load_gathered_issns_frame
+    :param counters: Counter opcional, atualizado com a quantidade de linhas por caminho de associação
+    :return: lista de colunas, na ordem dos campos de WosEnricher.results, com uma linha por (título, ano)
+    """
+    issn2countries = base_tables['issn2countries']
+
+    rows = pd.DataFrame(source_titles, columns=['title', 'records', 'year'], dtype=object)
+
+    titles = pd.DataFrame({'title': rows['title'].unique()}, dtype=object)
+    titles = titles.merge(journal_list, on='title', how='left').fillna('')
+    titles['path'] = 'mjl_eissn'
+    titles.loc[titles['issn'] != '', 'path'] = 'mjl_issn'
+
+    # Títulos ausentes da Master Journal List usam os ISSNs dos títulos base
+    without_issns = (titles['issn'] == '') & (titles['eissn'] == '')
+    title2issns = base_tables['title2issns']
+    title2issns = title2issns[title2issns['title'].isin(titles.loc[without_issns, 'title'])]
+    base_issns = titles.loc[without_issns, 'title'].map(_join_values(title2issns, 'title', 'issn')).fillna('')
+    titles.loc[without_issns, 'issn'] = base_issns
+    titles.loc[without_issns, 'path'] = 'no_match'
+    titles.loc[without_issns & (titles['issn'] != ''), 'path'] = 'title'
+
+    title_issns = _split_column(titles.loc[titles['issn'] != '', ['title', 'issn']], 'issn')
+    countries = _join_values(title_issns.merge(issn2countries, on='issn'), 'title', 'country')
+    titles['countries'] = titles['title'].map(countries).fillna('')
+
+    fields = ['title', 'records', 'year', 'issn', 'eissn', 'countries']
+
+    if gathered_issns is not None and len(gathered_issns):
+        gathered_issns = gathered_issns[gathered_issns['title'].isin(titles['title'])]
+        titles['wos_issns'] = titles['title'].map(_join_values(gathered_issns, 'title', 'issn', sort=False)).fillna('')
+
+        wos_countries = _join_values(gathered_issns.merge(issn2countries, on='issn'), 'title', 'country')
+        titles['wos_countries'] = titles['title'].map(wos_countries).fillna('')
+        fields += ['wos_issns', 'wos_countries']
+
+    rows = rows.merge(titles, on='title', how='left')
+    _count_match_paths(rows, counters, 'issn', 'countries')
+
+    # Como em um dicionário, cada (título, ano) ocupa a posição da primeira ocorrência, com os valores da última
+    keys = rows[['title', 'year']]
+    last = rows.drop_duplicates(['title', 'year'], keep='last')
+    rows = keys.drop_duplicates(keep='first').merge(last, on=['title', 'year'], how='left')
+
+    return [rows[f].tolist() for f in fields]
+
+
+def save_frame(frame, path):
+    """
+    Grava frame no mesmo formato de enrich_data.save_data, com campos separados por |.
+    """
+    with open(path, 'w') as f:
+        f.write('|'.join(str(c) for c in frame.columns) + '\n')
+
+        for start in range(0, len(frame), SAVE_CHUNK_SIZE):
+            chunk = frame.iloc[start:start + SAVE_CHUNK_SIZE]
+            columns = [chunk[c].astype(object).tolist() for c in chunk.columns]
+            f.writelines('|'.join(row) + '\n' for row in zip(*columns))
@@ -0,0 +1,132 @@
+import argparse
+import logging
+import os
+import sys
+
+from model.pipeline import Pipeline, PipelineError, Stage
+
+
+logging.basicConfig(level=os.environ.get('LOGGING_LEVEL', 'INFO'),
+                    format='[%(asctime)s] %(levelname)s %(message)s',
+                    datefmt='%d/%b/%Y %H:%M:%S')
+
+
+STAGE_NAMES = ['citation_report', 'enrich', 'issn', 'join']
+
+
+def get_params():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('-s', '--wos_selected_index', default='AHCI')
+    parser.add_argument('-c', '--core_titles', required=True)
+    parser.add_argument('-b', '--base_titles', required=True)
+    parser.add_argument('-t', '--source_titles')
+    parser.add_argument('-d', '--work_dir', default='.')
+    parser.add_argument('-a', '--artifact_cache')
+    parser.add_argument('-i', '--wos_indexes', default='SCI,SSCI,AHCI,ISTP,ISSHP,ESCI')
+    parser.add_argument('-r', '--wos_result_types', default='Article,Review')
+    parser.add_argument('-e', '--backend', default='selenium', choices=['selenium', 'http'])
+    parser.add_argument('-l', '--lean_session', action='store_true')
+    parser.add_argument('-p', '--sessions', type=int, default=1)
+    parser.add_argument('-k', '--cache')
+    parser.add_argument('-q', '--batch_query_length', type=int, default=0)
+    parser.add_argument('-n', '--workers', type=int, default=1)
+    parser.add_argument('-f', '--force', default='')
+    parser.add_argument('--dry_run', action='store_true')
+
+    params = parser.parse_args()
+
+    force = [f for f in params.force.split(',') if f]
+    unknown = set(force) - set(STAGE_NAMES)
+    if unknown:
+        parser.error('Etapas desconhecidas: %s (etapas: %s)' % (', '.join(sorted(unknown)), ', '.join(STAGE_NAMES)))
+
+    work_dir = os.path.abspath(params.work_dir)
+
+    return {'wos_selected_index': params.wos_selected_index.upper(),
+            'core_titles': os.path.abspath(params.core_titles),
+            'base_titles': os.path.abspath(params.base_titles),
+            'source_titles': os.path.abspath(params.source_titles) if params.source_titles else None,
+            'work_dir': work_dir,
+            'artifact_cache': os.path.abspath(params.artifact_cache or os.path.join(work_dir, '.pipeline_cache')),
+            'wos_indexes': params.wos_indexes,
+            'wos_result_types': params.wos_result_types,
+            'backend': params.backend,
+            'lean_session': params.lean_session,
+            'sessions': params.sessions,
+            'cache': os.path.abspath(params.cache) if params.cache else None,
+            'batch_query_length': params.batch_query_length,
+            'workers': params.workers,
+            'force': force,
+            'dry_run': params.dry_run}
+
+
+def _script(name):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+
+
+def build_stages(params):
+    """
+    Cria as etapas coleta de relatórios de citação (citation_report), enriquecimento (enrich), coleta de ISSNs dos
+    títulos sem ISSN (issn) e junção (join), com os caminhos de cada arquivo intermediário.
+    Quando o diretório de Source Titles é informado, a coleta de relatórios de citação não é executada.
+    """
+    index = params['wos_selected_index']
+    work_dir = params['work_dir']
+
+    # Os relatórios de citação são salvos por wos_gather.py em <CHROME_DOWNLOAD_DIR>/<índice>
+    source_titles = params['source_titles'] or os.path.join(os.environ.get('CHROME_DOWNLOAD_DIR', work_dir), index.lower())
+    no_issn = os.path.join(work_dir, 'no_issn_%s.csv' % index)
+    multiple_issn = os.path.join(work_dir, 'multiple_issn_%s.csv' % index)
+    gathered = no_issn.replace('.csv', '.gathered.csv')
+    failed = no_issn.replace('.csv', '.failed.csv')
+    gold = os.path.join(work_dir, '%s.gold.csv' % index)
+
+    gather = [sys.executable, _script('wos_gather.py'),
+              '-s', index,
+              '-i', params['wos_indexes'],
+              '-r', params['wos_result_types'],
+              '-e', params['backend']]
+    if params['lean_session']:
+        gather.append('-l')
+    enrichment = ['-c', params['core_titles'],
+                  '-t', source_titles,
+                  '-b', params['base_titles'],
+                  '-i', index,
+                  '-n', str(params['workers'])]
+
+    stages = []
+
+    if not params['source_titles']:
+        stages.append(Stage('citation_report', gather + ['-m', 'citation_report', '-p', str(params['sessions'])], [], [source_titles]))
+
+    stages.append(Stage('enrich',
+                        [sys.executable, _script('wos_enricher.py')] + enrichment,
+                        [params['core_titles'], source_titles, params['base_titles']],
+                        [no_issn, multiple_issn]))
+
+    issn = gather + ['-m', 'issn', '-y', no_issn, '-p', str(params['sessions']), '-q', str(params['batch_query_length'])]
+    if params['cache']:
+        issn += ['-k', params['cache']]
+    # Títulos não coletados são reprocessados antes da junção; enquanto houver falhas, a etapa não é concluída
+    stages.append(Stage('issn', issn, [no_issn], [gathered], failures=[failed], replay_command=issn + ['--replay_failures']))
+
+    stages.append(Stage('join',
+                        [sys.executable, _script('wos_joiner.py')] + enrichment + ['-g', gathered],
+                        [params['core_titles'], source_titles, params['base_titles'], gathered],
+                        [gold]))
+
+    return stages
+
+
+if __name__ == '__main__':
+    params = get_params()
+
+    os.makedirs(params['work_dir'], exist_ok=True)
+    pipeline = Pipeline(build_stages(params), params['work_dir'], params['artifact_cache'])
+
+    try:
+        pipeline.run(force=params['force'], dry_run=params['dry_run'])
+    except PipelineError as e:
+        logging.error(e)
+        sys.exit(1)
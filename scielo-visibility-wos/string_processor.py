@@ -2,11 +2,31 @@ import html
 import re
 import unicodedata
 
+from functools import lru_cache
+
 
 parenthesis_pattern = re.compile(r'[-a-zA-ZÀ-ÖØ-öø-ÿ|0-9]*\([-a-zA-ZÀ-ÖØ-öø-ÿ|\W|0-9]*\)[-a-zA-ZÀ-ÖØ-öø-ÿ|0-9]*', re.UNICODE)
 doi_pattern = re.compile(r'\d{2}\.\d+/.*$')
 special_chars = ['@', '&']
 special_words = ['IMPRESSO', 'ONLINE', 'CDROM', 'PRINT', 'ELECTRONIC']
+double_spaces_pattern = re.compile(' {2,}')
+JOURNAL_TITLE_CACHE_SIZE = 2 ** 18
+
+
+def _build_alpha_num_space_table(include_special_chars):
+    table = {}
+    for c in range(128):
+        character = chr(c)
+        if not (character.isalnum() or character.isspace() or (include_special_chars and character in special_chars)):
+            table[c] = ' '
+    return table
+
+
+# Tabelas de tradução equivalentes a remove_invalid_chars e a alpha_num_space (para textos ASCII)
+invalid_chars_table = {c: None for c in list(range(32)) + [127]}
+invalid_chars_table[11] = ' '
+alpha_num_space_table = _build_alpha_num_space_table(include_special_chars=False)
+alpha_num_space_special_chars_table = _build_alpha_num_space_table(include_special_chars=True)
 
 
 def remove_invalid_chars(text):
@@ -15,13 +35,7 @@ def remove_invalid_chars(text):
     :param text: texto a ser tratada
     :return: texto com caracteres ASCII < 32 e = 127 removidos
     """
-    vchars = []
-    for t in text:
-        if ord(t) == 11:
-            vchars.append(' ')
-        elif ord(t) >= 32 and ord(t) != 127:
-            vchars.append(t)
-    return ''.join(vchars)
+    return text.translate(invalid_chars_table)
 
 
 def remove_accents(text):
@@ -30,6 +44,8 @@ def remove_accents(text):
     :param text: texto a ser tratado
     :return: texto sem caracteres acentuados
     """
+    if text.isascii():
+        return text
     return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII')
 
 
@@ -41,6 +57,11 @@ def alpha_num_space(text, include_special_chars=False):
     :param include_special_chars: booleano que indica se os caracteres especiais devem ou não ser mantidos
     :return: texto com apenas caracteres alpha e espaço mantidos (e especiais, caso solicitado)
     """
+    if text.isascii():
+        if include_special_chars:
+            return text.translate(alpha_num_space_special_chars_table)
+        return text.translate(alpha_num_space_table)
+
     new_str = []
     for character in text:
         if character.isalnum() or character.isspace() or (include_special_chars and character in special_chars):
@@ -56,9 +77,7 @@ def remove_double_spaces(text):
     :param text: texto a ser tratado
     :return: texto sem espaços duplos
     """
-    while '  ' in text:
-        text = text.replace('  ', ' ')
-    return text.strip()
+    return double_spaces_pattern.sub(' ', text).strip()
 
 
 def preprocess_author_name(text):
@@ -85,6 +104,18 @@ def preprocess_doi(text):
         return doi[0]
 
 
+def preprocess_wos_source_title(text):
+    """
+    Procedimento que trata título de fonte da WoS para comparação com outros títulos de fonte da WoS.
+    Aplica:
+        1. Remoção de espaços duplos e de espaços nas extremidades
+        2. Transforma caracteres para caixa alta
+    :param text: título de fonte da WoS
+    :return: título tratado
+    """
+    return ' '.join(text.split()).upper()
+
+
 def preprocess_journal_title(text, use_remove_invalid_chars=False):
     """
     Procedimento para tratar título de periódico.
@@ -97,24 +128,58 @@ def preprocess_journal_title(text, use_remove_invalid_chars=False):
         6. Remoção de espaços duplos
         7. Remove palavras especiais
         8. Transforma caracteres para caixa alta
+    Os resultados são memorizados em um cache LRU de JOURNAL_TITLE_CACHE_SIZE títulos.
     :param text: título do periódico a ser tratado
     :param use_remove_invalid_chars: boolenano que indica se deve ou não ser aplicada remoção de caracteres inválidos
     :return: título tratado do periódico
     """
+    return _cached_preprocess_journal_title(text, use_remove_invalid_chars)
+
+
+def preprocess_journal_titles(texts, use_remove_invalid_chars=False):
+    """
+    Procedimento para tratar, de uma só vez, uma coleção de títulos de periódicos.
+    Títulos repetidos na coleção são tratados apenas uma vez.
+    :param texts: iterável de títulos de periódicos a serem tratados
+    :param use_remove_invalid_chars: boolenano que indica se deve ou não ser aplicada remoção de caracteres inválidos
+    :return: lista de títulos tratados, na mesma ordem de texts
+    """
+    preprocessed = {}
+    results = []
+
+    for text in texts:
+        if text not in preprocessed:
+            preprocessed[text] = _preprocess_journal_title(text, use_remove_invalid_chars)
+        results.append(preprocessed[text])
+
+    return results
+
+
+def _preprocess_journal_title(text, use_remove_invalid_chars):
     # Trata conteúdo HTML
     text = html.unescape(text)
 
     # Caso solicitado, remove caracteres inválidos
     if use_remove_invalid_chars:
-        text = remove_invalid_chars(text)
+        text = text.translate(invalid_chars_table)
 
     # Remove parenteses e conteúdo interno
-    parenthesis_search = re.search(parenthesis_pattern, text)
-    while parenthesis_search is not None:
-        text = text[:parenthesis_search.start()] + text[parenthesis_search.end():]
-        parenthesis_search = re.search(parenthesis_pattern, text)
+    if '(' in text:
+        parenthesis_search = parenthesis_pattern.search(text)
+        while parenthesis_search is not None:
+            text = text[:parenthesis_search.start()] + text[parenthesis_search.end():]
+            parenthesis_search = parenthesis_pattern.search(text)
 
     # Remove palavras especiais
     for sw in special_words:
         text = text.replace(sw, '')
-    return remove_double_spaces(alpha_num_space(remove_accents(text), include_special_chars=True)).upper()
+
+    # Remove acentos e mantém apenas caracteres alpha, numéricos, espaços e especiais
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII')
+    text = text.translate(alpha_num_space_special_chars_table)
+
+    return double_spaces_pattern.sub(' ', text).strip().upper()
+
+
+_cached_preprocess_journal_title = lru_cache(maxsize=JOURNAL_TITLE_CACHE_SIZE)(_preprocess_journal_title)
@@ -0,0 +1,44 @@
+import random
+
+
+# Trechos usados na geração de títulos, incluindo os casos tratados de forma especial pelo pré-processamento
+WORDS = ['REVISTA', 'Brasileira', 'de', 'Medicina', 'JOURNAL', 'of', 'Applied', 'Physics', 'Ciência', 'Saúde',
+         'Educação', 'Pública', 'Análise', 'Sociedade', 'Economía', 'Historia', 'Química', 'Nova', 'ÉTUDES', 'Française',
+         'Ökologie', 'Zoología', 'São', 'Paulo', 'Ñandú', 'Œuvres', 'Straße', 'İstanbul', 'ΦΥΣΙΚΗ', 'Журнал', '医学',
+         'ﬁsica', 'Ｆｕｌｌ', '²nd', 'Ⅻ', '1998', '2020', 'A&B', 'Arts & Humanities', 'user@mail', 'ONLINE', 'PRINT',
+         'IMPRESSO', 'CDROM', 'ELECTRONIC', 'ONLINEPRINT', 'IMPRIMPRESSOESSO', 'Online', 'print']
+HTML_ENTITIES = ['&amp;', '&lt;', '&gt;', '&quot;', '&#39;', '&aacute;', '&ccedil;', '&#233;', '&#x00E3;', '&nbsp;',
+                 '&amp', '&unknown;']
+PARENTHESES = ['(Online)', '(PRINT)', '(São Paulo)', '(1998)', '( )', '()', '(a(b)c)', '(', ')', 'x(y)z', '(-|-)',
+               'Rev.(Impr.)', '((dupla))', '(Ed. Impressa', 'fim)']
+PUNCTUATION = ['-', '.', ',', ':', ';', '/', '|', '_', "'", '"', '!', '?', '*', '#', '$', '%', '+', '=', '[', ']', '@', '&',
+               '–', '—', '´', '`', '~', '^', '°', 'º', 'ª']
+SPACES = [' ', '  ', '   ', '\t', '\n', '\r', '\x0b', '\x0c', '\xa0', ' ', '　', '\x1c', '\x1f', '\x85']
+CONTROL_CHARS = [chr(c) for c in list(range(32)) + [127]]
+
+
+def generate_titles(size=20000, seed=2020):
+    """
+    Gera uma lista reprodutível de títulos de periódicos, com acentos, entidades HTML, parênteses, palavras especiais,
+    caracteres de controle e espaços variados.
+    :param size: quantidade de títulos
+    :param seed: semente do gerador de números aleatórios
+    :return: lista de títulos
+    """
+    rand = random.Random(seed)
+    pieces = [(WORDS, 10), (HTML_ENTITIES, 1), (PARENTHESES, 2), (PUNCTUATION, 2), (SPACES, 3), (CONTROL_CHARS, 1)]
+    groups = [p[0] for p in pieces]
+    weights = [p[1] for p in pieces]
+
+    titles = []
+    for _ in range(size):
+        parts = []
+        for _ in range(rand.randint(1, 12)):
+            parts.append(rand.choice(rand.choices(groups, weights)[0]))
+            if rand.random() < 0.7:
+                parts.append(' ')
+        titles.append(''.join(parts))
+
+    # Casos extremos
+    titles.extend(['', ' ', '()', '&amp;', 'ONLINE', '\x0b', '\xa0', 'ﬁ', ' '.join(WORDS)])
+    return titles
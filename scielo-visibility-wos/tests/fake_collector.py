@@ -0,0 +1,129 @@
+import threading
+
+from time import sleep
+
+from model.collector import WosCollector, WOS_INTERACTION_ERROR, WOS_INTERACTION_SUCCESS
+from string_processor import preprocess_wos_source_title
+
+
+class FakeSessions:
+    """
+    Registra as consultas e a quantidade de sessões abertas ao mesmo tempo, compartilhadas entre as cópias do coletor.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.open = 0
+        self.max_open = 0
+        self.searched = []
+        self.batches = []
+
+    def opened(self):
+        with self.lock:
+            self.open += 1
+            self.max_open = max(self.max_open, self.open)
+
+    def closed(self):
+        with self.lock:
+            self.open -= 1
+
+    def search(self, source_titles):
+        with self.lock:
+            self.searched.extend(source_titles)
+
+    def search_batch(self, source_titles):
+        with self.lock:
+            self.batches.append(list(source_titles))
+
+
+class FakePageError(Exception):
+    """
+    Erro de interação simulado, recuperável pelo coletor.
+    """
+
+
+class FakeInterruption(Exception):
+    """
+    Interrupção simulada da execução, por exemplo por queda do processo.
+    """
+
+
+class FakeCollector(WosCollector):
+    """
+    Coletor que simula o navegador: cada consulta demora latency segundos. Títulos terminados em 9 não são encontrados,
+    os títulos em failing falham e os demais têm dois ISSNs derivados do título. Após interrupt_after consultas, a
+    execução é interrompida. Uma consulta agrupada percorre resultados de no máximo batch_page_limit títulos, e os
+    registros dos títulos em record_titles têm, nos resultados agrupados, outro título de fonte.
+    """
+    recoverable_errors = (FakePageError,)
+
+    def __init__(self, sessions, latency=0.01):
+        super().__init__()
+        self.sessions = sessions
+        self.latency = latency
+        self.session = None
+        self.window = 1
+        self.retry_delay = 0
+        self.failing = set()
+        self.interrupt_after = None
+        self.batch_page_limit = None
+        self.record_titles = {}
+
+    @staticmethod
+    def issns(source_title):
+        if source_title.endswith('9'):
+            return None
+        return ['%s-0001' % source_title[-4:], '%s-0002' % source_title[-4:]]
+
+    def has_session(self):
+        return self.session is not None
+
+    def open_session(self):
+        self.session = object()
+        self.sessions.opened()
+
+    def close_session(self):
+        self.session = None
+        self.sessions.closed()
+
+    def _detach_session(self):
+        self.session = None
+
+    def window_size(self):
+        return self.window
+
+    def save_latency_stats(self, mode):
+        pass
+
+    def search_issns(self, source_title, year):
+        if self.interrupt_after is not None and len(self.sessions.searched) >= self.interrupt_after:
+            raise FakeInterruption(source_title)
+
+        self.sessions.search([source_title])
+        sleep(self.latency)
+
+        if source_title in self.failing:
+            raise FakePageError(source_title)
+
+        issns = self.issns(source_title)
+        if issns is None:
+            return WOS_INTERACTION_ERROR, []
+        return WOS_INTERACTION_SUCCESS, issns
+
+    def search_issns_batch(self, source_titles, year):
+        self.sessions.search_batch(source_titles)
+        sleep(self.latency)
+
+        # Os resultados de cada título ocupam uma página; além do limite, os títulos restantes não são percorridos
+        complete = self.batch_page_limit is None or len(source_titles) <= self.batch_page_limit
+        listed = source_titles if complete else source_titles[:self.batch_page_limit]
+
+        found = {preprocess_wos_source_title(self.record_titles.get(st, st)): self.issns(st)
+                 for st in listed if self.issns(st) is not None}
+        if not found and not any(self.issns(st) for st in source_titles):
+            return WOS_INTERACTION_ERROR, {}, True
+        return WOS_INTERACTION_SUCCESS, found, complete
+
+
+def read_output(path):
+    with open(path) as f:
+        return [line.rstrip('\n').split('\t') for line in f]
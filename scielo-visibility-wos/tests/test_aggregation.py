@@ -0,0 +1,54 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from model.aggregation import VisibilityAggregator
+
+
+def read_table(path):
+    with open(path) as f:
+        return list(csv.DictReader(f, delimiter='\t'))
+
+
+class VisibilityAggregatorTest(unittest.TestCase):
+    def setUp(self):
+        self.aggregator = VisibilityAggregator('AHCI')
+        self.aggregator.add('10', '2015', 'BRA#USA')
+        self.aggregator.add('4', '2015', 'BRA#-1')
+        self.aggregator.add('1,000', '2015', '-1')
+        self.aggregator.add('6', '2016', '')
+        self.aggregator.add('3', '2016', 'ARG#ARG')
+
+    def test_unknown_country_is_not_a_country(self):
+        self.assertEqual(self.aggregator.country_year, {('BRA', '2015'): [14, 9.0],
+                                                        ('USA', '2015'): [10, 5.0],
+                                                        ('ARG', '2016'): [3, 3.0]})
+        self.assertEqual(self.aggregator.n_country, {('2015', 2): [1, 10],
+                                                     ('2015', 1): [1, 4],
+                                                     ('2015', 0): [1, 1000],
+                                                     ('2016', 0): [1, 6],
+                                                     ('2016', 1): [1, 3]})
+
+    def test_unresolved(self):
+        self.assertEqual(self.aggregator.years, {'2015': [3, 1014, 1, 1000], '2016': [2, 9, 1, 6]})
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            prefix = os.path.join(tmp, 'AHCI')
+            self.aggregator.save(prefix)
+
+            country_year = read_table(prefix + '_country_year.tsv')
+            n_country = read_table(prefix + '_n_country.tsv')
+            unresolved = read_table(prefix + '_unresolved.tsv')
+
+        self.assertNotIn('-1', [r['Country'] for r in country_year])
+        self.assertEqual([(r['Country'], r['Year'], r['Records'], r['Fractional records']) for r in country_year],
+                         [('ARG', '2016', '3', '3.0000'), ('BRA', '2015', '14', '9.0000'), ('USA', '2015', '10', '5.0000')])
+        self.assertEqual([(r['Year'], r['N-Country'], r['Rows']) for r in n_country],
+                         [('2015', '0', '1'), ('2015', '1', '1'), ('2015', '2', '1'), ('2016', '0', '1'), ('2016', '1', '1')])
+        self.assertEqual([r['Unresolved share'] for r in unresolved], ['0.9862', '0.6667'])
+
+
+if __name__ == '__main__':
+    unittest.main()
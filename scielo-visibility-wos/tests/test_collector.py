@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+from model.cache import IssnCache
+from tests.fake_collector import FakeCollector, FakeSessions, read_output
+
+
+class WosCollectorBatchTest(unittest.TestCase):
+    """
+    Coleta em modo de consultas agrupadas, com janelas de 10 títulos de um mesmo ano.
+    """
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.output = os.path.join(tmp.name, 'no_issn_AHCI.gathered.csv')
+        self.source_title_years = {'TITLE %04d' % i: ['2015'] for i in range(40)}
+        self.titles = sorted(self.source_title_years)
+
+        self.sessions = FakeSessions()
+        self.robot = FakeCollector(self.sessions, latency=0)
+        self.robot.wos_batch_query_length = 1000
+        self.robot.window = 10
+        self.robot.initialize('issn')
+
+    def expected_output(self):
+        expected = []
+        for c, source_title in enumerate(self.titles):
+            for issn in FakeCollector.issns(source_title) or ['']:
+                expected.append([str(c), source_title, issn])
+        return expected
+
+    def test_one_query_per_window(self):
+        self.robot.collect_issn(self.source_title_years, self.output)
+
+        self.assertEqual(self.sessions.batches, [self.titles[i:i + 10] for i in range(0, 40, 10)])
+        self.assertEqual(read_output(self.output), self.expected_output())
+
+        # Títulos sem registro correspondente nos resultados completos são consultados individualmente
+        self.assertEqual(self.sessions.searched, [self.titles[w + 9] for w in range(0, 40, 10)])
+
+    def test_record_with_other_source_title(self):
+        self.robot.issn_cache = IssnCache(os.path.join(self.tmp, 'issn_cache.db'))
+        self.addCleanup(self.robot.issn_cache.close)
+        self.robot.record_titles = {self.titles[3]: self.titles[3] + ' - SERIES A'}
+
+        self.robot.collect_issn(self.source_title_years, self.output)
+
+        # A associação é ambígua: o título é consultado individualmente, e não registrado como não encontrado
+        self.assertIn(self.titles[3], self.sessions.searched)
+        self.assertEqual(read_output(self.output), self.expected_output())
+        self.assertEqual(self.robot.issn_cache.get(self.titles[3], '2015', 'AHCI'), (True, FakeCollector.issns(self.titles[3])))
+
+    def test_batch_without_results(self):
+        self.robot.window = 4
+        not_found = [t for t in self.titles if t.endswith('9')]
+        self.robot.collect_issn({t: ['2015'] for t in not_found}, self.output)
+
+        # Sem resultados para a consulta agrupada, os títulos são registrados como não encontrados sem novas consultas
+        self.assertEqual(self.sessions.batches, [not_found])
+        self.assertEqual(self.sessions.searched, [])
+        self.assertEqual(read_output(self.output), [[str(c), t, ''] for c, t in enumerate(not_found)])
+
+    def test_page_limit_splits_the_query(self):
+        self.robot.batch_page_limit = 3
+        self.robot.collect_issn(self.source_title_years, self.output)
+
+        # Nenhum título é descartado: os que ficaram além do limite são consultados novamente, em metades
+        self.assertEqual(read_output(self.output), self.expected_output())
+
+        # Em cada janela: 3 títulos resolvidos, 7 restantes divididos em [3] e [4], e este deixa 1 título sozinho
+        expected_batches = []
+        for w in range(0, 40, 10):
+            expected_batches.extend([self.titles[w:w + 10], self.titles[w + 3:w + 6], self.titles[w + 6:w + 10]])
+        self.assertEqual(self.sessions.batches, expected_batches)
+        self.assertEqual(self.sessions.searched, [self.titles[w + 9] for w in range(0, 40, 10)])
+
+    def test_page_limit_of_the_halves(self):
+        self.robot.batch_page_limit = 1
+        self.robot.window = 4
+        self.robot.collect_issn({t: ['2015'] for t in self.titles[:4]}, self.output)
+
+        # 4 títulos: 1 resolvido, 3 restantes divididos em [1] (individual) e [2], que resolve 1 e deixa 1 (individual)
+        self.assertEqual(self.sessions.batches, [self.titles[0:4], self.titles[2:4]])
+        self.assertEqual(self.sessions.searched, [self.titles[1], self.titles[3]])
+        self.assertEqual(read_output(self.output), self.expected_output()[:8])
+
+
+if __name__ == '__main__':
+    unittest.main()
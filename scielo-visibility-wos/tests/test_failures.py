@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+from model.failures import FailedItems
+from tests.fake_collector import FakeCollector, FakeInterruption, FakeSessions, read_output
+
+
+class FailedItemsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.output = os.path.join(tmp.name, 'no_issn_AHCI.gathered.csv')
+        self.failures = FailedItems(os.path.join(tmp.name, 'no_issn_AHCI.failed.csv'))
+        self.source_title_years = {'TITLE %04d' % i: ['2015'] for i in range(30)}
+        self.titles = sorted(self.source_title_years)
+
+        self.sessions = FakeSessions()
+        self.robot = FakeCollector(self.sessions, latency=0)
+        self.robot.failures = self.failures
+        self.robot.initialize('issn')
+
+    def collected_lines(self):
+        return [int(row[0]) for row in read_output(self.output)]
+
+    def test_failed_items_are_saved(self):
+        self.robot.failing = {self.titles[3], self.titles[7]}
+        self.robot.collect_issn(self.source_title_years, self.output)
+
+        self.assertEqual(FailedItems._read(self.failures.path), [(3, self.titles[3], '2015'), (7, self.titles[7], '2015')])
+        self.assertEqual(self.sessions.searched.count(self.titles[3]), self.robot.max_attempts)
+        self.assertNotIn(3, self.collected_lines())
+
+    def test_replay(self):
+        self.robot.failing = {self.titles[3], self.titles[7], self.titles[12]}
+        self.robot.collect_issn(self.source_title_years, self.output)
+
+        # O item 12 falha novamente e permanece no arquivo de falhas
+        self.robot.failing = {self.titles[12]}
+        self.robot.replay_failed_issns(self.output)
+
+        self.assertEqual(FailedItems._read(self.failures.path), [(12, self.titles[12], '2015')])
+        self.assertFalse(os.path.exists(self.failures.replay_path))
+        self.assertEqual(sorted(set(self.collected_lines())), [i for i in range(30) if i != 12])
+
+    def test_interrupted_replay_is_resumed_without_duplicates(self):
+        failed = [3, 7, 12, 20]
+        self.robot.failing = {self.titles[i] for i in failed}
+        self.robot.collect_issn(self.source_title_years, self.output)
+        before = len(self.sessions.searched)
+
+        # O reprocessamento é interrompido após dois itens, que são retirados de <path>.replay
+        self.robot.failing = set()
+        self.robot.interrupt_after = before + 2
+        with self.assertRaises(FakeInterruption):
+            self.robot.replay_failed_issns(self.output)
+
+        self.assertEqual([item[0] for item in FailedItems._read(self.failures.replay_path)], [12, 20])
+
+        self.robot.interrupt_after = None
+        self.robot.replay_failed_issns(self.output)
+
+        self.assertEqual(self.sessions.searched[before:], [self.titles[i] for i in failed])
+        self.assertFalse(os.path.exists(self.failures.path))
+        self.assertFalse(os.path.exists(self.failures.replay_path))
+
+        # Cada título com ISSNs aparece com exatamente dois ISSNs, e os não encontrados uma única vez
+        lines = self.collected_lines()
+        for c, title in enumerate(self.titles):
+            self.assertEqual(lines.count(c), 1 if title.endswith('9') else 2, title)
+
+    def test_done_outside_replay(self):
+        self.failures.add(5, self.titles[5], '2015')
+        self.failures.done(5)
+
+        self.assertEqual(FailedItems._read(self.failures.path), [(5, self.titles[5], '2015')])
+        self.assertFalse(os.path.exists(self.failures.replay_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
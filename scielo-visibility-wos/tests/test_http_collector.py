@@ -0,0 +1,141 @@
+import os
+import tempfile
+import unittest
+
+from model.collector import WOS_INTERACTION_ERROR, WOS_INTERACTION_SUCCESS
+from model.http_collector import RateLimiter, WosHttpCollector, WosPageError
+from model.report_scheduler import COMPLETED_JOBS_FILE, CitationReportScheduler
+from requests import RequestException
+from tests.wos_stub import FIXTURES_DIR, WosStubServer
+
+
+class WosHttpCollectorTest(unittest.TestCase):
+    """
+    Executa o coletor HTTP contra um servidor local que serve páginas gravadas da WoS.
+    """
+    def setUp(self):
+        self.stub = WosStubServer(empty_queries=['Unknown Journal'])
+        self.stub.__enter__()
+        self.addCleanup(self.stub.__exit__)
+
+        self.collector = WosHttpCollector(base_url=self.stub.url)
+        self.collector.rate_limiter = RateLimiter(min_interval=0)
+        self.collector.wos_selected_index = 'SSCI'
+        self.collector.initialize('issn')
+        self.collector.open_session()
+        self.addCleanup(self.collector.close)
+
+    def test_search_issns(self):
+        status, issns = self.collector.search_issns('Revista de Saude Publica', '2015')
+
+        self.assertEqual(status, WOS_INTERACTION_SUCCESS)
+        self.assertEqual(issns, ['0034-8910', '1518-8787'])
+
+        search = self.stub.requested('POST', '/WOS_AdvancedSearch.do')[0]
+        self.assertEqual(search['value(input1)'], ['PY=2015 AND SO=(Revista de Saude Publica)'])
+        self.assertEqual(search['value(input3)'], ['Article', 'Review'])
+        self.assertEqual(search['editions'], ['SSCI'])
+        self.assertEqual(search['SID'], ['5ATestSID'])
+        self.assertEqual(search['search'], ['Search'])
+
+    def test_search_issns_not_found(self):
+        self.assertEqual(self.collector.search_issns('Unknown Journal', '2015'), (WOS_INTERACTION_ERROR, []))
+        self.assertEqual(self.stub.requested('GET', '/summary.do'), [])
+
+    def test_search_issns_batch(self):
+        status, found, complete = self.collector.search_issns_batch(['Revista de Saude Publica', 'Educacao e Pesquisa', 'Revista Sem Registros'], '2015')
+
+        self.assertEqual(status, WOS_INTERACTION_SUCCESS)
+        self.assertTrue(complete)
+        self.assertEqual(found, {'REVISTA DE SAUDE PUBLICA': ['0034-8910', '1518-8787'],
+                                 'EDUCACAO E PESQUISA': ['1517-9702']})
+
+        # Apenas o primeiro registro de cada título é aberto
+        self.assertEqual([r['doc'] for r in self.stub.requested('GET', '/full_record.do')], [['1'], ['3']])
+
+    def test_search_issns_batch_not_found(self):
+        self.assertEqual(self.collector.search_issns_batch(['Unknown Journal', 'Other Journal'], '2015'), (WOS_INTERACTION_ERROR, {}, True))
+
+    def test_search_issns_batch_page_limit(self):
+        self.collector.wos_batch_max_pages = 1
+        status, found, complete = self.collector.search_issns_batch(['Revista de Saude Publica', 'Educacao e Pesquisa'], '2015')
+
+        self.assertFalse(complete)
+        self.assertEqual(found, {'REVISTA DE SAUDE PUBLICA': ['0034-8910', '1518-8787']})
+
+    def test_search_retries_post(self):
+        self.stub.fail('POST', '/WOS_AdvancedSearch.do', 2)
+
+        status, issns = self.collector.search_issns('Revista de Saude Publica', '2015')
+
+        self.assertEqual(status, WOS_INTERACTION_SUCCESS)
+        self.assertEqual(len(self.stub.requested('POST', '/WOS_AdvancedSearch.do')), 3)
+
+    def test_search_retries_exhausted(self):
+        self.collector.close_session()
+        self.collector.http_retries = 1
+        self.collector.open_session()
+        self.stub.fail('POST', '/WOS_AdvancedSearch.do', 3)
+
+        with self.assertRaises(RequestException):
+            self.collector.search_issns('Revista de Saude Publica', '2015')
+        self.assertEqual(len(self.stub.requested('POST', '/WOS_AdvancedSearch.do')), 2)
+
+    def test_missing_element(self):
+        self.collector.base_url = self.stub.url + 'WOS_AdvancedSearch_input.do'
+
+        with self.assertRaises(WosPageError):
+            self.collector.search_issns('Revista de Saude Publica', '2015')
+
+    def test_collect_citation_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.collector.results_directory = tmp
+            self.collector.collect_citation_report(2015)
+
+            for name, fixture in (('source-2015.txt', 'analysis_report.txt'), ('book-2015.txt', 'analysis_report_book.txt')):
+                with open(os.path.join(FIXTURES_DIR, fixture), 'rb') as f:
+                    report = f.read()
+                with open(os.path.join(tmp, name), 'rb') as f:
+                    self.assertEqual(f.read(), report)
+
+        self.assertEqual([r['field'] for r in self.stub.requested('POST', '/AnalyzeResults.do')],
+                         [['SO_SourceTitle_SourceTitle_en'], ['SE_BookSeries_BookSeries_en']])
+        for save in self.stub.requested('POST', '/SaveAnalysis.do'):
+            self.assertEqual(save['save_what'], ['all'])
+            self.assertEqual(save['action'], ['save'])
+
+    def test_citation_report_session_expired(self):
+        self.stub.serve('POST', '/SaveAnalysis.do', 'session_expired.html')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.collector.results_directory = tmp
+            with self.assertRaises(WosPageError):
+                self.collector.collect_citation_report(2015)
+            self.assertEqual(os.listdir(tmp), [])
+
+    def test_citation_report_without_source_titles_header(self):
+        self.stub.serve('POST', '/SaveAnalysis.do', 'analysis_report_book.txt')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.collector.results_directory = tmp
+            with self.assertRaises(WosPageError):
+                self.collector.collect_citation_report(2015)
+
+    def test_scheduler_retries_invalid_citation_report(self):
+        self.stub.serve('POST', '/SaveAnalysis.do', 'session_expired.html')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.collector.download_directory = tmp
+            self.collector.wos_search_years = [2015]
+            scheduler = CitationReportScheduler(self.collector, ['SSCI'], max_attempts=2, retry_delay=0)
+            scheduler.collect()
+
+            # O relatório inválido não é salvo nem registrado como coletado, e continua pendente
+            self.assertEqual(scheduler.failed, [('SSCI', 2015)])
+            self.assertEqual(len(self.stub.requested('POST', '/SaveAnalysis.do')), 2)
+            self.assertFalse(os.path.exists(os.path.join(tmp, 'ssci', COMPLETED_JOBS_FILE)))
+            self.assertEqual(scheduler.jobs(), [('SSCI', 2015)])
+
+
+if __name__ == '__main__':
+    unittest.main()
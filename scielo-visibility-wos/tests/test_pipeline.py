@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from model.pipeline import STAGE_DONE, STAGE_FAILED_ITEMS, Pipeline, PipelineError, Stage
+
+
+# Registra a execução em runs e, se houver, retira o primeiro item do arquivo de falhas
+SCRIPT = '''
+import sys
+name, output, failed = sys.argv[1:]
+with open('runs', 'a') as f:
+    f.write(name + '\\n')
+with open(output, 'a') as f:
+    f.write(name + '\\n')
+if name == 'collect':
+    with open(failed, 'w') as f:
+        f.write('1\\tTITLE 1\\t2015\\n2\\tTITLE 2\\t2015\\n')
+elif name == 'replay':
+    with open(failed) as f:
+        items = f.readlines()
+    with open(failed, 'w') as f:
+        f.writelines(items[1:])
+'''
+
+
+class PipelineFailedItemsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.work_dir = self.tmp.name
+
+        gathered = os.path.join(self.work_dir, 'gathered.csv')
+        failed = os.path.join(self.work_dir, 'gathered.failed.csv')
+        gold = os.path.join(self.work_dir, 'gold.csv')
+
+        def command(name, output):
+            return [sys.executable, '-c', SCRIPT, name, output, failed]
+
+        self.stages = [Stage('issn', command('collect', gathered), [], [gathered],
+                             failures=[failed], replay_command=command('replay', gathered)),
+                       Stage('join', command('join', gold), [gathered], [gold])]
+
+    def pipeline(self):
+        return Pipeline(self.stages, self.work_dir, os.path.join(self.work_dir, '.pipeline_cache'))
+
+    def runs(self):
+        with open(os.path.join(self.work_dir, 'runs')) as f:
+            return f.read().split()
+
+    def test_stage_pending_while_failed_items_remain(self):
+        pipeline = self.pipeline()
+        with self.assertRaises(PipelineError):
+            pipeline.run()
+
+        # A junção não é executada com dados incompletos
+        self.assertEqual(self.runs(), ['collect', 'replay'])
+        self.assertEqual(pipeline.state['issn']['status'], STAGE_FAILED_ITEMS)
+
+        # A próxima execução apenas reprocessa os itens com falha
+        pipeline = self.pipeline()
+        pipeline.run()
+
+        self.assertEqual(self.runs(), ['collect', 'replay', 'replay', 'join'])
+        self.assertEqual(pipeline.state['issn']['status'], STAGE_DONE)
+
+        pipeline.run()
+        self.assertEqual(self.runs(), ['collect', 'replay', 'replay', 'join'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from model.robot_pool import WosRobotPool
+from tests.fake_collector import FakeCollector, FakeSessions, read_output
+
+
+class WosRobotPoolTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.output = os.path.join(tmp.name, 'no_issn_AHCI.gathered.csv')
+        self.source_title_years = {'TITLE %04d' % i: ['2015'] for i in range(60)}
+
+        self.sessions = FakeSessions()
+        self.robot = FakeCollector(self.sessions)
+        self.robot.initialize('issn')
+
+    def expected_output(self):
+        expected = []
+        for c, source_title in enumerate(sorted(self.source_title_years)):
+            for issn in FakeCollector.issns(source_title) or ['']:
+                expected.append([str(c), source_title, issn])
+        return expected
+
+    def test_concurrent_sessions(self):
+        WosRobotPool(self.robot, sessions=4).collect_issn(self.source_title_years, self.output)
+
+        self.assertGreater(self.sessions.max_open, 1)
+        self.assertLessEqual(self.sessions.max_open, 4)
+        self.assertEqual(self.sessions.open, 0)
+        self.assertEqual(sorted(self.sessions.searched), sorted(self.source_title_years))
+
+        # As sessões terminam fora de ordem, mas cada título aparece uma única vez, com todos os seus ISSNs em ordem
+        output = read_output(self.output)
+        self.assertEqual(sorted(output, key=lambda row: int(row[0])), self.expected_output())
+
+    def test_same_output_as_single_session(self):
+        single_output = self.output.replace('.csv', '.single.csv')
+        FakeCollector(FakeSessions()).collect_issn(self.source_title_years, single_output)
+        WosRobotPool(self.robot, sessions=3).collect_issn(self.source_title_years, self.output)
+
+        self.assertEqual(read_output(single_output), self.expected_output())
+        self.assertEqual(sorted(read_output(self.output), key=lambda row: int(row[0])), read_output(single_output))
+
+    def test_batch_windows_are_saved_in_order(self):
+        self.robot.wos_batch_query_length = 200
+        self.robot.window = 10
+
+        WosRobotPool(self.robot, sessions=3).collect_issn(self.source_title_years, self.output)
+
+        output = read_output(self.output)
+        self.assertEqual(sorted(output, key=lambda row: int(row[0])), self.expected_output())
+
+        # Os resultados de cada janela são gravados na ordem das linhas
+        for window in range(6):
+            lines = [int(row[0]) for row in output if int(row[0]) // 10 == window]
+            self.assertEqual(lines, sorted(lines))
+
+    def test_resume_skips_saved_and_not_found_lines(self):
+        expected = self.expected_output()
+
+        # Execução interrompida: linhas 0 a 19 salvas, inclusive os títulos não encontrados 9 e 19
+        with open(self.output, 'w') as f:
+            for row in expected:
+                if int(row[0]) < 20:
+                    f.write('\t'.join(row) + '\n')
+
+        WosRobotPool(self.robot, sessions=4).collect_issn(self.source_title_years, self.output)
+
+        self.assertEqual(sorted(self.sessions.searched), sorted(self.source_title_years)[20:])
+        self.assertEqual(sorted(read_output(self.output), key=lambda row: int(row[0])), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import html
+import re
+import unicodedata
+import unittest
+
+import string_processor
+
+from tests.corpus import generate_titles
+
+
+# Implementação original do pré-processamento de títulos, usada como referência para os caminhos rápidos
+def baseline_remove_invalid_chars(text):
+    vchars = []
+    for t in text:
+        if ord(t) == 11:
+            vchars.append(' ')
+        elif ord(t) >= 32 and ord(t) != 127:
+            vchars.append(t)
+    return ''.join(vchars)
+
+
+def baseline_remove_accents(text):
+    return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII')
+
+
+def baseline_alpha_num_space(text, include_special_chars=False):
+    new_str = []
+    for character in text:
+        if character.isalnum() or character.isspace() or (include_special_chars and character in string_processor.special_chars):
+            new_str.append(character)
+        else:
+            new_str.append(' ')
+    return ''.join(new_str)
+
+
+def baseline_remove_double_spaces(text):
+    while '  ' in text:
+        text = text.replace('  ', ' ')
+    return text.strip()
+
+
+def baseline_preprocess_author_name(text):
+    return baseline_remove_double_spaces(baseline_alpha_num_space(baseline_remove_accents(text)))
+
+
+def baseline_preprocess_journal_title(text, use_remove_invalid_chars=False):
+    text = html.unescape(text)
+
+    if use_remove_invalid_chars:
+        text = baseline_remove_invalid_chars(text)
+
+    parenthesis_search = re.search(string_processor.parenthesis_pattern, text)
+    while parenthesis_search is not None:
+        text = text[:parenthesis_search.start()] + text[parenthesis_search.end():]
+        parenthesis_search = re.search(string_processor.parenthesis_pattern, text)
+
+    for sw in ['IMPRESSO', 'ONLINE', 'CDROM', 'PRINT', 'ELECTRONIC']:
+        text = text.replace(sw, '')
+    return baseline_remove_double_spaces(baseline_alpha_num_space(baseline_remove_accents(text), include_special_chars=True)).upper()
+
+
+def baseline_preprocess_wos_source_title(text):
+    # Qualquer caractere de espaço (tabulação, quebra de linha, espaços Unicode) separa palavras
+    return baseline_remove_double_spaces(''.join(' ' if c.isspace() else c for c in text)).upper()
+
+
+class StringProcessorEquivalenceTest(unittest.TestCase):
+    """
+    Compara as funções de pré-processamento com a implementação original em um corpus gerado de títulos.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.titles = generate_titles()
+
+    def setUp(self):
+        string_processor._cached_preprocess_journal_title.cache_clear()
+
+    def assert_equivalent(self, function, baseline, *args):
+        for title in self.titles:
+            self.assertEqual(function(title, *args), baseline(title, *args), repr(title))
+
+    def test_corpus_is_reproducible(self):
+        self.assertEqual(generate_titles(), self.titles)
+
+    def test_remove_invalid_chars(self):
+        self.assert_equivalent(string_processor.remove_invalid_chars, baseline_remove_invalid_chars)
+
+    def test_remove_accents(self):
+        self.assert_equivalent(string_processor.remove_accents, baseline_remove_accents)
+
+    def test_alpha_num_space(self):
+        self.assert_equivalent(string_processor.alpha_num_space, baseline_alpha_num_space, False)
+        self.assert_equivalent(string_processor.alpha_num_space, baseline_alpha_num_space, True)
+
+    def test_remove_double_spaces(self):
+        self.assert_equivalent(string_processor.remove_double_spaces, baseline_remove_double_spaces)
+
+    def test_preprocess_author_name(self):
+        self.assert_equivalent(string_processor.preprocess_author_name, baseline_preprocess_author_name)
+
+    def test_preprocess_journal_title(self):
+        self.assert_equivalent(string_processor.preprocess_journal_title, baseline_preprocess_journal_title, False)
+        self.assert_equivalent(string_processor.preprocess_journal_title, baseline_preprocess_journal_title, True)
+
+    def test_preprocess_journal_title_cached(self):
+        # A segunda chamada usa o cache LRU
+        for title in self.titles[:1000]:
+            self.assertEqual(string_processor.preprocess_journal_title(title), baseline_preprocess_journal_title(title))
+            self.assertEqual(string_processor.preprocess_journal_title(title), baseline_preprocess_journal_title(title))
+
+    def test_preprocess_journal_titles(self):
+        for use_remove_invalid_chars in (False, True):
+            titles = self.titles + self.titles[:500]
+            self.assertEqual(string_processor.preprocess_journal_titles(titles, use_remove_invalid_chars),
+                             [baseline_preprocess_journal_title(t, use_remove_invalid_chars) for t in titles])
+
+    def test_preprocess_wos_source_title(self):
+        self.assert_equivalent(string_processor.preprocess_wos_source_title, baseline_preprocess_wos_source_title)
+
+
+if __name__ == '__main__':
+    unittest.main()
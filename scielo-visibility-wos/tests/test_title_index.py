@@ -0,0 +1,59 @@
+import unittest
+
+from model.title_index import TitleTrigramIndex
+
+
+TITLE_TO_ISSNLS = {'REVISTA DE SAUDE PUBLICA': ['0034-8910'],
+                   'REVISTA BRASILEIRA DE EDUCACAO': ['1413-2478'],
+                   'EDUCACAO E PESQUISA': ['1517-9702'],
+                   'CADERNOS DE SAUDE PUBLICA': ['0102-311X', '1678-4464']}
+
+
+class TitleTrigramIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = TitleTrigramIndex(TITLE_TO_ISSNLS, threshold=0.6, top_k=2)
+
+    def brute_force(self, title, threshold, top_k):
+        query_grams = self.index.grams(title)
+        scores = {}
+        for t, issnls in TITLE_TO_ISSNLS.items():
+            grams = self.index.grams(t)
+            score = len(query_grams & grams) / len(query_grams | grams)
+            if score >= threshold:
+                for issnl in issnls:
+                    scores[issnl] = max(score, scores.get(issnl, -1))
+        return sorted(scores.items(), key=lambda x: (x[1], x[0]), reverse=True)[:top_k]
+
+    def test_search(self):
+        self.assertEqual(self.index.search('REVISTA DE SAUDE PUBLICA')[0], ('0034-8910', 1.0))
+        self.assertEqual(self.index.search('REVISTA SAUDE PUBLICA'), self.brute_force('REVISTA SAUDE PUBLICA', 0.6, 2))
+        self.assertEqual(self.index.search('JOURNAL OF PHYSICS'), [])
+
+    def test_search_same_as_brute_force(self):
+        for title in ['REVISTA DE SAUDE', 'CADERNOS SAUDE PUBLICA', 'EDUCACAO PESQUISA', 'REVISTA EDUCACAO']:
+            for threshold in (0.1, 0.3, 0.5, 1):
+                self.assertEqual(self.index.search(title, top_k=4, threshold=threshold),
+                                 self.brute_force(title, threshold, 4), (title, threshold))
+
+    def test_similarity_equal_to_threshold(self):
+        # Jaccard exato de 33/60 = 0.55, enquanto 33 / 0.55 resulta em 59.999... em ponto flutuante
+        query = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456'
+        candidate = query + ' ' + 'abcdefghijklmnopqrstuvwxyz'
+        index = TitleTrigramIndex({candidate: ['0000-0001']}, threshold=0.55)
+
+        self.assertEqual(len(index.grams(query)), 33)
+        self.assertEqual(len(index.grams(candidate)), 60)
+        self.assertEqual(index.search(query), [('0000-0001', 33 / 60)])
+
+    def test_invalid_threshold(self):
+        for threshold in (0, -0.5, 1.01, 85):
+            with self.assertRaises(ValueError):
+                TitleTrigramIndex(TITLE_TO_ISSNLS, threshold=threshold)
+            with self.assertRaises(ValueError):
+                self.index.search('REVISTA DE SAUDE PUBLICA', threshold=threshold)
+
+        self.assertEqual(TitleTrigramIndex(TITLE_TO_ISSNLS, threshold=1).threshold, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
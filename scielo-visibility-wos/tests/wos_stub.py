@@ -0,0 +1,136 @@
+import os
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'wos')
+
+# Páginas gravadas da WoS, servidas para cada caminho e método
+ROUTES = {
+    ('GET', '/'): 'home.html',
+    ('GET', '/WOS_AdvancedSearch_input.do'): 'advanced_search.html',
+    ('POST', '/WOS_AdvancedSearch.do'): 'search_history.html',
+    ('GET', '/CitationReport.do'): 'citation_report.html',
+    ('POST', '/AnalyzeResults.do'): 'analyze_results.html',
+}
+
+# Relatório baixado para cada análise de citações
+ANALYSIS_REPORTS = {'SO_SourceTitle_SourceTitle_en': 'analysis_report.txt',
+                    'SE_BookSeries_BookSeries_en': 'analysis_report_book.txt'}
+
+
+class WosStubServer:
+    """
+    Servidor HTTP local que reproduz a navegação na WoS a partir das páginas gravadas em FIXTURES_DIR.
+    As requisições recebidas são registradas em requests, como tuplas (método, caminho, parâmetros).
+    :param empty_queries: trechos de consulta para os quais a busca não tem resultados
+    """
+    def __init__(self, empty_queries=()):
+        self.empty_queries = empty_queries
+        self.requests = []
+        self.failures = {}
+        self.overrides = {}
+        self.analysis = None
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d/' % self.server.server_address[1]
+
+    def fail(self, method, path, times, status=503):
+        """
+        Responde às próximas times requisições (método, caminho) com status.
+        """
+        self.failures[(method, path)] = [status] * times
+
+    def serve(self, method, path, fixture):
+        """
+        Responde às requisições (método, caminho) com fixture, no lugar da página gravada, por exemplo
+        session_expired.html.
+        """
+        self.overrides[(method, path)] = fixture
+
+    def requested(self, method, path):
+        return [r[2] for r in self.requests if r[0] == method and r[1] == path]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def fixture(self, method, path, params):
+        if (method, path) in self.overrides:
+            return self.overrides[(method, path)]
+
+        if (method, path) == ('POST', '/AnalyzeResults.do'):
+            self.analysis = params.get('field', [''])[0]
+
+        if (method, path) == ('POST', '/SaveAnalysis.do'):
+            return ANALYSIS_REPORTS.get(self.analysis)
+
+        if (method, path) == ('POST', '/WOS_AdvancedSearch.do'):
+            query = params.get('value(input1)', [''])[0]
+            if any(q in query for q in self.empty_queries):
+                return 'search_history_empty.html'
+
+        if path == '/summary.do':
+            return 'summary_page%s.html' % params.get('page', ['1'])[0]
+
+        if path == '/full_record.do':
+            return 'full_record%s.html' % params.get('doc', [''])[0]
+
+        return ROUTES.get((method, path))
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._respond('GET', urlsplit(self.path).query)
+
+            def do_POST(self):
+                self._respond('POST', self.rfile.read(int(self.headers.get('Content-Length', 0))).decode())
+
+            def _respond(self, method, query):
+                path = urlsplit(self.path).path
+                params = parse_qs(query, keep_blank_values=True)
+
+                with stub.lock:
+                    stub.requests.append((method, path, params))
+                    failures = stub.failures.get((method, path))
+                    status = failures.pop() if failures else None
+
+                fixture = stub.fixture(method, path, params)
+                if status is None and (fixture is None or not os.path.exists(os.path.join(FIXTURES_DIR, fixture))):
+                    status = 404
+
+                if status is not None:
+                    self.send_response(status)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                with open(os.path.join(FIXTURES_DIR, fixture), 'rb') as f:
+                    body = f.read()
+
+                self.send_response(200)
+                if fixture.endswith('.txt'):
+                    self.send_header('Content-Type', 'text/plain')
+                    self.send_header('Content-Disposition', 'attachment; filename=analyze.txt')
+                else:
+                    self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
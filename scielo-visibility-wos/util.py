@@ -1,7 +1,9 @@
 import csv
-import re
 import os
 
+from model.compiled_maps import is_compiled_maps, open_compiled_maps
+from model.readers import file_year, read_source_title_files
+
 
 HEADER_SOURCE_TITLE_ISSN = ['Id', 'Source Title', 'ISSN']
 PATTERN_YEAR = r'\d{4}'
@@ -22,6 +24,10 @@ def read_wos_issns(path_wos_issns):
             source_title = row['source_title']
             issn = row['issn']
 
+            # Linhas sem ISSN registram títulos não encontrados na WoS
+            if not issn:
+                continue
+
             if source_title not in title_to_issns:
                 title_to_issns[source_title] = []
             title_to_issns[source_title].append(issn)
@@ -29,24 +35,19 @@ def read_wos_issns(path_wos_issns):
     return title_to_issns
 
 
-def read_source_titles(path_source_titles):
-    st = []
+def list_source_title_files(path_source_titles):
+    return [os.path.join(path_source_titles, f) for f in os.listdir(path_source_titles) if 'source' in f]
 
-    files = [os.path.join(path_source_titles, f) for f in os.listdir(path_source_titles) if 'source' in f]
 
-    for f in files:
-        f_year = re.search(PATTERN_YEAR, f).group()
+def source_title_file_year(path_source_title_file):
+    return file_year(path_source_title_file)
 
-        with open(f, encoding='utf-8-sig') as fi:
-            csv_reader = csv.DictReader(fi, delimiter='\t')
 
-            for row in csv_reader:
-                source_title = row['Source Titles']
-                records = row['records']
-                if records:
-                    st.append((source_title, records, f_year))
+def read_source_titles(path_source_titles, files=None):
+    if files is None:
+        files = list_source_title_files(path_source_titles)
 
-    return st
+    return read_source_title_files(files)
 
 
 def read_core_titles(path_core_titles):
@@ -69,6 +70,10 @@ def read_core_titles(path_core_titles):
 
 
 def read_base_titles(path_base_titles):
+    if is_compiled_maps(path_base_titles):
+        compiled_maps = open_compiled_maps(path_base_titles)
+        return compiled_maps['title2issns'], compiled_maps['issn2countries']
+
     title2issn = {}
     issn2country = {}
 
@@ -135,6 +140,10 @@ def read_wos_gathered_issns(path_gathered_file):
             title = row['title']
             issn = row['issn']
 
+            # Linhas sem ISSN registram títulos não encontrados na WoS
+            if not issn:
+                continue
+
             if title not in title_to_issn:
                 title_to_issn[title] = []
 
@@ -2,7 +2,12 @@ import argparse
 import logging
 import os
 
+from model.aggregation import VisibilityAggregator
 from model.enricher import WosEnricher
+from model.lookup import LookupClient
+from model.manifest import enrich_incrementally
+from model.metrics import RunMetrics, profiled
+from model import vectorized
 from util import read_source_titles, read_core_titles, read_base_titles
 
 
@@ -14,32 +19,94 @@ logging.basicConfig(level=os.environ.get('LOGGING_LEVEL', 'INFO'),
 def get_params():
     parser = argparse.ArgumentParser()
 
-    parser.add_argument('-c', '--core_titles', required=True)
+    parser.add_argument('-c', '--core_titles')
     parser.add_argument('-t', '--source_titles', required=True)
-    parser.add_argument('-b', '--base_titles', required=True)
+    parser.add_argument('-b', '--base_titles')
     parser.add_argument('-i', '--index', required=True)
+    parser.add_argument('-n', '--workers', type=int, default=1)
+    parser.add_argument('-r', '--metrics_report')
+    parser.add_argument('-p', '--profile')
+    parser.add_argument('-u', '--incremental', action='store_true')
+    parser.add_argument('-e', '--engine', choices=['python', 'pandas'], default='python')
+    parser.add_argument('-a', '--aggregate', action='store_true')
+    parser.add_argument('-l', '--lookup')
 
     params = parser.parse_args()
 
+    if params.incremental and params.engine == 'pandas':
+        parser.error('O modo incremental está disponível apenas no motor python')
+
+    if params.lookup:
+        if params.incremental or params.engine == 'pandas':
+            parser.error('O serviço de consulta não é compatível com o modo incremental nem com o motor pandas')
+    elif not params.core_titles or not params.base_titles:
+        parser.error('Os parâmetros -c e -b são obrigatórios sem o serviço de consulta')
+
     return {'core_titles': params.core_titles,
             'source_titles': params.source_titles,
             'base_titles': params.base_titles,
-            'index': params.index}
+            'index': params.index,
+            'workers': params.workers,
+            'metrics_report': params.metrics_report,
+            'profile': params.profile,
+            'incremental': params.incremental,
+            'engine': params.engine,
+            'aggregate': params.aggregate,
+            'lookup': params.lookup}
 
 
 if __name__ == '__main__':
     params = get_params()
 
     enricher = WosEnricher(params['index'])
+    # O estado incremental não pode sobrescrever o arquivo gold de wos_joiner, salvo no mesmo diretório
+    enricher.data_name = 'enriched'
+    metrics = RunMetrics()
+
+    with profiled(params['profile']):
+        with metrics.stage('load'):
+            logging.info('Carregando dados...')
+            if not params['incremental']:
+                enricher.source_titles = read_source_titles(params['source_titles'])
+            if params['lookup']:
+                # Master Journal List e títulos base já estão carregados no serviço de consulta
+                enricher.lookup = LookupClient(params['lookup'])
+                logging.info('Serviço de consulta carregado com %s' % enricher.lookup.status()['inputs'])
+            elif params['engine'] == 'pandas':
+                core_titles = vectorized.load_journal_list_frame(params['core_titles'])
+                base_titles = vectorized.load_base_tables(params['base_titles'])
+            else:
+                enricher.core_titles = read_core_titles(params['core_titles'])
+                t2i, i2c = read_base_titles(params['base_titles'])
+                enricher.base_titles = {'title2issns': t2i, 'issn2countries': i2c}
+
+        with metrics.stage('enrich'):
+            logging.info('Enriquecendo dados...')
+            if params['incremental']:
+                # Apenas as linhas afetadas por alterações nos dados de entrada são enriquecidas
+                input_paths = {'core_titles': params['core_titles'],
+                               'base_titles': params['base_titles']}
+                manifest = enrich_incrementally(enricher, params['source_titles'], input_paths, None, params['workers'])
+            elif params['engine'] == 'pandas':
+                enricher.enrich_source_titles_frame(core_titles, base_titles)
+            else:
+                enricher.enrich_source_titles(workers=params['workers'])
 
-    logging.info('Carregando dados...')
-    enricher.source_titles = read_source_titles(params['source_titles'])
-    enricher.core_titles = read_core_titles(params['core_titles'])
-    t2i, i2c = read_base_titles(params['base_titles'])
-    enricher.base_titles = {'title2issns': t2i, 'issn2countries': i2c}
+        if params['aggregate']:
+            with metrics.stage('aggregate'):
+                logging.info('Agregando dados...')
+                aggregator = VisibilityAggregator(params['index'])
+                enricher.aggregate(aggregator)
 
-    logging.info('Enriquecendo dados...')
-    enricher.enrich_source_titles()
+        with metrics.stage('save'):
+            logging.info('Salvando dados...')
+            enricher.save_problematic_sources_titles_years()
+            if params['aggregate']:
+                aggregator.save(params['index'])
+            if params['incremental']:
+                # Os resultados e o manifesto guardam o estado para a próxima execução incremental
+                enricher.save_gold_data()
+                manifest.save()
 
-    logging.info('Salvando dados...')
-    enricher.save_problematic_sources_titles_years()
+    metrics.counters = enricher.counters
+    metrics.dump(params['metrics_report'])
@@ -1,7 +1,14 @@
 import argparse
+import os
 
 from util import read_source_title_years
+from model.cache import IssnCache
+from model.collector import GENERAL_RESULTS_DIR
+from model.failures import FailedItems
+from model.http_collector import WosHttpCollector
+from model.report_scheduler import CitationReportScheduler
 from model.robot import WosRobot
+from model.robot_pool import WosRobotPool
 
 
 def get_params():
@@ -11,32 +18,74 @@ def get_params():
     parser.add_argument('-i', '--wos_indexes', default='SCI,SSCI,AHCI,ISTP,ISSHP,ESCI')
     parser.add_argument('-s', '--wos_selected_index', default='AHCI')
     parser.add_argument('-r', '--wos_result_types', default='Article,Review')
-    parser.add_argument('-y', '--source_title_years', required=True)
+    parser.add_argument('-y', '--source_title_years')
+    parser.add_argument('-p', '--sessions', type=int, default=1)
+    parser.add_argument('-k', '--cache')
+    parser.add_argument('-e', '--backend', default='selenium', choices=['selenium', 'http'])
+    parser.add_argument('-q', '--batch_query_length', type=int, default=0)
+    parser.add_argument('-x', '--report_indexes')
+    parser.add_argument('-l', '--lean_session', action='store_true')
+    parser.add_argument('--replay_failures', '--replay-failures', action='store_true')
 
     params = parser.parse_args()
 
+    if params.mode == 'issn' and not params.source_title_years:
+        parser.error('O parâmetro -y é obrigatório no modo issn')
+
     return {'mode': params.mode,
             'wos_indexes': [i.upper() for i in params.wos_indexes.split(',')],
             'wos_selected_index': params.wos_selected_index.upper(),
             'wos_result_types': [i.title() for i in params.wos_result_types.split(',')],
-            'source_title_years': params.source_title_years}
+            'source_title_years': params.source_title_years,
+            'sessions': params.sessions,
+            'cache': params.cache,
+            'backend': params.backend,
+            'batch_query_length': params.batch_query_length,
+            'lean_session': params.lean_session,
+            'replay_failures': params.replay_failures,
+            'report_indexes': [i.upper() for i in (params.report_indexes or params.wos_selected_index).split(',')]}
+
+
+def create_collector(backend, params):
+    collector = WosHttpCollector() if backend == 'http' else WosRobot()
+
+    collector.wos_indexes = params['wos_indexes']
+    collector.wos_selected_index = params['wos_selected_index']
+    collector.wos_result_types = params['wos_result_types']
+    collector.wos_batch_query_length = params['batch_query_length']
+    if backend == 'selenium':
+        collector.lean_session = params['lean_session']
+
+    collector.initialize(mode=params['mode'])
+
+    return collector
 
 
 if __name__ == '__main__':
     params = get_params()
 
-    robot = WosRobot()
+    robot = create_collector(params['backend'], params)
 
-    robot.wos_indexes = params['wos_indexes']
-    robot.wos_selected_index = params['wos_selected_index']
-    robot.wos_result_types = params['wos_result_types']
+    # O navegador permanece como alternativa para os títulos que o cliente HTTP não conseguir coletar
+    if params['backend'] == 'http':
+        robot.fallback = create_collector('selenium', params)
+        robot.fallback.latency_stats = robot.latency_stats
 
-    robot.initialize(mode=params['mode'])
+    if params['cache']:
+        robot.issn_cache = IssnCache(params['cache'])
 
     if params['mode'] == 'citation_report':
-        robot.collect_citation_reports()
+        CitationReportScheduler(robot, params['report_indexes'], params['sessions']).collect()
 
     if params['mode'] == 'issn':
         source_title_years = read_source_title_years(params['source_title_years'])
         output_file_name = params['source_title_years'].replace('.csv', '.gathered.csv')
-        robot.collect_issn(source_title_years, output_file_name)
+
+        # Títulos não coletados após as novas tentativas são registrados e podem ser reprocessados com --replay_failures
+        robot.failures = FailedItems(os.path.join(GENERAL_RESULTS_DIR, params['source_title_years'].replace('.csv', '.failed.csv')))
+
+        collector = WosRobotPool(robot, params['sessions']) if params['sessions'] > 1 else robot
+        if params['replay_failures']:
+            collector.replay_failed_issns(output_file_name)
+        else:
+            collector.collect_issn(source_title_years, output_file_name)